@@ -0,0 +1,152 @@
+#!/usr/bin/env python
+"""Benchmark ``bands_distance`` against the former loop over ``bands_distance_raw``.
+
+The W bands of the test fixtures are used, and tiled along the kpoints to mimic
+dense kpoint paths.
+"""
+import json
+import pathlib
+import timeit
+
+import numpy as np
+
+from aiida_wannier90_workflows.utils.bands.distance import (
+    bands_distance,
+    get_reference_bands,
+)
+
+FIXTURES = (
+    pathlib.Path(__file__).parent.parent / "tests" / "fixtures" / "utils" / "bands"
+)
+FERMI_ENERGY = 22.753
+EXCLUDE_LIST_DFT = [1, 2, 3, 4]
+
+
+def load_bands(structure: str, file_name: str) -> np.array:
+    """Load the bands of the test fixtures, of size (num_k x num_bands)."""
+    with open(FIXTURES / structure / file_name, encoding="utf-8") as handle:
+        data = json.load(handle)
+    return np.hstack([_["values"] for _ in data["paths"]]).T
+
+
+def bands_distance_raw_former(  # pylint: disable=too-many-arguments,too-many-locals
+    dft_bands: np.array,
+    wannier_bands: np.array,
+    mu: float,
+    sigma: float,
+    exclude_list_dft: list = None,
+    lower_cutoff: float = None,
+) -> tuple:
+    """Calculate bands distance for one ``mu``, the former implementation."""
+
+    def fermi_dirac(energy, mu, sigma):
+        return 1.0 / (np.exp((energy - mu) / sigma) + 1.0)
+
+    def compute_lower_cutoff(energy, lower_cutoff):
+        if lower_cutoff is None:
+            lower_cutoff = energy.min() - 1.0
+        return np.array(energy > lower_cutoff, dtype=int)
+
+    if exclude_list_dft is None:
+        dft_bands_filtered = dft_bands
+    else:
+        xb_startzero_set = {idx - 1 for idx in exclude_list_dft}
+        keep_bands = np.array(
+            [idx for idx in range(dft_bands.shape[1]) if idx not in xb_startzero_set],
+            dtype=int,
+        )
+        dft_bands_filtered = dft_bands[:, keep_bands]
+
+    if dft_bands_filtered.shape[1] <= wannier_bands.shape[1]:
+        wannier_bands_filtered = wannier_bands[:, : dft_bands_filtered.shape[1]]
+    else:
+        wannier_bands_filtered = wannier_bands
+    dft_bands_to_compare = dft_bands_filtered[:, : wannier_bands_filtered.shape[1]]
+
+    bands_energy_difference = dft_bands_to_compare - wannier_bands_filtered
+    bands_weight_dft = fermi_dirac(
+        dft_bands_to_compare, mu, sigma
+    ) * compute_lower_cutoff(dft_bands_to_compare, lower_cutoff)
+    bands_weight_wannier = fermi_dirac(
+        wannier_bands_filtered, mu, sigma
+    ) * compute_lower_cutoff(dft_bands_to_compare, lower_cutoff)
+
+    bands_weight = np.sqrt(bands_weight_dft * bands_weight_wannier)
+    arr = bands_energy_difference**2 * bands_weight
+    bands_dist = np.sqrt(np.sum(arr) / np.sum(bands_weight))
+    max_dist = np.sqrt(np.max(arr))
+    max_dist_loc = np.unravel_index(np.argmax(arr, axis=None), arr.shape)
+    arr_2 = np.abs(bands_energy_difference) * bands_weight
+    max_dist_2 = np.max(arr_2)
+    max_dist_2_loc = np.unravel_index(np.argmax(arr_2, axis=None), arr_2.shape)
+
+    return (bands_dist, max_dist, max_dist_2, max_dist_loc, max_dist_2_loc)
+
+
+def bands_distance_former(
+    dft_bands: np.array,
+    wannier_bands: np.array,
+    fermi_energy: float,
+    exclude_list_dft: list = None,
+) -> np.array:
+    """Calculate bands distance with ``mu`` set as Ef to Ef+5, the former implementation."""
+    mu_range = np.arange(fermi_energy, fermi_energy + 5 + 0.0001, 1)
+
+    dist = np.full((len(mu_range), 4), np.nan)
+    for i, mu in enumerate(mu_range):
+        res = bands_distance_raw_former(
+            dft_bands=dft_bands,
+            wannier_bands=wannier_bands,
+            exclude_list_dft=exclude_list_dft,
+            mu=mu,
+            sigma=0.1,
+            lower_cutoff=-30,
+        )
+        dist[i, :] = [mu, res[0], res[1], res[2]]
+
+    return dist
+
+
+def main(repeats=(1, 5, 20, 50), number=20):
+    """Compare the former loop with ``bands_distance`` for increasingly dense paths."""
+    pw_bands = load_bands("W", "pw.json")
+    wan_bands = load_bands("W", "w90.json")
+
+    print(
+        f"{'num_k':>7s} {'former (ms)':>12s} {'new (ms)':>9s} {'speed-up':>9s} "
+        f"{'reused (ms)':>12s} {'speed-up':>9s}"
+    )
+    for repeat in repeats:
+        dft_bands = np.tile(pw_bands, (repeat, 1))
+        wannier_bands = np.tile(wan_bands, (repeat, 1))
+        args = (dft_bands, wannier_bands, FERMI_ENERGY, EXCLUDE_LIST_DFT)
+        reference = get_reference_bands(dft_bands, FERMI_ENERGY, EXCLUDE_LIST_DFT)
+
+        assert np.allclose(bands_distance_former(*args), bands_distance(*args))
+        assert np.allclose(
+            bands_distance_former(*args),
+            bands_distance(reference, wannier_bands, FERMI_ENERGY),
+        )
+
+        # Interleave the timings, so the machine load affects all of them
+        times = np.zeros(3)
+        for _ in range(number):
+            times[0] += timeit.timeit(
+                lambda args=args: bands_distance_former(*args), number=1
+            )
+            times[1] += timeit.timeit(lambda args=args: bands_distance(*args), number=1)
+            times[2] += timeit.timeit(
+                lambda reference=reference, wannier_bands=wannier_bands: bands_distance(
+                    reference, wannier_bands, FERMI_ENERGY
+                ),
+                number=1,
+            )
+        times *= 1e3 / number
+        print(
+            f"{dft_bands.shape[0]:7d} {times[0]:12.3f} {times[1]:9.3f} "
+            f"{times[0] / times[1]:9.1f} {times[2]:12.3f} {times[0] / times[2]:9.1f}"
+        )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,56 @@
+#!/usr/bin/env python
+"""Benchmark the generation of explicit kpoints of ``get_explicit_kpoints``."""
+import timeit
+
+import numpy as np
+
+from aiida import load_profile, orm
+
+from aiida_wannier90_workflows.utils.kpoints import get_explicit_kpoints
+
+load_profile()
+
+
+def get_explicit_kpoints_loop(kmesh: orm.KpointsData) -> orm.KpointsData:
+    """Generate the kpoints with nested loops, the former implementation."""
+    mesh = kmesh.get_kpoints_mesh()[0]
+    totpts = np.prod(mesh)
+    weights = np.ones([totpts]) / totpts
+
+    kpoints = np.zeros([totpts, 3])
+    ind = 0
+    for x in range(mesh[0]):
+        for y in range(mesh[1]):
+            for z in range(mesh[2]):
+                kpoints[ind, :] = [x / mesh[0], y / mesh[1], z / mesh[2]]
+                ind += 1
+    klist = orm.KpointsData()
+    klist.set_kpoints(kpoints=kpoints, cartesian=False, weights=weights)
+    return klist
+
+
+def main(sizes=(4, 8, 12, 16, 24, 32), number=5):
+    """Compare the nested loops with ``get_explicit_kpoints`` for cubic meshes."""
+    print(f"{'mesh':>10s} {'loop (ms)':>12s} {'vectorized (ms)':>16s} {'speed-up':>9s}")
+    for size in sizes:
+        mesh = [size, size, size]
+        kmesh = orm.KpointsData()
+        kmesh.set_kpoints_mesh(mesh)
+
+        explicit = get_explicit_kpoints(kmesh).get_kpoints()
+        assert np.array_equal(explicit, get_explicit_kpoints_loop(kmesh).get_kpoints())
+
+        time_loop = timeit.timeit(
+            lambda kmesh=kmesh: get_explicit_kpoints_loop(kmesh), number=number
+        )
+        time_vectorized = timeit.timeit(
+            lambda kmesh=kmesh: get_explicit_kpoints(kmesh), number=number
+        )
+        print(
+            f"{'x'.join(map(str, mesh)):>10s} {time_loop / number * 1e3:12.2f} "
+            f"{time_vectorized / number * 1e3:16.2f} {time_loop / time_vectorized:9.1f}"
+        )
+
+
+if __name__ == "__main__":
+    main()
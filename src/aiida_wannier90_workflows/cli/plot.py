@@ -24,15 +24,22 @@ def cmd_plot():
     default=False,
     help="save as a PNG instead of showing matplotlib window",
 )
+@click.option(
+    "-c",
+    "--use-cache",
+    is_flag=True,
+    default=False,
+    help="reuse the fitting cached in the extras of the projections, and cache it if missing",
+)
 @decorators.with_dbenv()
-def cmd_plot_scdm(workchain, save):
+def cmd_plot_scdm(workchain, save, use_cache):
     """Plot SCDM projectability fitting.
 
     WORKCHAIN is the identifier of a Wannier90WorkChain.
     """
     from aiida_wannier90_workflows.utils.workflows.plot.bands import plot_scdm_fit
 
-    plot_scdm_fit(workchain, save)
+    plot_scdm_fit(workchain, save, use_cache=use_cache)
 
 
 @cmd_plot.command("band")
@@ -1,5 +1,6 @@
 #!/usr/bin/env python
 """Functions to calculate bands distance."""
+import functools
 import typing as ty
 
 import numpy as np
@@ -17,6 +18,37 @@ def gaussian(energy: np.array, mu: float, sigma: float) -> np.array:
     return np.exp(-((energy - mu) ** 2) / (2 * sigma**2))
 
 
+def fermi_dirac_multi_mu(
+    energy: np.array, mu_range: np.array, sigma: float
+) -> ty.Iterator[np.array]:
+    """Yield the Fermi-Dirac distribution function for each ``mu`` in ``mu_range``.
+
+    ``exp((energy - mu) / sigma)`` is only evaluated for the first ``mu``, the next
+    ones rescale it by ``exp((mu_0 - mu) / sigma)``. The exponential is evaluated
+    again once ``mu`` moves too far away, so the rescaling cannot overflow.
+    The same array is yielded for all the ``mu``, i.e. it is overwritten at each step.
+    """
+    exp_0 = np.empty_like(energy, dtype=float)
+    weight = np.empty_like(exp_0)
+    mu_0 = None
+    for mu in mu_range:
+        if mu_0 is None or abs(mu - mu_0) > _MAX_RESCALE * sigma:
+            mu_0 = mu
+            np.subtract(energy, mu_0, out=exp_0)
+            exp_0 /= sigma
+            np.exp(exp_0, out=exp_0)
+            np.add(exp_0, 1.0, out=weight)
+        else:
+            np.multiply(exp_0, np.exp((mu_0 - mu) / sigma), out=weight)
+            weight += 1.0
+        np.reciprocal(weight, out=weight)
+        yield weight
+
+
+# The largest ``|mu - mu_0| / sigma`` of the rescaling in ``fermi_dirac_multi_mu``
+_MAX_RESCALE = 300
+
+
 def compute_lower_cutoff(energy: np.array, lower_cutoff: float) -> np.array:
     """Return a mask to remove eigenvalues smaller equal than ``lower_cutoff``."""
     if lower_cutoff is None:
@@ -24,6 +56,173 @@ def compute_lower_cutoff(energy: np.array, lower_cutoff: float) -> np.array:
     return np.array(energy > lower_cutoff, dtype=int)
 
 
+# Bands with weights smaller than this are skipped in the bands distance, the
+# contribution is negligible w.r.t. double precision.
+PRUNE_TOLERANCE = 1e-16
+
+# The bands are only pruned if at least this fraction of them can be skipped, and
+# if there are at least this number of eigenvalues, otherwise the pruning costs
+# more than it saves.
+PRUNE_MIN_FRACTION = 0.25
+PRUNE_MIN_SIZE = 20000
+
+
+def get_keep_bands(num_bands: int, exclude_list_dft: list = None) -> np.array:
+    """Return the 0-based indexes of the bands not in ``exclude_list_dft``.
+
+    :param num_bands: number of DFT bands.
+    :param exclude_list_dft: if passed should be a list of the excluded bands,
+       1-indexed
+    """
+    if exclude_list_dft is None:
+        return np.arange(num_bands)
+
+    # Code taken and *adapted* from the workflow (function get_exclude_bands)
+    xb_startzero_set = {idx - 1 for idx in exclude_list_dft}
+    # in Fortran/W90: 1-based; in py: 0-based
+    return np.array(
+        [idx for idx in range(num_bands) if idx not in xb_startzero_set], dtype=int
+    )
+
+
+def get_bands_to_compare(
+    dft_bands: np.array,
+    wannier_bands: np.array,
+    exclude_list_dft: list = None,
+) -> ty.Tuple[np.array, np.array]:
+    """Remove excluded DFT bands and truncate both arrays to the same number of bands.
+
+    :param dft_bands: a numpy array of size (num_k x num_dft). In eV.
+    :param wannier_bands: a numpy array of size (num_k x num_wan), or a stack of
+       size (num_candidates x num_k x num_wan). In eV.
+    :param exclude_list_dft: if passed should be a list of the excluded bands,
+       1-indexed
+    :return: the DFT and Wannier bands to compare, the last dimension of both is num_bands.
+    """
+    if exclude_list_dft is None:
+        dft_bands_filtered = dft_bands
+    else:
+        keep_bands = get_keep_bands(dft_bands.shape[1], exclude_list_dft)
+        dft_bands_filtered = dft_bands[:, keep_bands]
+
+    # Check that the number of kpoints is the same
+    assert (
+        dft_bands_filtered.shape[0] == wannier_bands.shape[-2]
+    ), f"Different number of kpoints {dft_bands_filtered.shape[0]} {wannier_bands.shape[-2]}"
+    # assert dft_bands_filtered.shape[1] >= wannier_bands.shape[
+    #     1], f'Too few DFT bands w.r.t. Wannier {dft_bands_filtered.shape[1]} {wannier_bands.shape[1]}'
+    if dft_bands_filtered.shape[1] <= wannier_bands.shape[-1]:
+        wannier_bands_filtered = wannier_bands[..., : dft_bands_filtered.shape[1]]
+    else:
+        wannier_bands_filtered = wannier_bands
+
+    dft_bands_to_compare = dft_bands_filtered[:, : wannier_bands_filtered.shape[-1]]
+
+    return dft_bands_to_compare, wannier_bands_filtered
+
+
+def _get_weight_bound(
+    dft_bands: np.array,
+    wannier_bands: np.array,
+    mu: np.array,
+    sigma: float,
+    gaussian_weight: bool = False,
+) -> np.array:
+    """Return an upper bound of the weight of each band, of size (num_mu x num_bands)."""
+    bounds = []
+    for bands in (dft_bands, wannier_bands):
+        bands = bands.reshape(-1, bands.shape[-1])
+        band_min = np.min(bands, axis=0)
+        if gaussian_weight:
+            band_max = np.max(bands, axis=0)
+            # The closest energy to mu in each band
+            closest = np.minimum(np.maximum(mu, band_min), band_max)
+            bounds.append(gaussian(closest, mu, sigma))
+        else:
+            # Fermi-Dirac is decreasing, so the lowest energy has the largest weight
+            bounds.append(fermi_dirac(band_min, mu, sigma))
+
+    return np.sqrt(bounds[0] * bounds[1])
+
+
+def get_pruned_bands(  # pylint: disable=too-many-arguments
+    dft_bands: np.array,
+    wannier_bands: np.array,
+    mu: ty.Union[float, np.array],
+    sigma: float,
+    lower_cutoff: float = None,
+    gaussian_weight: bool = False,
+    tolerance: float = PRUNE_TOLERANCE,
+) -> np.array:
+    """Return the indexes of the bands whose weight is not negligible.
+
+    An upper bound of the weight of each band (column) is estimated from the
+    min/max energies of the band, so the bands far above ``mu`` (or far from
+    ``mu`` for gaussian weight) can be dropped before computing the weights.
+    The cut is relative to a lower bound of the true largest weight, i.e. the
+    exact weights of the band with the largest upper bound, so the dropped bands
+    are negligible even when the upper bounds are very loose.
+
+    The pruning is skipped, i.e. all the bands are returned, for less than
+    ``PRUNE_MIN_SIZE`` eigenvalues, or if less than ``PRUNE_MIN_FRACTION`` of the
+    bands can be dropped. The latter is first estimated from a few kpoints, so
+    when nothing can be dropped the check is much cheaper than the weights.
+
+    :param dft_bands: a numpy array of size (num_k x num_bands). In eV.
+    :param wannier_bands: a numpy array of size (... x num_k x num_bands). In eV.
+    :param mu: in eV, a float or a 1D array, a band is kept if its weight can be
+        larger than ``tolerance`` for any of the ``mu``.
+    :param sigma: in eV.
+    :param lower_cutoff: the eigenvalues smaller equal than ``lower_cutoff`` have
+        zero weight, the bands which are completely below it are also dropped.
+    :param gaussian_weight: if True, gaussian weight will be used instead of
+        Fermi-Dirac
+    :param tolerance: a band is dropped if its weight is smaller than ``tolerance``
+        times the largest weight, defaults to ``PRUNE_TOLERANCE``.
+    """
+    num_bands = dft_bands.shape[1]
+    all_bands = np.arange(num_bands)
+    if dft_bands.size < PRUNE_MIN_SIZE:
+        return all_bands
+
+    weight_func = gaussian if gaussian_weight else fermi_dirac
+    mu = np.atleast_1d(mu)[:, np.newaxis]
+
+    # The weights are at most 1, so only the bands with a bound smaller than
+    # `tolerance` can be dropped. The bound from a subset of the kpoints is smaller
+    # than the true one, so it can only overrate the number of bands to drop.
+    step = max(1, dft_bands.shape[0] // 32)
+    for weight_bound in (
+        _get_weight_bound(
+            dft_bands[::step], wannier_bands[..., ::step, :], mu, sigma, gaussian_weight
+        ),
+        _get_weight_bound(dft_bands, wannier_bands, mu, sigma, gaussian_weight),
+    ):
+        droppable = np.max(weight_bound, axis=0) < tolerance
+        if np.count_nonzero(droppable) < PRUNE_MIN_FRACTION * num_bands:
+            return all_bands
+
+    if lower_cutoff is None:
+        lower_cutoff = -np.inf
+    # The bands completely below the lower cutoff
+    weight_bound[:, np.max(dft_bands, axis=0) <= lower_cutoff] = 0
+
+    # Relative to the largest weight, in case all the weights are small. The exact
+    # weights of the band with the largest bound give a lower bound of the largest
+    # weight, for each mu and each stacked Wannier bands.
+    top = np.argmax(weight_bound, axis=1)
+    top_weight = np.sqrt(
+        weight_func(dft_bands[:, top], mu[:, 0], sigma)
+        * weight_func(wannier_bands[..., top], mu[:, 0], sigma)
+    ) * (dft_bands[:, top] > lower_cutoff)
+    top_weight = top_weight.reshape(-1, *top_weight.shape[-2:])
+    max_weight = np.min(np.max(top_weight, axis=1), axis=0)[:, np.newaxis]
+    keep = np.any(weight_bound >= tolerance * max_weight, axis=0)
+    keep &= np.any(weight_bound > 0, axis=0)
+
+    return all_bands[keep]
+
+
 def bands_distance_raw(  # pylint: disable=too-many-arguments,too-many-locals
     dft_bands: np.array,
     wannier_bands: np.array,
@@ -32,6 +231,8 @@ def bands_distance_raw(  # pylint: disable=too-many-arguments,too-many-locals
     exclude_list_dft: list = None,
     lower_cutoff: float = None,
     gaussian_weight: bool = False,
+    chunk_size: int = None,
+    dtype: np.dtype = None,
 ) -> tuple:
     """Calculate bands distance with specified ``mu`` and ``sigma``.
 
@@ -44,51 +245,52 @@ def bands_distance_raw(  # pylint: disable=too-many-arguments,too-many-locals
        1-indexed
     :param gaussian_weight: if True, gaussian weight will be used instead of
         Fermi-Dirac
+    :param chunk_size: if passed, walk the kpoints in chunks of ``chunk_size``
+        and accumulate the results, so the peak memory does not depend on the
+        number of kpoints. Useful for dense kpoint paths.
+    :param dtype: only used with ``chunk_size``, e.g. ``np.float32`` to further
+        halve the memory of the temporary arrays. The sums are always accumulated
+        in double precision.
     """
-    if exclude_list_dft is None:
-        exclude_list_dft = []
-        dft_bands_filtered = dft_bands
-    else:
-        # Code taken and *adapted* from the workflow (function get_exclude_bands)
-        xb_startzero_set = {idx - 1 for idx in exclude_list_dft}
-        # in Fortran/W90: 1-based; in py: 0-based
-        keep_bands = np.array(
-            [idx for idx in range(dft_bands.shape[1]) if idx not in xb_startzero_set]
+    if chunk_size is not None:
+        return _bands_distance_raw_chunked(
+            dft_bands,
+            wannier_bands,
+            mu,
+            sigma,
+            exclude_list_dft=exclude_list_dft,
+            lower_cutoff=lower_cutoff,
+            gaussian_weight=gaussian_weight,
+            chunk_size=chunk_size,
+            dtype=dtype,
         )
 
-        dft_bands_filtered = dft_bands[:, keep_bands]
-
-    # Check that the number of kpoints is the same
-    assert (
-        dft_bands_filtered.shape[0] == wannier_bands.shape[0]
-    ), f"Different number of kpoints {dft_bands_filtered.shape[0]} {wannier_bands.shape[0]}"
-    # assert dft_bands_filtered.shape[1] >= wannier_bands.shape[
-    #     1], f'Too few DFT bands w.r.t. Wannier {dft_bands_filtered.shape[1]} {wannier_bands.shape[1]}'
-    if dft_bands_filtered.shape[1] <= wannier_bands.shape[1]:
-        wannier_bands_filtered = wannier_bands[:, : dft_bands_filtered.shape[1]]
-    else:
-        wannier_bands_filtered = wannier_bands
-
-    dft_bands_to_compare = dft_bands_filtered[:, : wannier_bands_filtered.shape[1]]
-
-    bands_energy_difference = dft_bands_to_compare - wannier_bands_filtered
-    if gaussian_weight:
-        bands_weight_dft = gaussian(
-            dft_bands_to_compare, mu, sigma
-        ) * compute_lower_cutoff(dft_bands_to_compare, lower_cutoff)
-        bands_weight_wannier = gaussian(
-            wannier_bands_filtered, mu, sigma
-        ) * compute_lower_cutoff(dft_bands_to_compare, lower_cutoff)
-    else:
-        bands_weight_dft = fermi_dirac(
-            dft_bands_to_compare, mu, sigma
-        ) * compute_lower_cutoff(dft_bands_to_compare, lower_cutoff)
-        bands_weight_wannier = fermi_dirac(
-            wannier_bands_filtered, mu, sigma
-        ) * compute_lower_cutoff(dft_bands_to_compare, lower_cutoff)
-
-    bands_weight = np.sqrt(bands_weight_dft * bands_weight_wannier)
-    arr = bands_energy_difference**2 * bands_weight
+    dft_bands_to_compare, wannier_bands_filtered = get_bands_to_compare(
+        dft_bands, wannier_bands, exclude_list_dft
+    )
+
+    # Skip the bands which have negligible weights
+    pruned_bands = get_pruned_bands(
+        dft_bands_to_compare,
+        wannier_bands_filtered,
+        mu,
+        sigma,
+        lower_cutoff=lower_cutoff,
+        gaussian_weight=gaussian_weight,
+    )
+    is_pruned = 0 < len(pruned_bands) < dft_bands_to_compare.shape[1]
+    if is_pruned:
+        dft_bands_to_compare = dft_bands_to_compare[:, pruned_bands]
+        wannier_bands_filtered = wannier_bands_filtered[:, pruned_bands]
+
+    bands_weight, arr, arr_2 = _get_weighted_differences(
+        dft_bands_to_compare,
+        wannier_bands_filtered,
+        mu,
+        sigma,
+        lower_cutoff=lower_cutoff,
+        gaussian_weight=gaussian_weight,
+    )
     bands_dist = np.sqrt(np.sum(arr) / np.sum(bands_weight))
 
     # max distance
@@ -96,16 +298,418 @@ def bands_distance_raw(  # pylint: disable=too-many-arguments,too-many-locals
     max_dist_loc = np.unravel_index(np.argmax(arr, axis=None), arr.shape)
     # print(np.shape(arr), max_distance_loc)
 
-    arr_2 = np.abs(bands_energy_difference) * bands_weight
     # max abs difference
     max_dist_2 = np.max(arr_2)
     max_dist_2_loc = np.unravel_index(np.argmax(arr_2, axis=None), arr_2.shape)
 
+    if is_pruned:
+        # Map back to the band indexes before pruning. If all the values are zero,
+        # `np.argmax` returns the first element, i.e. (0, 0) before pruning.
+        if max_dist > 0:
+            max_dist_loc = (max_dist_loc[0], pruned_bands[max_dist_loc[1]])
+        else:
+            max_dist_loc = (0, 0)
+        if max_dist_2 > 0:
+            max_dist_2_loc = (max_dist_2_loc[0], pruned_bands[max_dist_2_loc[1]])
+        else:
+            max_dist_2_loc = (0, 0)
+
     return (bands_dist, max_dist, max_dist_2, max_dist_loc, max_dist_2_loc)
 
 
-def bands_distance(
+def _get_weighted_differences(  # pylint: disable=too-many-arguments
+    dft_bands: np.array,
+    wannier_bands: np.array,
+    mu: float,
+    sigma: float,
+    lower_cutoff: float = None,
+    gaussian_weight: bool = False,
+) -> ty.Tuple[np.array, np.array, np.array]:
+    """Return the weights, and the weighted squared and absolute differences of the bands.
+
+    All the arrays have the floating point dtype of the bands: the lower cutoff is a
+    boolean mask, and ``mu`` and ``sigma`` are cast to the dtype, so that e.g. float32
+    bands are never promoted to float64.
+    """
+    dtype = np.result_type(dft_bands, wannier_bands, np.float32)
+    mu = dtype.type(mu)
+    sigma = dtype.type(sigma)
+    weight_func = gaussian if gaussian_weight else fermi_dirac
+
+    bands_weight = weight_func(dft_bands, mu, sigma)
+    bands_weight *= weight_func(wannier_bands, mu, sigma)
+    np.sqrt(bands_weight, out=bands_weight)
+    # When `lower_cutoff` is None nothing is removed, see `compute_lower_cutoff`
+    if lower_cutoff is not None:
+        bands_weight *= dft_bands > lower_cutoff
+
+    bands_energy_difference = dft_bands - wannier_bands
+    arr = bands_energy_difference**2
+    arr *= bands_weight
+    arr_2 = np.abs(bands_energy_difference, out=bands_energy_difference)
+    arr_2 *= bands_weight
+
+    return bands_weight, arr, arr_2
+
+
+def _bands_distance_raw_chunked(  # pylint: disable=too-many-arguments,too-many-locals
+    dft_bands: np.array,
+    wannier_bands: np.array,
+    mu: float,
+    sigma: float,
+    exclude_list_dft: list = None,
+    lower_cutoff: float = None,
+    gaussian_weight: bool = False,
+    chunk_size: int = 1024,
+    dtype: np.dtype = None,
+) -> tuple:
+    """Streaming version of ``bands_distance_raw``, see its docstring."""
+    if chunk_size < 1:
+        raise ValueError(f"chunk_size should be positive, got {chunk_size}")
+
+    # Check that the number of kpoints is the same
+    assert (
+        dft_bands.shape[0] == wannier_bands.shape[0]
+    ), f"Different number of kpoints {dft_bands.shape[0]} {wannier_bands.shape[0]}"
+
+    keep_bands = get_keep_bands(dft_bands.shape[1], exclude_list_dft)
+    num_bands = min(len(keep_bands), wannier_bands.shape[1])
+    keep_bands = keep_bands[:num_bands]
+    if dtype is None:
+        dtype = np.result_type(dft_bands, wannier_bands, float)
+
+    sum_arr = 0.0
+    sum_weight = 0.0
+    max_arr = -np.inf
+    max_arr_2 = -np.inf
+    max_dist_loc = None
+    max_dist_2_loc = None
+
+    for start in range(0, dft_bands.shape[0], chunk_size):
+        stop = start + chunk_size
+        # Only the current chunk is filtered, there is no full-size copy
+        bands_weight, arr, arr_2 = _get_weighted_differences(
+            np.asarray(dft_bands[start:stop, keep_bands], dtype=dtype),
+            np.asarray(wannier_bands[start:stop, :num_bands], dtype=dtype),
+            mu,
+            sigma,
+            lower_cutoff=lower_cutoff,
+            gaussian_weight=gaussian_weight,
+        )
+        sum_arr += np.sum(arr, dtype=np.float64)
+        sum_weight += np.sum(bands_weight, dtype=np.float64)
+
+        # Strictly larger, so the first location is kept, same as `np.argmax`
+        idx = np.argmax(arr)
+        if arr.flat[idx] > max_arr:
+            max_arr = arr.flat[idx]
+            loc = np.unravel_index(idx, arr.shape)
+            max_dist_loc = (loc[0] + start, loc[1])
+
+        idx = np.argmax(arr_2)
+        if arr_2.flat[idx] > max_arr_2:
+            max_arr_2 = arr_2.flat[idx]
+            loc = np.unravel_index(idx, arr_2.shape)
+            max_dist_2_loc = (loc[0] + start, loc[1])
+
+    bands_dist = np.sqrt(sum_arr / sum_weight)
+    # max distance
+    max_dist = np.sqrt(max_arr)
+    # max abs difference
+    max_dist_2 = max_arr_2
+
+    return (bands_dist, max_dist, max_dist_2, max_dist_loc, max_dist_2_loc)
+
+
+# The stacked Wannier bands are compared in blocks of about this number of
+# eigenvalues, larger temporary arrays do not fit in the CPU caches and are slower
+# than looping over the candidates.
+BATCH_BLOCK_SIZE = 2**14
+
+
+def get_mu_range(fermi_energy: float) -> np.array:
+    """Return the ``mu`` used by ``bands_distance``, i.e. Ef to Ef+5 with 1 eV step."""
+    # mu_range = np.arange(-60, 40, 0.5)
+    start = fermi_energy
+    stop = fermi_energy + 5
+    # add a small eps to arange stop, so fermi+5 is always included
+    return np.arange(start, stop + 0.0001, 1)
+
+
+class ReferenceBands:
+    """DFT bands preprocessed for comparing with many Wannier bands.
+
+    The excluded bands are removed and the lower cutoff mask is computed once in
+    the constructor, the DFT weights for every ``mu`` in ``mu_range`` are computed
+    at the first comparison, so that ``distance`` only needs to compute the
+    Wannier-side weights.
+    """
+
+    def __init__(  # pylint: disable=too-many-arguments
+        self,
+        dft_bands: np.array,
+        mu_range: np.array,
+        sigma: float,
+        exclude_list_dft: list = None,
+        lower_cutoff: float = None,
+        gaussian_weight: bool = False,
+    ):
+        """Construct the reference bands.
+
+        :param dft_bands: a numpy array of size (num_k x num_dft). In eV.
+        :param mu_range: a 1D array of ``mu``, in eV.
+        :param sigma: in eV.
+        :param exclude_list_dft: if passed should be a list of the excluded bands,
+           1-indexed
+        :param lower_cutoff: remove eigenvalues smaller equal than ``lower_cutoff``
+        :param gaussian_weight: if True, gaussian weight will be used instead of
+            Fermi-Dirac
+        """
+        self.mu_range = np.atleast_1d(np.asarray(mu_range, dtype=float))
+        self.sigma = sigma
+        self.lower_cutoff = lower_cutoff
+        self.gaussian_weight = gaussian_weight
+
+        self.keep_bands = get_keep_bands(dft_bands.shape[1], exclude_list_dft)
+        # Fancy indexing returns a Fortran-ordered array, which is much slower to
+        # compute the weights with
+        self.bands = np.ascontiguousarray(dft_bands[:, self.keep_bands])
+        self.cutoff = compute_lower_cutoff(self.bands, lower_cutoff).astype(bool)
+        # num_mu x num_k x num_bands, see ``get_weight``
+        self.weight = None
+
+    def get_weight(self, num_bands: int) -> np.array:
+        """Return the DFT weights of the first ``num_bands`` bands for every ``mu``.
+
+        The weights are computed at the first call, the lower cutoff is already applied.
+
+        :param num_bands: the number of compared bands, e.g. the number of Wannier functions.
+        :return: array of size (num_mu x num_k x num_bands).
+        """
+        if self.weight is None or self.weight.shape[-1] < num_bands:
+            bands = np.ascontiguousarray(self.bands[:, :num_bands])
+            cutoff = self.cutoff[:, :num_bands]
+            self.weight = np.empty(self.mu_range.shape + bands.shape)
+            for weight, bands_weight in zip(self.weight, self._iter_weights(bands)):
+                np.multiply(bands_weight, cutoff, out=weight)
+
+        return self.weight[..., :num_bands]
+
+    def _iter_weights(self, bands: np.array) -> ty.Iterator[np.array]:
+        """Yield the weights of ``bands`` for each ``mu`` in ``mu_range``."""
+        if self.gaussian_weight:
+            for mu in self.mu_range:
+                yield gaussian(bands, mu, self.sigma)
+        else:
+            yield from fermi_dirac_multi_mu(bands, self.mu_range, self.sigma)
+
+    def distance(self, wannier_bands: np.array) -> np.array:
+        """Calculate bands distance for all the ``mu`` in ``mu_range``.
+
+        The energy differences are computed once, then the ``mu`` are looped over,
+        so the temporary arrays have the size of the Wannier bands. A stack of
+        Wannier bands is split in blocks of about ``BATCH_BLOCK_SIZE`` eigenvalues,
+        and all the candidates of a block are computed at once for each ``mu``,
+        broadcasting the shared DFT weights.
+
+        :param wannier_bands: a numpy array of size (num_k x num_wan), or a stack of
+           size (num_candidates x num_k x num_wan). In eV.
+        :return: array of size (num_mu x 4), each row is
+            mu, bands distance, max distance, max abs difference.
+            For a stack of Wannier bands, the size is (num_candidates x num_mu x 4).
+        """
+        # Check that the number of kpoints is the same
+        assert (
+            self.bands.shape[0] == wannier_bands.shape[-2]
+        ), f"Different number of kpoints {self.bands.shape[0]} {wannier_bands.shape[-2]}"
+
+        if wannier_bands.ndim == 2:
+            return self._distance(wannier_bands)
+
+        stack = wannier_bands.reshape(-1, *wannier_bands.shape[-2:])
+        block = max(1, BATCH_BLOCK_SIZE // stack[0].size)
+        dist = np.concatenate(
+            [self._distance(stack[i : i + block]) for i in range(0, len(stack), block)]
+        )
+        return dist.reshape(wannier_bands.shape[:-2] + dist.shape[-2:])
+
+    def _distance(self, wannier_bands: np.array) -> np.array:
+        """Calculate bands distance of Wannier bands of size (... x num_k x num_wan)."""
+        num_bands = min(self.bands.shape[1], wannier_bands.shape[-1])
+        dft_bands_to_compare = self.bands[:, :num_bands]
+        bands_weight_dft = self.get_weight(num_bands)
+        wannier_bands_filtered = wannier_bands[..., :num_bands]
+
+        # Skip the bands which have negligible weights for all the mu and candidates
+        pruned_bands = get_pruned_bands(
+            dft_bands_to_compare,
+            wannier_bands_filtered,
+            self.mu_range,
+            self.sigma,
+            lower_cutoff=self.lower_cutoff,
+            gaussian_weight=self.gaussian_weight,
+        )
+        if 0 < len(pruned_bands) < num_bands:
+            # Keep the C order of the DFT weights, fancy indexing returns Fortran order
+            dft_bands_to_compare = np.ascontiguousarray(
+                dft_bands_to_compare[:, pruned_bands]
+            )
+            bands_weight_dft = np.ascontiguousarray(bands_weight_dft[..., pruned_bands])
+            wannier_bands_filtered = np.ascontiguousarray(
+                wannier_bands_filtered[..., pruned_bands]
+            )
+
+        # Of size (... x num_k x num_bands), the DFT bands are broadcast
+        bands_energy_difference = dft_bands_to_compare - wannier_bands_filtered
+        squared_difference = bands_energy_difference**2
+        abs_difference = np.abs(bands_energy_difference, out=bands_energy_difference)
+
+        # Reduce over the kpoints and bands, one value per candidate
+        axis = (-2, -1)
+        dist = np.empty(wannier_bands.shape[:-2] + (len(self.mu_range), 4))
+        dist[..., 0] = self.mu_range
+        arr = np.empty_like(squared_difference)
+        for i, bands_weight in enumerate(self._iter_weights(wannier_bands_filtered)):
+            # The DFT weights already contain the lower cutoff
+            bands_weight *= bands_weight_dft[i]
+            np.sqrt(bands_weight, out=bands_weight)
+            np.multiply(squared_difference, bands_weight, out=arr)
+            # bands distance
+            dist[..., i, 1] = np.sqrt(
+                np.sum(arr, axis=axis) / np.sum(bands_weight, axis=axis)
+            )
+            # max distance
+            dist[..., i, 2] = np.sqrt(np.max(arr, axis=axis))
+            # max abs difference
+            dist[..., i, 3] = np.max(
+                np.multiply(abs_difference, bands_weight, out=arr), axis=axis
+            )
+
+        return dist
+
+
+def bands_distance_multi_mu(  # pylint: disable=too-many-arguments
+    dft_bands: np.array,
+    wannier_bands: np.array,
+    mu_range: np.array,
+    sigma: float,
+    exclude_list_dft: list = None,
+    lower_cutoff: float = None,
+    gaussian_weight: bool = False,
+) -> np.array:
+    """Calculate bands distance for all the ``mu`` in ``mu_range`` at once.
+
+    Equivalent to calling ``bands_distance_raw`` for each ``mu``, but the band
+    filtering, the lower cutoff mask and the energy differences are computed only
+    once, see ``ReferenceBands``.
+
+    ``wannier_bands`` can also be a stack of candidates, e.g. Wannier-interpolated
+    bands of different ``dis_proj_min/max``; then the DFT weights are shared by
+    all the candidates.
+
+    :param dft_bands: a numpy array of size (num_k x num_dft). In eV.
+    :param wannier_bands: a numpy array of size (num_k x num_wan), or a stack of
+       size (num_candidates x num_k x num_wan). In eV.
+    :param mu_range: a 1D array of ``mu``, in eV.
+    :param sigma: in eV.
+    :param exclude_list_dft: if passed should be a list of the excluded bands,
+       1-indexed
+    :param gaussian_weight: if True, gaussian weight will be used instead of
+        Fermi-Dirac
+    :return: array of size (num_mu x 4), each row is
+        mu, bands distance, max distance, max abs difference.
+        For a stack of Wannier bands, the size is (num_candidates x num_mu x 4).
+    """
+    reference = ReferenceBands(
+        dft_bands,
+        mu_range=mu_range,
+        sigma=sigma,
+        exclude_list_dft=exclude_list_dft,
+        lower_cutoff=lower_cutoff,
+        gaussian_weight=gaussian_weight,
+    )
+    return reference.distance(wannier_bands)
+
+
+def _build_reference_bands(
+    dft_bands: np.array,
+    fermi_energy: float,
+    exclude_list_dft: list = None,
+    gaussian_weight: bool = False,
+) -> ReferenceBands:
+    """Build the ``ReferenceBands`` with the settings of ``bands_distance``."""
+    mu_range = get_mu_range(fermi_energy)
+    # for gaussian weight only mu = fermi_energy is computed, see ``bands_distance``
+    if gaussian_weight:
+        mu_range = mu_range[:1]
+
+    return ReferenceBands(
+        dft_bands,
+        mu_range=mu_range,
+        sigma=0.1,
+        exclude_list_dft=exclude_list_dft,
+        lower_cutoff=-30,
+        gaussian_weight=gaussian_weight,
+    )
+
+
+# Each cached ``ReferenceBands`` keeps its DFT weights, i.e. num_mu x num_k x num_bands
+# floats, ~35 MB for 7400 kpoints x 100 bands, so only the latest ones are kept.
+# Comparisons against many DFT bands should reuse their own ``ReferenceBands``.
+@functools.lru_cache(maxsize=2)
+def _get_reference_bands_cached(
+    uuid: str,
+    fermi_energy: float,
+    exclude_list_dft: ty.Optional[tuple],
+    gaussian_weight: bool,
+) -> ReferenceBands:
+    """Load a stored ``BandsData`` and build its ``ReferenceBands``, memoized by UUID."""
+    dft_bands = orm.load_node(uuid).get_bands()
+    if exclude_list_dft is not None:
+        exclude_list_dft = list(exclude_list_dft)
+
+    return _build_reference_bands(
+        dft_bands, fermi_energy, exclude_list_dft, gaussian_weight
+    )
+
+
+def get_reference_bands(
     bands_dft: ty.Union[orm.BandsData, np.array],
+    fermi_energy: float,
+    exclude_list_dft: list = None,
+    gaussian_weight: bool = False,
+) -> ReferenceBands:
+    """Return the ``ReferenceBands`` used by ``bands_distance``.
+
+    For a stored ``BandsData`` the result is memoized by node UUID, so comparing
+    many Wannier bands against the same DFT bands only reads the repository and
+    computes the DFT weights once. Only the two latest DFT bands are memoized,
+    since the weights are large for dense kpoint paths.
+
+    :param bands_dft: the reference DFT bands.
+    :param fermi_energy: in eV.
+    :param exclude_list_dft: 1-indexed excluded bands, defaults to None
+    :param gaussian_weight: if True, gaussian weight will be used instead of
+        Fermi-Dirac
+    """
+    if isinstance(bands_dft, orm.BandsData):
+        if bands_dft.is_stored:
+            if exclude_list_dft is not None:
+                exclude_list_dft = tuple(exclude_list_dft)
+            return _get_reference_bands_cached(
+                bands_dft.uuid, float(fermi_energy), exclude_list_dft, gaussian_weight
+            )
+        dft_bands = bands_dft.get_bands()
+    else:
+        dft_bands = bands_dft
+
+    return _build_reference_bands(
+        dft_bands, fermi_energy, exclude_list_dft, gaussian_weight
+    )
+
+
+def bands_distance(
+    bands_dft: ty.Union[orm.BandsData, ReferenceBands, np.array],
     bands_wannier: ty.Union[orm.BandsData, np.array],
     fermi_energy: float,
     exclude_list_dft: list = None,
@@ -113,49 +717,205 @@ def bands_distance(
 ) -> np.array:
     """Calculate bands distance with ``mu`` set as Ef to Ef+5.
 
-    :param bands_dft: [description]
+    :param bands_dft: [description], can also be a ``ReferenceBands`` returned
+        by ``get_reference_bands``, then ``exclude_list_dft`` and ``gaussian_weight``
+        are ignored.
     :param bands_wannier: [description]
-    :param fermi_energy: [description]
+    :param fermi_energy: [description], must be the one of the ``ReferenceBands``.
     :param exclude_list_dft: [description], defaults to None
+    :raises ValueError: if ``fermi_energy`` differs from the one of the ``ReferenceBands``.
     :return: [description], unit is eV.
     """
-    if isinstance(bands_dft, orm.BandsData):
-        dft_bands = bands_dft.get_bands()
-    else:
-        dft_bands = bands_dft
     if isinstance(bands_wannier, orm.BandsData):
         wannier_bands = bands_wannier.get_bands()
     else:
         wannier_bands = bands_wannier
 
-    # mu_range = np.arange(-60, 40, 0.5)
-    start = fermi_energy
-    stop = fermi_energy + 5
-    # add a small eps to arange stop, so fermi+5 is always included
-    mu_range = np.arange(start, stop + 0.0001, 1)
+    return _bands_distance_from_reference(
+        bands_dft, wannier_bands, fermi_energy, exclude_list_dft, gaussian_weight
+    )
 
-    dist = np.full((len(mu_range), 4), np.nan)
-    for i, mu in enumerate(mu_range):
-        res = bands_distance_raw(
-            dft_bands=dft_bands,
-            wannier_bands=wannier_bands,
-            exclude_list_dft=exclude_list_dft,
-            mu=mu,
-            sigma=0.1,
-            lower_cutoff=-30,
-            gaussian_weight=gaussian_weight,
+
+def bands_distance_batch(
+    bands_dft: ty.Union[orm.BandsData, ReferenceBands, np.array],
+    bands_wannier: ty.Union[ty.Sequence[orm.BandsData], np.array],
+    fermi_energy: float,
+    exclude_list_dft: list = None,
+    gaussian_weight: bool = False,
+) -> np.array:
+    """Calculate bands distance of many Wannier bands w.r.t. the same DFT bands.
+
+    Same as calling ``bands_distance`` for each of the ``bands_wannier``, but the
+    DFT weights are computed once and all the candidates are evaluated together,
+    i.e. one vectorized pass per ``mu``.
+
+    :param bands_dft: the reference DFT bands, or a ``ReferenceBands``, see ``bands_distance``.
+    :param bands_wannier: a list of ``BandsData`` on the same kpoints, or a numpy
+        array of size (num_candidates x num_k x num_wan).
+    :param fermi_energy: in eV.
+    :param exclude_list_dft: 1-indexed excluded bands, defaults to None
+    :return: array of size (num_candidates x num_mu x 4), unit is eV.
+    """
+    if isinstance(bands_wannier, np.ndarray):
+        wannier_bands = bands_wannier
+    else:
+        wannier_bands = np.stack(
+            [
+                _.get_bands() if isinstance(_, orm.BandsData) else np.asarray(_)
+                for _ in bands_wannier
+            ]
+        )
+
+    return _bands_distance_from_reference(
+        bands_dft, wannier_bands, fermi_energy, exclude_list_dft, gaussian_weight
+    )
+
+
+def _bands_distance_from_reference(
+    bands_dft: ty.Union[orm.BandsData, ReferenceBands, np.array],
+    wannier_bands: np.array,
+    fermi_energy: float,
+    exclude_list_dft: list = None,
+    gaussian_weight: bool = False,
+) -> np.array:
+    """Compute the Ef to Ef+5 bands distance of ``bands_distance`` and ``bands_distance_batch``."""
+    if isinstance(bands_dft, ReferenceBands):
+        reference = bands_dft
+        # The distances are computed at the ``mu`` of the reference
+        if not np.isclose(reference.mu_range[0], fermi_energy):
+            raise ValueError(
+                f"fermi_energy {fermi_energy} differs from the one of the reference bands "
+                f"{reference.mu_range[0]}, build the reference with `get_reference_bands`"
+            )
+    else:
+        reference = get_reference_bands(
+            bands_dft, fermi_energy, exclude_list_dft, gaussian_weight
         )
-        # mu, bands_distance, max_distance, max_distance_2
-        dist[i, :] = [mu, res[0], res[1], res[2]]
-        # for gaussian weight only dist[0] contains the result for mu = fermi_energy, other rows are nan
-        # this prevents numpy RuntimeWarning warnings due to division by zero
-        # when there are no bands close to the shifted fermi level
-        if gaussian_weight:
-            break
+
+    mu_range = get_mu_range(fermi_energy)
+
+    dist = np.full(wannier_bands.shape[:-2] + (len(mu_range), 4), np.nan)
+    # for gaussian weight only dist[0] contains the result for mu = fermi_energy, other rows are nan
+    # this prevents numpy RuntimeWarning warnings due to division by zero
+    # when there are no bands close to the shifted fermi level
+    num_mu = len(reference.mu_range)
+    dist[..., :num_mu, :] = reference.distance(wannier_bands)
 
     return dist
 
 
+def bands_distance_curve(  # pylint: disable=too-many-arguments,too-many-locals
+    dft_bands: ty.Union[orm.BandsData, np.array],
+    wannier_bands: ty.Union[orm.BandsData, np.array],
+    mu_range: np.array,
+    sigma: float = None,
+    exclude_list_dft: list = None,
+    lower_cutoff: float = -30,
+    tolerance: float = 1e-6,
+) -> np.array:
+    """Calculate bands distance as a function of ``mu`` on a fine grid.
+
+    The weight of a state only depends on ``mu`` through ``max(E_dft, E_wan)``,
+    so all the states are sorted once by this energy and the weighted sums and
+    the maxima are accumulated with cumulative sums.
+
+    If ``sigma`` is None, a step weight is used, i.e. the ``sigma -> 0`` limit of
+    the Fermi-Dirac weight of ``bands_distance_raw``: only the states with both
+    ``E_dft < mu`` and ``E_wan < mu`` are included. Each ``mu`` is then a binary
+    search, i.e. O(N log N + num_mu log N) instead of O(N x num_mu), and the
+    result is exact.
+
+    If ``sigma`` is given, the Fermi-Dirac weight of ``bands_distance_raw`` is used:
+    the states whose weight is within ``tolerance`` of 1 are taken from the
+    cumulative sums with weight 1, the states whose weight is smaller than
+    ``tolerance`` are dropped, and only the states in between, i.e. within a few
+    ``sigma`` of ``mu``, are evaluated explicitly. Therefore the weight of every
+    state has an absolute error smaller than ``tolerance``. The cost is then
+    O(N log N + num_mu x window), where the window is the number of states within
+    about ``2 sigma ln(1 / tolerance)`` of ``mu``; it is only cheaper than
+    ``bands_distance_multi_mu`` if ``sigma`` is small compared with the energy
+    range of the bands.
+
+    :param dft_bands: a numpy array of size (num_k x num_dft). In eV.
+    :param wannier_bands: a numpy array of size (num_k x num_wan). In eV.
+    :param mu_range: a 1D array of ``mu``, in eV, e.g. ``np.arange(ef - 2, ef + 6, 0.01)``.
+    :param sigma: Fermi-Dirac smearing in eV, defaults to None, i.e. step weight.
+    :param exclude_list_dft: if passed should be a list of the excluded bands,
+       1-indexed
+    :param lower_cutoff: remove eigenvalues smaller equal than ``lower_cutoff``
+    :param tolerance: tolerance of the Fermi-Dirac weights, defaults to 1e-6
+    :return: array of size (num_mu x 4), each row is
+        mu, bands distance, max distance, max abs difference.
+    """
+    if isinstance(dft_bands, orm.BandsData):
+        dft_bands = dft_bands.get_bands()
+    if isinstance(wannier_bands, orm.BandsData):
+        wannier_bands = wannier_bands.get_bands()
+
+    dft_bands_to_compare, wannier_bands_filtered = get_bands_to_compare(
+        dft_bands, wannier_bands, exclude_list_dft
+    )
+    mu_range = np.atleast_1d(np.asarray(mu_range, dtype=float))
+
+    # Sort all the states by the energy at which they start to be included
+    energy = np.maximum(dft_bands_to_compare, wannier_bands_filtered).ravel()
+    order = np.argsort(energy, kind="stable")
+    energy = energy[order]
+    dft_energy = dft_bands_to_compare.ravel()[order]
+    wannier_energy = wannier_bands_filtered.ravel()[order]
+    cutoff = compute_lower_cutoff(dft_bands_to_compare, lower_cutoff).ravel()[order]
+    bands_energy_difference = dft_energy - wannier_energy
+
+    # Cumulative sums with weight 1, prepend 0 so index `i` means the first `i` states
+    arr = bands_energy_difference**2 * cutoff
+    arr_2 = np.abs(bands_energy_difference) * cutoff
+    cumsum_arr = np.concatenate([[0.0], np.cumsum(arr)])
+    cumsum_weight = np.concatenate([[0.0], np.cumsum(cutoff)])
+    cummax_arr = np.concatenate([[0.0], np.maximum.accumulate(arr)])
+    cummax_arr_2 = np.concatenate([[0.0], np.maximum.accumulate(arr_2)])
+
+    if sigma is None:
+        idx = np.searchsorted(energy, mu_range, side="left")
+        sum_arr = cumsum_arr[idx]
+        sum_weight = cumsum_weight[idx]
+        max_arr = cummax_arr[idx]
+        max_arr_2 = cummax_arr_2[idx]
+    else:
+        # f(E) >= 1 - tol if E <= mu - sigma * ln((1 - tol) / tol);
+        # sqrt(f(E_dft) * f(E_wan)) <= sqrt(f(max(E_dft, E_wan))) <= tol
+        # if max(E_dft, E_wan) >= mu + sigma * ln((1 - tol^2) / tol^2).
+        lower = sigma * np.log((1 - tolerance) / tolerance)
+        upper = sigma * np.log((1 - tolerance**2) / tolerance**2)
+        idx_lower = np.searchsorted(energy, mu_range - lower, side="right")
+        idx_upper = np.searchsorted(energy, mu_range + upper, side="left")
+
+        sum_arr = cumsum_arr[idx_lower]
+        sum_weight = cumsum_weight[idx_lower]
+        max_arr = cummax_arr[idx_lower]
+        max_arr_2 = cummax_arr_2[idx_lower]
+        for i, mu in enumerate(mu_range):
+            window = slice(idx_lower[i], idx_upper[i])
+            if window.start >= window.stop:
+                continue
+            # exp overflows for the states far above mu, their weight is then 0
+            with np.errstate(over="ignore"):
+                bands_weight = np.sqrt(
+                    fermi_dirac(dft_energy[window], mu, sigma)
+                    * fermi_dirac(wannier_energy[window], mu, sigma)
+                )
+            bands_weight *= cutoff[window]
+            weighted_arr = arr[window] * bands_weight
+            sum_arr[i] += np.sum(weighted_arr)
+            sum_weight[i] += np.sum(bands_weight)
+            max_arr[i] = max(max_arr[i], np.max(weighted_arr))
+            max_arr_2[i] = max(max_arr_2[i], np.max(arr_2[window] * bands_weight))
+
+    with np.errstate(divide="ignore", invalid="ignore"):
+        bands_dist = np.sqrt(sum_arr / sum_weight)
+
+    return np.column_stack([mu_range, bands_dist, np.sqrt(max_arr), max_arr_2])
+
+
 def bands_distance_isolated(  # pylint: disable=too-many-locals
     dft_bands: ty.Union[orm.BandsData, np.array],
     wannier_bands: ty.Union[orm.BandsData, np.array],
@@ -177,31 +937,9 @@ def bands_distance_isolated(  # pylint: disable=too-many-locals
     if isinstance(wannier_bands, orm.BandsData):
         wannier_bands = wannier_bands.get_bands()
 
-    if exclude_list_dft is None:
-        exclude_list_dft = []
-        dft_bands_filtered = dft_bands
-    else:
-        # Code taken and *adapted* from the workflow (function get_exclude_bands)
-        xb_startzero_set = {idx - 1 for idx in exclude_list_dft}
-        # in Fortran/W90: 1-based; in py: 0-based
-        keep_bands = np.array(
-            [idx for idx in range(dft_bands.shape[1]) if idx not in xb_startzero_set]
-        )
-
-        dft_bands_filtered = dft_bands[:, keep_bands]
-
-    # Check that the number of kpoints is the same
-    assert (
-        dft_bands_filtered.shape[0] == wannier_bands.shape[0]
-    ), f"Different number of kpoints {dft_bands_filtered.shape[0]} {wannier_bands.shape[0]}"
-    # assert dft_bands_filtered.shape[1] >= wannier_bands.shape[
-    #     1], f'Too few DFT bands w.r.t. Wannier {dft_bands_filtered.shape[1]} {wannier_bands.shape[1]}'
-    if dft_bands_filtered.shape[1] <= wannier_bands.shape[1]:
-        wannier_bands_filtered = wannier_bands[:, : dft_bands_filtered.shape[1]]
-    else:
-        wannier_bands_filtered = wannier_bands
-
-    dft_bands_to_compare = dft_bands_filtered[:, : wannier_bands_filtered.shape[1]]
+    dft_bands_to_compare, wannier_bands_filtered = get_bands_to_compare(
+        dft_bands, wannier_bands, exclude_list_dft
+    )
 
     bands_energy_difference = dft_bands_to_compare - wannier_bands_filtered
     bands_weight_dft = compute_lower_cutoff(dft_bands_to_compare, lower_cutoff)
@@ -28,13 +28,8 @@ def get_explicit_kpoints(kmesh: orm.KpointsData) -> orm.KpointsData:
     totpts = np.prod(mesh)
     weights = np.ones([totpts]) / totpts
 
-    kpoints = np.zeros([totpts, 3])
-    ind = 0
-    for x in range(mesh[0]):
-        for y in range(mesh[1]):
-            for z in range(mesh[2]):
-                kpoints[ind, :] = [x / mesh[0], y / mesh[1], z / mesh[2]]
-                ind += 1
+    # The last index runs fastest, i.e. the order of nested loops over x, y, z
+    kpoints = cartesian_product(*[np.arange(n) / n for n in mesh])
     klist = orm.KpointsData()
     klist.set_kpoints(kpoints=kpoints, cartesian=False, weights=weights)
     return klist
@@ -95,32 +90,142 @@ def cartesian_product(*arrays: np.ndarray) -> np.ndarray:
     return arr.reshape(-1, la)
 
 
-def get_mesh_from_kpoints(kpoints: orm.KpointsData) -> ty.List:
+def get_open_grid_klist(
+    mesh: ty.Sequence[int], offset: ty.Sequence[float] = (0, 0, 0)
+) -> np.ndarray:
+    """Return the full kmesh in the same order as the one unfolded by ``open_grid.x``.
+
+    ``open_grid.x`` calls ``kpoint_grid`` of QE with ``skip_equivalence``, so the
+    unfolded list does not depend on the symmetry operations: the last axis runs
+    fastest, and each coordinate is folded by subtracting its nearest integer,
+    where Fortran ``NINT`` rounds half away from zero, i.e. 0.5 becomes -0.5.
+
+    :param mesh: N1 * N2 * N3 mesh
+    :param offset: offset in units of the step, as in ``KpointsData.get_kpoints_mesh``
+    :return: num_kpts x 3, in fractional coordinates
+    """
+    kpoints = cartesian_product(*[(np.arange(n) + s) / n for n, s in zip(mesh, offset)])
+    # All the coordinates are non-negative, so NINT is floor(x + 0.5)
+    return kpoints - np.floor(kpoints + 0.5)
+
+
+def is_full_kmesh(
+    klist: np.ndarray,
+    mesh: ty.Sequence[int],
+    offset: ty.Sequence[float] = (0, 0, 0),
+    tolerance: float = 1e-5,
+) -> bool:
+    """Check if an explicit list of kpoints contains every kpoint of a mesh exactly once.
+
+    The kpoints can be in any order and folded into any cell, e.g. the kpoints
+    computed by pw.x, which are the full mesh only if no symmetry reduced it.
+
+    :param klist: num_kpts x 3, in fractional coordinates
+    :param mesh: N1 * N2 * N3 mesh
+    :param offset: offset in units of the step, as in ``KpointsData.get_kpoints_mesh``
+    :param tolerance: maximum deviation from the mesh, in units of the step
+    :return: True if ``klist`` is the full mesh
+    """
+    mesh = np.asarray(mesh, dtype=int)
+    num_kpts = int(np.prod(mesh))
+    klist = np.asarray(klist, dtype=float)
+    if klist.shape != (num_kpts, 3):
+        return False
+
+    indexes = klist * mesh - np.asarray(offset, dtype=float)
+    rounded = np.rint(indexes)
+    if np.max(np.abs(indexes - rounded), initial=0) > tolerance:
+        return False
+
+    flat_indexes = np.ravel_multi_index(
+        (rounded.astype(int) % mesh).T, mesh, mode="wrap"
+    )
+    return np.unique(flat_indexes).size == num_kpts
+
+
+def get_mesh_from_klist(
+    klist: np.ndarray, tolerance: float = 1e-5
+) -> ty.Tuple[ty.List[int], ty.List[float]]:
+    """Recover the mesh of an explicit list of kpoints.
+
+    The kpoints should be in the order of ``cartesian_product`` (or ``kmesh.pl``),
+    i.e. the last axis runs fastest, and can be shifted. The mesh sizes are found
+    from the number of leading kpoints sharing the same coordinates (up to ``tolerance``,
+    e.g. after a conversion from Cartesian coordinates), then each coordinate is snapped
+    onto the integer grid of its step and checked with integer arithmetic, so the kpoints
+    are never sorted nor copied.
+
+    :param klist: num_kpts x 3, in fractional coordinates
+    :param tolerance: maximum deviation from the grid, in units of the step, also the
+        maximum difference between the coordinates considered equal
+    :raises ValueError: if the kpoints are not a mesh
+    :return: mesh, offset in units of the step, as in ``KpointsData.get_kpoints_mesh``
+    """
+    num_kpts = klist.shape[0]
+
+    # Number of leading kpoints sharing the first coordinates, i.e. the product of
+    # the sizes of the remaining axes
+    mesh = []
+    block = num_kpts
+    for i in range(3):
+        inner = np.argmax(np.abs(klist[:block, i] - klist[0, i]) > tolerance) or block
+        if block % inner != 0:
+            raise ValueError(f"The kpoints along axis {i} are not a mesh")
+        mesh.append(int(block // inner))
+        block = inner
+    if block != 1:
+        raise ValueError("There are duplicated kpoints")
+
+    offset = []
+    stride = num_kpts
+    for i in range(3):
+        size = mesh[i]
+        stride //= size
+        kcol = klist[:, i]
+        kmin = kcol[0]
+        if size > 1:
+            step = (kcol[(size - 1) * stride] - kmin) / (size - 1)
+        else:
+            step = 1.0
+        if step <= 0:
+            raise ValueError(f"The kpoints along axis {i} are not in ascending order")
+
+        indexes = np.rint((kcol - kmin) / step).astype(int)
+        if not np.array_equal(indexes, np.arange(num_kpts) // stride % size):
+            raise ValueError(f"The kpoints along axis {i} are not a mesh")
+        if np.max(np.abs(kcol - kmin - indexes * step)) > tolerance * step:
+            raise ValueError(f"The kpoints along axis {i} are not evenly spaced")
+
+        # Round off the floating point noise, and map 1 back to 0
+        offset.append(float(np.round(np.mod(kmin / step, 1), 8) % 1))
+
+    return mesh, offset
+
+
+def get_mesh_from_kpoints(
+    kpoints: orm.KpointsData, return_offset: bool = False
+) -> ty.Union[ty.List, ty.Tuple[ty.List, ty.List]]:
     """From .
 
-    :param kpoints: contains a N1 * N2 * N3 mesh
+    :param kpoints: contains a N1 * N2 * N3 mesh, or an explicit list of kpoints
+        of a (possibly shifted) mesh, see ``get_mesh_from_klist``
+    :param return_offset: also return the offset of the mesh
     :raises AttributeError: if kmesh does not contains a mesh
     :return: an explicit list of kpoints
     """
     try:  # test if it is a mesh
-        mesh, _ = kpoints.get_kpoints_mesh()
+        mesh, offset = kpoints.get_kpoints_mesh()
     except AttributeError as exc:
         klist = kpoints.get_kpoints(also_weights=False, cartesian=False)
-        mesh = [0, 0, 0]
-        kmin = [0, 0, 0]
-        kmax = [0, 0, 0]
-        # 3 directions
-        for i in range(3):
-            uniq_kpt = np.sort(np.unique(klist[:, i]))
-            kmin[i] = uniq_kpt[0]
-            kmax[i] = uniq_kpt[-1]
-            mesh[i] = len(uniq_kpt)
-
-        klist_recovered = cartesian_product(
-            *[np.linspace(kmin[_], kmax[_], mesh[_]) for _ in range(3)]
-        )
-        if not np.allclose(klist, klist_recovered):
-            raise ValueError(f"Cannot convert kpoints {kpoints} to a mesh") from exc
+        try:
+            mesh, offset = get_mesh_from_klist(klist)
+        except ValueError as exc_mesh:
+            raise ValueError(
+                f"Cannot convert kpoints {kpoints} to a mesh: {exc_mesh}"
+            ) from exc
+
+    if return_offset:
+        return mesh, offset
 
     return mesh
 
@@ -1,14 +1,117 @@
 #!/usr/bin/env python
 """Processthe Wannier function centers."""
+import functools
+import numbers
 import typing as ty
 
 import numpy as np
 
 from aiida import orm
+from aiida.engine import calcfunction
 
 from aiida_wannier90.calculations import Wannier90Calculation
 
 
+def get_structure_cell_atoms(
+    structure: orm.StructureData,
+) -> ty.Tuple[np.array, np.array]:
+    """Get the cell and the atomic positions translated back into the cell.
+
+    :param structure: a ``StructureData``.
+    :type structure: orm.StructureData
+    :return: ``cell``, each row is a lattice vector, and ``atoms``, the atomic
+    positions in Cartesian coordinates.
+    :rtype: tuple[np.array, np.array]
+    """
+    from ase.geometry import wrap_positions
+
+    cell = np.array(structure.cell)
+    atoms = np.array([site.position for site in structure.sites])
+    atoms = wrap_positions(atoms, cell, pbc=structure.pbc)
+
+    return cell, atoms
+
+
+def get_wf_outputs_array(wf_outputs: ty.List[dict], key: str) -> np.array:
+    """Collect a quantity of the Wannier functions, ordered by the WF index.
+
+    :param wf_outputs: ``wannier_functions_output`` or ``wannier_functions_initial``
+    of the ``output_parameters`` of a ``Wannier90Calculation``.
+    :type wf_outputs: list
+    :param key: ``wf_centres`` or ``wf_spreads``.
+    :type key: str
+    :return: num_wf x 3 for ``wf_centres``, num_wf for ``wf_spreads``.
+    :rtype: np.array
+    """
+    values = np.array([wf[key] for wf in wf_outputs], dtype=float)
+    wf_ids = [wf["wf_ids"] - 1 for wf in wf_outputs]
+    wf_array = np.zeros_like(values)
+    wf_array[wf_ids] = values
+
+    return wf_array
+
+
+@calcfunction
+def get_wannier_functions_arrays(output_parameters: orm.Dict) -> orm.ArrayData:
+    """Store the final Wannier functions of a ``Wannier90Calculation`` as arrays.
+
+    :param output_parameters: ``output_parameters`` of a ``Wannier90Calculation``.
+    :type output_parameters: orm.Dict
+    :return: ``ids`` (num_wf), ``centres`` (num_wf x 3) and ``spreads`` (num_wf)
+    arrays, sorted by WF index.
+    :rtype: orm.ArrayData
+    """
+    wf_outputs = output_parameters["wannier_functions_output"]
+
+    arrays = orm.ArrayData()
+    arrays.set_array("ids", np.sort([wf["wf_ids"] for wf in wf_outputs]))
+    arrays.set_array(
+        "centres", get_wf_outputs_array(wf_outputs, "wf_centres").reshape(-1, 3)
+    )
+    arrays.set_array("spreads", get_wf_outputs_array(wf_outputs, "wf_spreads"))
+
+    return arrays
+
+
+def get_wf_arrays(
+    node: ty.Union[Wannier90Calculation, orm.WorkChainNode],
+    key: str,
+    initial: bool = False,
+) -> np.array:
+    """Get the ``centres`` or ``spreads`` array of the Wannier functions, sorted by WF index.
+
+    If the node has the ``wannier_functions`` output of a ``Wannier90BaseWorkChain``
+    the array is loaded directly, otherwise it is parsed from ``output_parameters``.
+
+    :param node: a ``Wannier90Calculation``, or a ``Wannier90BaseWorkChain``.
+    :type node: ty.Union[Wannier90Calculation, orm.WorkChainNode]
+    :param key: ``centres`` or ``spreads``.
+    :type key: str
+    :param initial: Get initial or final WF outputs, the initial ones are always
+    parsed from ``output_parameters``.
+    :type initial: bool
+    :return: num_wf x 3 for ``centres``, num_wf for ``spreads``.
+    :rtype: np.array
+    """
+    if key not in ("centres", "spreads"):
+        raise ValueError(f"Unknown key {key}, should be `centres` or `spreads`")
+
+    if not initial and "wannier_functions" in node.outputs:
+        return node.outputs.wannier_functions.get_array(key)
+
+    if initial:
+        wf_outputs_key = "wannier_functions_initial"
+    else:
+        wf_outputs_key = "wannier_functions_output"
+
+    wf_outputs = node.outputs.output_parameters[wf_outputs_key]
+    wf_array = get_wf_outputs_array(wf_outputs, f"wf_{key}")
+    if key == "centres":
+        wf_array = wf_array.reshape(-1, 3)
+
+    return wf_array
+
+
 def get_wf_centers(calculation: Wannier90Calculation, initial: bool = False) -> tuple:
     """Get Wannier function centers.
 
@@ -16,42 +119,24 @@ def get_wf_centers(calculation: Wannier90Calculation, initial: bool = False) ->
     :type calculation: Wannier90Calculation
     :param initial: Get initial or final WF center.
     :type initial: bool
-    :return: ``cell``, ``atoms``, ``wf_centers``. ``atoms`` are the atomic positions,
-    both ``atoms`` and ``wf_centers`` are in Cartesian coordinates and are translated back into the cell.
+    :return: ``cell``, ``atoms``, ``wf_centers``. ``cell`` is an ``ase.cell.Cell``,
+    ``atoms`` are the atomic positions, both ``atoms`` and ``wf_centers`` are in
+    Cartesian coordinates and are translated back into the cell.
     :rtype: tuple
     """
-    import ase
+    from ase.cell import Cell
+    from ase.geometry import wrap_positions
 
     structure = calculation.inputs.structure
 
-    if initial:
-        wf_outputs_key = "wannier_functions_initial"
-    else:
-        wf_outputs_key = "wannier_functions_output"
-
-    wf_outputs = calculation.outputs.output_parameters[wf_outputs_key]
-    wf_centers = np.zeros(shape=(len(wf_outputs), 3))
-    for wf in wf_outputs:  # pylint: disable=invalid-name
-        wf_id = wf["wf_ids"] - 1
-        wf_centers[wf_id] = wf["wf_centres"]
+    wf_centers = get_wf_arrays(calculation, "centres", initial=initial)
 
-    structure_ase = structure.get_ase()
-    cell = structure_ase.get_cell()
     # Transform all coordinates into Cartesian, translate atoms to the cell at origin
-    atoms = structure_ase.get_positions(wrap=True)
-
-    # ase Atoms for representing Wannier function centers
-    wf_ase = ase.Atoms()
-    wf_ase.set_cell(cell)
-    wf_ase.set_pbc(True)
-    for wf in wf_centers:  # pylint: disable=invalid-name
-        # position is in angstrom unit
-        atom = ase.Atom("H", position=wf)
-        wf_ase.append(atom)
-    # Transform all coordinates into Cartesian, translate Wannier function to the cell at origin
-    wf_centers = wf_ase.get_positions(wrap=True)
+    cell, atoms = get_structure_cell_atoms(structure)
+    # Translate Wannier function to the cell at origin, position is in angstrom unit
+    wf_centers = wrap_positions(wf_centers, cell, pbc=True)
 
-    return cell, atoms, wf_centers
+    return Cell(cell), atoms, wf_centers
 
 
 def generate_supercell(
@@ -74,45 +159,111 @@ def generate_supercell(
             f"Only support dimension of 2 or 3, input dimension is {dimension}"
         )
 
-    a1 = np.array(cell[0])  # pylint: disable=invalid-name
-    a2 = np.array(cell[1])  # pylint: disable=invalid-name
-    if dimension == 3:
-        a3 = np.array(cell[2])  # pylint: disable=invalid-name
+    cell = np.array(cell)
 
     if isinstance(size, int):
         size = [size for _ in range(dimension)]
 
-    supercell_range0 = range(-size[0], size[0] + 1)
-    supercell_range1 = range(-size[1], size[1] + 1)
-    if dimension == 2:
-        num_pts = len(supercell_range0) * len(supercell_range1)
-    elif dimension == 3:
-        supercell_range2 = range(-size[2], size[2] + 1)
-        num_pts = len(supercell_range0) * len(supercell_range1) * len(supercell_range2)
-    supercell = np.zeros((num_pts, dimension))
-    supercell_translations = np.zeros_like(supercell, dtype=int)
-
-    if dimension == 2:
-        counter = 0
-        for i in supercell_range0:
-            for j in supercell_range1:
-                x, y = i * a1 + j * a2
-                supercell[counter, :] = [x, y]
-                supercell_translations[counter, :] = [i, j]
-                counter += 1
-    elif dimension == 3:
-        counter = 0
-        for i in supercell_range0:
-            for j in supercell_range1:
-                for k in supercell_range2:
-                    x, y, z = i * a1 + j * a2 + k * a3
-                    supercell[counter, :] = [x, y, z]
-                    supercell_translations[counter, :] = [i, j, k]
-                    counter += 1
+    # Translations in the order of nested loops over the 1st, 2nd (, 3rd) lattice vectors
+    supercell_ranges = [np.arange(-size[i], size[i] + 1) for i in range(dimension)]
+    supercell_translations = np.stack(
+        np.meshgrid(*supercell_ranges, indexing="ij"), axis=-1
+    ).reshape(-1, dimension)
+    supercell = supercell_translations @ cell[:dimension]
 
     return supercell, supercell_translations
 
 
+def get_supercell_kdtree(cell: np.array, atoms: np.array) -> tuple:
+    """Build a KD tree of the atoms in a supercell, for finding nearest neighbours.
+
+    :param cell: each row is a lattice vector
+    :type cell: np.array, 3 x 3
+    :param atoms: atomic positions, in Cartesian coordinates.
+    :type atoms: np.array, num_atoms x 3
+    :return: the KD tree, and the atom index and cell translation of each tree point,
+    see ``find_wf_nearest_atom``.
+    :rtype: tuple[cKDTree, np.array]
+    """
+    from scipy.spatial import cKDTree
+
+    num_atoms = atoms.shape[0]
+
+    supercell, supercell_translations = generate_supercell(cell)
+    num_supercell, dimension = supercell.shape
+
+    # Generate a supercell of atoms, all the translations of the 0th atom come first
+    supercell_with_atoms = (atoms[:, np.newaxis, :] + supercell).reshape(-1, dimension)
+    supercell_translation_with_atoms = np.hstack(
+        [
+            # 0th: atom index
+            np.repeat(np.arange(num_atoms), num_supercell)[:, np.newaxis],
+            # 1-3th: supercell translation
+            np.tile(supercell_translations, (num_atoms, 1)),
+        ]
+    )
+
+    # KD tree for to find nearest neighbours
+    kdtree = cKDTree(supercell_with_atoms)
+
+    return kdtree, supercell_translation_with_atoms
+
+
+@functools.lru_cache(maxsize=32)
+def _get_structure_kdtree_cached(uuid: str) -> tuple:
+    """Load a stored ``StructureData`` and build its supercell KD tree, memoized by UUID."""
+    return get_supercell_kdtree(*get_structure_cell_atoms(orm.load_node(uuid)))
+
+
+def get_structure_kdtree(structure: orm.StructureData) -> tuple:
+    """Return the supercell KD tree of a structure, see ``get_supercell_kdtree``.
+
+    For a stored ``StructureData`` the result is memoized by node UUID (with LRU
+    eviction), so the calculations sharing a structure, e.g. all the iterations
+    of a ``Wannier90OptimizeWorkChain``, build the tree only once.
+
+    :param structure: the structure of the Wannier90 calculations.
+    :type structure: orm.StructureData
+    :rtype: tuple[cKDTree, np.array]
+    """
+    if structure.is_stored:
+        return _get_structure_kdtree_cached(structure.uuid)
+
+    return get_supercell_kdtree(*get_structure_cell_atoms(structure))
+
+
+def query_nearest_atom(
+    kdtree_translations: tuple,
+    wf_centers: np.array,
+    *,
+    nth_neighbour: int = 1,
+) -> ty.Tuple[np.array, np.array]:
+    """Find the nearest atom for each Wannier function center with a supercell KD tree.
+
+    :param kdtree_translations: output of ``get_supercell_kdtree`` or ``get_structure_kdtree``.
+    :type kdtree_translations: tuple[cKDTree, np.array]
+    :param wf_centers: Wannier function centers, in Cartesian coordinates.
+    :type wf_centers: np.array, num_wf x 3
+    :param nth_neighbour: Get 1st, 2nd, ... nth neighbouring atom.
+    :type nth_neighbour: int >= 1
+    :return: nearest atom distance, nearest atom index, see ``find_wf_nearest_atom``.
+    :rtype: tuple[np.array, np.array]
+    """
+    # Also accept numpy integers, e.g. taken from an array
+    if not isinstance(nth_neighbour, numbers.Integral) or nth_neighbour < 1:
+        raise ValueError(f"nth_neighbour {nth_neighbour} not integer or < 1")
+
+    kdtree, supercell_translation_with_atoms = kdtree_translations
+
+    neighbour_distance, neighbour_indexes = kdtree.query(
+        wf_centers, k=[int(nth_neighbour)]
+    )
+    neighbour_distance = neighbour_distance.flatten()
+    neighbour_atom = supercell_translation_with_atoms[neighbour_indexes.flatten()]
+
+    return neighbour_distance, neighbour_atom
+
+
 def find_wf_nearest_atom(
     cell: np.array,
     atoms: np.array,
@@ -137,48 +288,9 @@ def find_wf_nearest_atom(
     translation applied) is the atom which is nearest to the Wannier function).
     :rtype: tuple[np.array, np.array]
     """
-    from scipy.spatial import cKDTree
-
-    if not isinstance(nth_neighbour, int) and nth_neighbour < 1:
-        raise ValueError(f"nth_neighbour {nth_neighbour} not integer or < 1")
-
-    num_atoms = atoms.shape[0]
-
-    supercell, supercell_translations = generate_supercell(cell)
-    num_supercell, dimension = supercell.shape
-
-    # Generate a supercell of atoms
-    supercell_with_atoms = np.zeros((num_atoms * num_supercell, dimension))
-    supercell_translation_with_atoms = np.zeros(
-        (num_atoms * num_supercell, dimension + 1), dtype=int
+    return query_nearest_atom(
+        get_supercell_kdtree(cell, atoms), wf_centers, nth_neighbour=nth_neighbour
     )
-    for iatom in range(num_atoms):
-        idx_start = iatom * num_supercell
-        idx_stop = (iatom + 1) * num_supercell
-        supercell_with_atoms[idx_start:idx_stop, :] = supercell + atoms[iatom, :]
-        # 0th: atom index
-        supercell_translation_with_atoms[idx_start:idx_stop, 0] = iatom
-        # 1-3th: supercell translation
-        supercell_translation_with_atoms[idx_start:idx_stop, 1:] = (
-            supercell_translations
-        )
-
-    # KD tree for to find nearest neighbours
-    kdtree = cKDTree(supercell_with_atoms)
-    # neighbour_distance, neighbour_indexes = kdtree.query(wf_centers, k=1)
-    neighbour_distance, neighbour_indexes = kdtree.query(wf_centers, k=[nth_neighbour])
-    # print(f"{neighbour_distance = } {neighbour_indexes = }")
-    neighbour_distance = neighbour_distance.flatten()
-    neighbour_indexes = neighbour_indexes.flatten()
-    num_centers = len(wf_centers)
-
-    neighbour_atom = np.zeros(
-        (num_centers, supercell_translation_with_atoms.shape[1]), dtype=int
-    )
-    for i in range(num_centers):
-        neighbour_atom[i] = supercell_translation_with_atoms[neighbour_indexes[i]]
-
-    return neighbour_distance, neighbour_atom
 
 
 def get_wf_center_distances(
@@ -201,62 +313,173 @@ def get_wf_center_distances(
     if nth_neighbour < 1:
         raise ValueError(f"nth_neighbour {nth_neighbour} < 1")
 
-    cell, atoms, wf_centers = get_wf_centers(calculation, initial=initial)
+    return get_wf_center_distances_batch(
+        [calculation], nth_neighbour=nth_neighbour, initial=initial
+    )[0]
 
-    distance, atom_translation = find_wf_nearest_atom(
-        cell, atoms, wf_centers, nth_neighbour=nth_neighbour
-    )
 
-    nearest_atom = atom_translation[:, 0]
-    cell_translation = atom_translation[:, 1:]
-    structure_ase = calculation.inputs.structure.get_ase()
+def get_wf_center_distances_batch(
+    calculations: ty.Sequence[Wannier90Calculation],
+    *,
+    nth_neighbour: int = 1,
+    initial: bool = False,
+) -> ty.List[tuple]:
+    """Calculate distances between WF centers and nearest neighbours of many calculations.
 
-    return distance, nearest_atom, cell_translation, structure_ase
+    The calculations are grouped by structure, the centers of each group are
+    queried at once with the KD tree of ``get_structure_kdtree``.
 
+    :param calculations: a list of ``Wannier90Calculation``.
+    :type calculations: ty.Sequence[Wannier90Calculation]
+    :param nth_neighbour: Get 1st, 2nd, ... nth neighbouring atom.
+    :type nth_neighbour: int >= 1
+    :param initial: Get initial or final WF center.
+    :type initial: bool
+    :return: for each calculation, the output of ``get_wf_center_distances``.
+    :rtype: list
+    """
+    if nth_neighbour < 1:
+        raise ValueError(f"nth_neighbour {nth_neighbour} < 1")
 
-def get_wigner_seitz(cell: np.array, search_size: int = 2) -> np.array:
-    """Get Wigner-Seitz cell.
+    structures = [_.inputs.structure for _ in calculations]
+    wf_centers = [get_wf_arrays(_, "centres", initial=initial) for _ in calculations]
+    structures_ase = {}
+    results = []
+    for structure, (distance, atom_translation) in zip(
+        structures,
+        find_wf_nearest_atom_by_structure(
+            structures, wf_centers, nth_neighbour=nth_neighbour
+        ),
+    ):
+        if structure.uuid not in structures_ase:
+            structures_ase[structure.uuid] = structure.get_ase()
+        results.append(
+            (
+                distance,
+                atom_translation[:, 0],
+                atom_translation[:, 1:],
+                structures_ase[structure.uuid],
+            )
+        )
 
-    :param cell: each row is a lattice vector.
-    :return: Wigner-Seitz cell
+    return results
+
+
+def find_wf_nearest_atom_by_structure(
+    structures: ty.Sequence[orm.StructureData],
+    wf_centers: ty.Sequence[np.array],
+    *,
+    nth_neighbour: int = 1,
+) -> ty.List[ty.Tuple[np.array, np.array]]:
+    """Find the nearest atom for the Wannier function centers of many calculations.
+
+    The centers are grouped by structure, translated back into the cell, and
+    queried at once with the KD tree of ``get_structure_kdtree``.
+
+    :param structures: the structure of each calculation.
+    :type structures: ty.Sequence[orm.StructureData]
+    :param wf_centers: the Wannier function centers of each calculation, in
+    Cartesian coordinates, not necessarily inside the cell.
+    :type wf_centers: ty.Sequence[np.array]
+    :param nth_neighbour: Get 1st, 2nd, ... nth neighbouring atom.
+    :type nth_neighbour: int >= 1
+    :return: for each calculation, the output of ``find_wf_nearest_atom``.
+    :rtype: list
     """
+    from ase.geometry import wrap_positions
+
+    # Group calculations by structure
+    structures_by_uuid = {}
+    calcs_per_structure = {}
+    for icalc, structure in enumerate(structures):
+        structures_by_uuid.setdefault(structure.uuid, structure)
+        calcs_per_structure.setdefault(structure.uuid, []).append(icalc)
+
+    results = [None] * len(wf_centers)
+    for uuid, icalcs in calcs_per_structure.items():
+        structure = structures_by_uuid[uuid]
+        cell = np.array(structure.cell)
+        centers = wrap_positions(
+            np.vstack([wf_centers[_] for _ in icalcs]), cell, pbc=True
+        )
+        distance, atom_translation = query_nearest_atom(
+            get_structure_kdtree(structure), centers, nth_neighbour=nth_neighbour
+        )
+        splits = np.cumsum([len(wf_centers[_]) for _ in icalcs])[:-1]
+        for icalc, dist, atom_trans in zip(
+            icalcs,
+            np.split(distance, splits),
+            np.split(atom_translation, splits),
+        ):
+            results[icalc] = (dist, atom_trans)
+
+    return results
+
+
+@functools.lru_cache(maxsize=32)
+def _get_wigner_seitz_cached(cell: tuple, search_size: int) -> np.array:
+    """Compute the Wigner-Seitz cell of a cell given as a tuple of rows, memoized."""
     import itertools
 
+    from ase.geometry import minkowski_reduce
     from scipy.spatial import Voronoi  # pylint: disable=no-name-in-module
 
-    # Initially I tried to find the Wigner-Seitz cell the Wannier function belongs to,
-    # and calculate the distance between Wannier function and the cell center.
-    # Then get the minimum of the calculated distances (among all atomic positions in the WS cell),
-    # thus we find the nearest atom of the Wannier function.
-    # But later on I just use a supercell approach since that is easier to do.
-
+    cell = np.array(cell)
     dimension = cell.shape[0]
-    search_range = range(-search_size, search_size + 1)
 
-    # points = []
-    # for i, j, k in itertools.product(search_range, repeat=dimension):
-    #     points.append(i * cell[0] + j * cell[1] + k * cell[2])
+    # The Minkowski-reduced basis spans the same lattice with the shortest vectors,
+    # all the neighbours defining the Wigner-Seitz cell are within 1 reduced cell,
+    # no matter how oblique the input cell is.
+    if dimension == 2:
+        cell_3d = np.eye(3)
+        cell_3d[:2, :2] = cell
+        reduced_cell, _ = minkowski_reduce(cell_3d, pbc=[True, True, False])
+        reduced_cell = reduced_cell[:2, :2]
+    else:
+        reduced_cell, _ = minkowski_reduce(cell)
 
-    # A bit faster
+    search_range = range(-search_size, search_size + 1)
     points = np.array(list(itertools.product(search_range, repeat=dimension)))
-    points = points @ cell
+    points = points @ reduced_cell
 
     vor = Voronoi(points)
 
-    ws_cell = None
-    for region in vor.regions:
-        if len(region) != 0 and np.all(np.array(region) >= 0):
-            ws_cell = np.zeros(shape=(len(region), 3))
-            for i, reg in enumerate(region):
-                ws_cell[i] = vor.vertices[reg]
-            break
-    # pylint: disable=fixme
-    # TODO: There might be multiple closed regions, I need to ensure the region containing
-    # the origin is returned.
+    # The region of the lattice point at origin
+    origin = np.argmin(np.linalg.norm(points, axis=1))
+    region = vor.regions[vor.point_region[origin]]
+    ws_cell = vor.vertices[region]
+    ws_cell.setflags(write=False)
 
     return ws_cell
 
 
+def get_wigner_seitz(
+    cell: np.array, search_size: int = 1, decimals: int = 8
+) -> np.array:
+    """Get Wigner-Seitz cell.
+
+    The Wigner-Seitz cell is the Voronoi region of the origin, among the lattice
+    points of a Minkowski-reduced basis within ``search_size`` reduced cells.
+    The result is memoized on the cell rounded to ``decimals``, so it can be
+    called in loops over Wannier functions.
+
+    :param cell: each row is a lattice vector.
+    :param search_size: number of reduced cells to search in each direction,
+    1 is always enough.
+    :param decimals: number of decimals for comparing cells.
+    :return: Wigner-Seitz cell, the vertices of the Voronoi region, read-only.
+    """
+    # Initially I tried to find the Wigner-Seitz cell the Wannier function belongs to,
+    # and calculate the distance between Wannier function and the cell center.
+    # Then get the minimum of the calculated distances (among all atomic positions in the WS cell),
+    # thus we find the nearest atom of the Wannier function.
+    # But later on I just use a supercell approach since that is easier to do.
+    cell = np.round(np.array(cell, dtype=float), decimals) + 0.0
+    cell_key = tuple(tuple(_) for _ in cell)
+
+    return _get_wigner_seitz_cached(cell_key, search_size)
+
+
 def test_plot_voronoi():
     """Plot a test Voronoi diagram for a very oblique cell."""
     import matplotlib.pyplot as plt
@@ -381,31 +604,385 @@ def get_last_wan_calc(
     return calc
 
 
-def wf_center_distances_for_group(group: ty.Union[orm.Group, str, int]) -> np.array:
-    """Calculate distance of Wannier function center to nearest atom for a group of WorkChain.
+def _get_last_wan_calcs(
+    group: ty.Union[orm.Group, str, int], batch_size: int = 1000
+) -> ty.Dict[int, int]:
+    """Query the PK of the last ``Wannier90Calculation`` of each finished node of a group.
 
-    :param group: [description]
-    :type group: orm.Group, str, int
-    :return: [description]
-    :rtype: np.array
+    See ``harvest_wf_outputs``.
+
+    :raises ValueError: if the group contains a finished process of another type,
+    or a finished ``Wannier90OptimizeWorkChain`` without ``wannier90_optimal`` outputs.
+    :return: a dict of WorkChain PK (the calculation PK for a ``Wannier90Calculation``
+    of the group) to ``Wannier90Calculation`` PK.
+    :rtype: dict
     """
-    distances = []
+    from aiida.common.links import LinkType
+
+    from aiida_wannier90_workflows.workflows.bands import Wannier90BandsWorkChain
+    from aiida_wannier90_workflows.workflows.base.wannier90 import (
+        Wannier90BaseWorkChain,
+    )
+    from aiida_wannier90_workflows.workflows.open_grid import Wannier90OpenGridWorkChain
+    from aiida_wannier90_workflows.workflows.optimize import Wannier90OptimizeWorkChain
+    from aiida_wannier90_workflows.workflows.wannier90 import Wannier90WorkChain
 
     if not isinstance(group, orm.Group):
         group = orm.load_group(group)
 
-    for node in group.nodes:
-        if not node.is_finished_ok:
-            print(f"Skip unfinished node: {node}")
-            continue
+    wan_process_type = Wannier90Calculation.build_process_type()
+    base_process_type = Wannier90BaseWorkChain.build_process_type()
+    optimize_process_type = Wannier90OptimizeWorkChain.build_process_type()
+    supported_process_types = [
+        _.build_process_type()
+        for _ in (
+            Wannier90BandsWorkChain,
+            Wannier90OpenGridWorkChain,
+            Wannier90WorkChain,
+            Wannier90OptimizeWorkChain,
+        )
+    ]
+    finished_ok = {
+        "attributes.process_state": "finished",
+        "attributes.exit_status": 0,
+    }
+
+    def query_processes(
+        node_class: ty.Type[orm.ProcessNode], process_types: ty.List[str]
+    ) -> orm.QueryBuilder:
+        query = orm.QueryBuilder()
+        query.append(orm.Group, filters={"id": group.pk}, tag="group")
+        query.append(
+            node_class,
+            with_group="group",
+            filters={**finished_ok, "process_type": {"in": process_types}},
+            project=["id"],
+            tag="process",
+        )
+        return query
+
+    # Same as `get_last_wan_calc` on each node, report the unfinished processes
+    # and fail for the finished processes of other types
+    query_states = orm.QueryBuilder()
+    query_states.append(orm.Group, filters={"id": group.pk}, tag="group")
+    query_states.append(
+        orm.ProcessNode,
+        with_group="group",
+        project=[
+            "id",
+            "process_type",
+            "attributes.process_state",
+            "attributes.exit_status",
+        ],
+    )
+    optimize_pks = set()
+    for pk, process_type, state, exit_status in query_states.iterall(
+        batch_size=batch_size
+    ):
+        if state != "finished" or exit_status != 0:
+            print(f"Skip unfinished node: {orm.load_node(pk)}")
+        elif process_type == optimize_process_type:
+            optimize_pks.add(pk)
+        elif process_type not in (
+            wan_process_type,
+            base_process_type,
+            *supported_process_types,
+        ):
+            raise ValueError(f"Unsupported type {orm.load_node(pk)}")
+
+    # Wannier90Calculation
+    query_calc = query_processes(orm.CalcJobNode, [wan_process_type])
+    last_calcs = {
+        calc_pk: calc_pk for (calc_pk,) in query_calc.iterall(batch_size=batch_size)
+    }
+
+    # Wannier90BaseWorkChain -> Wannier90Calculation
+    query_base = query_processes(orm.WorkChainNode, [base_process_type])
+    query_base.append(
+        orm.CalcJobNode,
+        with_incoming="process",
+        edge_filters={"type": LinkType.CALL_CALC.value},
+        filters={"process_type": wan_process_type},
+        project=["id"],
+    )
+    # Other WorkChain -wannier90-> Wannier90BaseWorkChain -> Wannier90Calculation
+    query_nested = query_processes(orm.WorkChainNode, supported_process_types)
+    query_nested.append(
+        orm.WorkChainNode,
+        with_incoming="process",
+        edge_filters={"type": LinkType.CALL_WORK.value, "label": "wannier90"},
+        filters={"process_type": base_process_type},
+        tag="base",
+    )
+    query_nested.append(
+        orm.CalcJobNode,
+        with_incoming="base",
+        edge_filters={"type": LinkType.CALL_CALC.value},
+        filters={"process_type": wan_process_type},
+        project=["id"],
+    )
+    for query in (query_base, query_nested):
+        for workchain_pk, calc_pk in query.iterall(batch_size=batch_size):
+            last_calcs[workchain_pk] = max(calc_pk, last_calcs.get(workchain_pk, 0))
+
+    # Other WorkChain -wannier90-> Wannier90Calculation
+    query_direct = query_processes(orm.WorkChainNode, supported_process_types)
+    query_direct.append(
+        orm.CalcJobNode,
+        with_incoming="process",
+        edge_filters={"type": LinkType.CALL_CALC.value, "label": "wannier90"},
+        filters={"process_type": wan_process_type},
+        project=["id"],
+    )
+    # Wannier90OptimizeWorkChain: the calculation of the optimal output_parameters
+    query_optimal = query_processes(orm.WorkChainNode, [optimize_process_type])
+    query_optimal.append(
+        orm.Dict,
+        with_incoming="process",
+        edge_filters={
+            "type": LinkType.RETURN.value,
+            "label": "wannier90_optimal__output_parameters",
+        },
+        tag="parameters",
+    )
+    query_optimal.append(orm.CalcJobNode, with_outgoing="parameters", project=["id"])
+    for query in (query_direct, query_optimal):
+        for workchain_pk, calc_pk in query.iterall(batch_size=batch_size):
+            last_calcs[workchain_pk] = calc_pk
+            optimize_pks.discard(workchain_pk)
+
+    # Same as `get_last_wan_calc`, fail for a Wannier90OptimizeWorkChain without optimal outputs
+    if optimize_pks:
+        raise ValueError(
+            f"No `wannier90_optimal` outputs in {orm.load_node(min(optimize_pks))}"
+        )
+
+    return last_calcs
+
+
+def harvest_wf_outputs(
+    group: ty.Union[orm.Group, str, int],
+    *,
+    initial: bool = False,
+    batch_size: int = 1000,
+) -> ty.Iterator[ty.Tuple[int, int, str, ty.List[dict]]]:
+    """Harvest the WF outputs of the last Wannier90 calculation of a group of WorkChain.
+
+    Equivalent to calling ``get_last_wan_calc`` on each finished node of the group,
+    but with ``QueryBuilder`` queries instead of loading the nodes and walking the links:
+    first the PKs of the last ``Wannier90Calculation`` of each WorkChain are queried
+    (the optimal one for a ``Wannier90OptimizeWorkChain``), then the Wannier function
+    outputs and the structure UUIDs are projected and streamed in batches of ``batch_size``
+    calculations. Unfinished nodes are reported and skipped.
+
+    :param group: a group of ``Wannier90Calculation``, ``Wannier90BaseWorkChain``,
+    ``Wannier90WorkChain``, ``Wannier90BandsWorkChain``, ``Wannier90OpenGridWorkChain``
+    or ``Wannier90OptimizeWorkChain``.
+    :type group: orm.Group, str, int
+    :param initial: Get initial or final WF outputs.
+    :type initial: bool
+    :param batch_size: number of calculations per query.
+    :type batch_size: int
+    :raises ValueError: if the group contains a finished process of another type,
+    or a finished ``Wannier90OptimizeWorkChain`` without ``wannier90_optimal`` outputs,
+    e.g. run with ``optimize_disproj`` False.
+    :return: an iterator of WorkChain PK (the calculation PK for a ``Wannier90Calculation``
+    of the group), ``Wannier90Calculation`` PK, structure UUID,
+    and the ``wannier_functions_output`` (or ``wannier_functions_initial``) list.
+    :rtype: ty.Iterator[tuple]
+    """
+    if initial:
+        wf_outputs_key = "wannier_functions_initial"
+    else:
+        wf_outputs_key = "wannier_functions_output"
+
+    last_calcs = _get_last_wan_calcs(group, batch_size)
+    workchain_pks = sorted(last_calcs)
+    for start in range(0, len(workchain_pks), batch_size):
+        batch = {last_calcs[_]: _ for _ in workchain_pks[start : start + batch_size]}
+        query = orm.QueryBuilder()
+        query.append(
+            orm.CalcJobNode,
+            filters={"id": {"in": list(batch)}},
+            project=["id"],
+            tag="calc",
+        )
+        query.append(
+            orm.Dict,
+            with_incoming="calc",
+            edge_filters={"label": "output_parameters"},
+            project=[f"attributes.{wf_outputs_key}"],
+        )
+        query.append(
+            orm.StructureData,
+            with_outgoing="calc",
+            edge_filters={"label": "structure"},
+            project=["uuid"],
+        )
+        results = {
+            calc_pk: (structure_uuid, wf_outputs)
+            for calc_pk, wf_outputs, structure_uuid in query.all()
+        }
+        for calc_pk, workchain_pk in batch.items():
+            if calc_pk in results:
+                yield (workchain_pk, calc_pk, *results[calc_pk])
+
+
+def harvest_wf_arrays(
+    group: ty.Union[orm.Group, str, int],
+    key: str,
+    *,
+    initial: bool = False,
+    batch_size: int = 1000,
+) -> ty.Iterator[ty.Tuple[int, int, str, np.array]]:
+    """Harvest the ``centres`` or ``spreads`` array of the WFs for a group of WorkChain.
 
-        calc = get_last_wan_calc(node)
-        dist, _, _, _ = get_wf_center_distances(calc)
-        distances.extend(dist)
+    Same calculations as ``harvest_wf_outputs``, but the final arrays are loaded from
+    the ``wannier_functions`` output of ``get_wannier_functions_arrays`` when it exists,
+    i.e. for ``Wannier90BaseWorkChain`` run with ``output_wannier_functions``; the other
+    calculations fall back on parsing the ``output_parameters``.
 
-    distances = np.array(distances)
+    :param group: see ``harvest_wf_outputs``.
+    :type group: orm.Group, str, int
+    :param key: ``centres`` or ``spreads``.
+    :type key: str
+    :param initial: Get initial or final WF outputs, the initial ones are always
+    parsed from ``output_parameters``.
+    :type initial: bool
+    :param batch_size: number of calculations per query.
+    :type batch_size: int
+    :return: an iterator of WorkChain PK, ``Wannier90Calculation`` PK, structure UUID,
+    and the array sorted by WF index, num_wf x 3 for ``centres``, num_wf for ``spreads``.
+    :rtype: ty.Iterator[tuple]
+    """
+    from aiida.common.links import LinkType
 
-    return distances
+    if key not in ("centres", "spreads"):
+        raise ValueError(f"Unknown key {key}, should be `centres` or `spreads`")
+
+    if initial:
+        wf_outputs_key = "wannier_functions_initial"
+    else:
+        wf_outputs_key = "wannier_functions_output"
+
+    function_process_type = (
+        get_wannier_functions_arrays.process_class.build_process_type()
+    )
+    last_calcs = _get_last_wan_calcs(group, batch_size)
+    workchain_pks = sorted(last_calcs)
+    for start in range(0, len(workchain_pks), batch_size):
+        batch = {last_calcs[_]: _ for _ in workchain_pks[start : start + batch_size]}
+
+        query = orm.QueryBuilder()
+        query.append(
+            orm.CalcJobNode,
+            filters={"id": {"in": list(batch)}},
+            project=["id"],
+            tag="calc",
+        )
+        query.append(
+            orm.StructureData,
+            with_outgoing="calc",
+            edge_filters={"label": "structure"},
+            project=["uuid"],
+        )
+        structures = dict(query.all())
+
+        # Wannier90Calculation -> output_parameters -> get_wannier_functions_arrays -> ArrayData
+        arrays = {}
+        if not initial:
+            query = orm.QueryBuilder()
+            query.append(
+                orm.CalcJobNode,
+                filters={"id": {"in": list(batch)}},
+                project=["id"],
+                tag="calc",
+            )
+            query.append(
+                orm.Dict,
+                with_incoming="calc",
+                edge_filters={"label": "output_parameters"},
+                tag="parameters",
+            )
+            query.append(
+                orm.CalcFunctionNode,
+                with_incoming="parameters",
+                edge_filters={
+                    "type": LinkType.INPUT_CALC.value,
+                    "label": "output_parameters",
+                },
+                filters={"process_type": function_process_type},
+                tag="function",
+            )
+            query.append(
+                orm.ArrayData,
+                with_incoming="function",
+                edge_filters={"type": LinkType.CREATE.value, "label": "result"},
+                project=["*"],
+            )
+            arrays = {
+                calc_pk: wf_arrays.get_array(key) for calc_pk, wf_arrays in query.all()
+            }
+
+        missing = [_ for _ in batch if _ not in arrays]
+        if missing:
+            query = orm.QueryBuilder()
+            query.append(
+                orm.CalcJobNode,
+                filters={"id": {"in": missing}},
+                project=["id"],
+                tag="calc",
+            )
+            query.append(
+                orm.Dict,
+                with_incoming="calc",
+                edge_filters={"label": "output_parameters"},
+                project=[f"attributes.{wf_outputs_key}"],
+            )
+            for calc_pk, wf_outputs in query.all():
+                wf_array = get_wf_outputs_array(wf_outputs, f"wf_{key}")
+                if key == "centres":
+                    wf_array = wf_array.reshape(-1, 3)
+                arrays[calc_pk] = wf_array
+
+        for calc_pk, workchain_pk in batch.items():
+            if calc_pk in arrays and calc_pk in structures:
+                yield (workchain_pk, calc_pk, structures[calc_pk], arrays[calc_pk])
+
+
+def wf_center_distances_for_group(group: ty.Union[orm.Group, str, int]) -> np.array:
+    """Calculate distance of Wannier function center to nearest atom for a group of WorkChain.
+
+    :param group: [description]
+    :type group: orm.Group, str, int
+    :return: [description]
+    :rtype: np.array
+    """
+    structures = {}
+    calc_structures = []
+    wf_centers = []
+    for _, _, structure_uuid, centres in harvest_wf_arrays(group, "centres"):
+        if structure_uuid not in structures:
+            structures[structure_uuid] = orm.load_node(structure_uuid)
+        calc_structures.append(structures[structure_uuid])
+        wf_centers.append(centres)
+
+    distances = [
+        _[0] for _ in find_wf_nearest_atom_by_structure(calc_structures, wf_centers)
+    ]
+    if not distances:
+        return np.array([])
+
+    return np.concatenate(distances)
+
+
+def _write_wf_centers_xyz(structure_ase, wf_centers: np.array, filename: str):
+    """Write a structure and its Wannier function centers (as X atoms) to a XYZ file."""
+    import ase
+
+    new_structure = structure_ase.copy()
+    new_structure.extend(ase.Atoms(["X"] * len(wf_centers), positions=wf_centers))
+    new_structure.write(filename)
 
 
 def export_wf_centers_to_xyz(calculation: Wannier90Calculation, filename: str = None):
@@ -414,41 +991,67 @@ def export_wf_centers_to_xyz(calculation: Wannier90Calculation, filename: str =
     :param calculation: [description]
     :type calculation: Wannier90Calculation
     """
-    import ase
-
-    structure = calculation.inputs.structure.get_ase()
-    new_structure = structure.copy()
+    structure = calculation.inputs.structure
 
     _, _, wf_centers = get_wf_centers(calculation)
 
-    for coord in wf_centers:
-        new_structure.append(ase.Atom("X", coord))
-
     if not filename:
         filename = f"{structure.get_formula()}_{calculation.pk}_wf_centers.xyz"
 
-    new_structure.write(filename)
+    _write_wf_centers_xyz(structure.get_ase(), wf_centers, filename)
 
 
-def export_wf_centers_for_group(group: orm.Group, save_dir: str = "."):
+def export_wf_centers_for_group(
+    group: orm.Group,
+    save_dir: str = ".",
+    *,
+    max_workers: int = 1,
+    skip_existing: bool = False,
+):
     """Export Wannier function centers to XYZ file for a group of WorkChain.
 
+    The Wannier function centers are fetched in bulk with ``harvest_wf_arrays``,
+    the files can be written in parallel by a pool of processes.
+
     :param group: [description]
     :type group: orm.Group
+    :param max_workers: number of processes writing the files, 1 to write them
+    in the current process, None for the number of CPUs.
+    :type max_workers: int
+    :param skip_existing: do not write again the files which already exist,
+    by default they are overwritten.
+    :type skip_existing: bool
     """
+    from concurrent.futures import ProcessPoolExecutor
     from pathlib import Path
 
-    for node in group.nodes:
-        if not node.is_finished_ok:
-            print(f"Skip unfinished node: {node}")
-            continue
+    from ase.geometry import wrap_positions
 
-        calc = get_last_wan_calc(node)
+    structures = {}
+    exports = []
+    for _, calc_pk, structure_uuid, wf_centers in harvest_wf_arrays(group, "centres"):
+        if structure_uuid not in structures:
+            structure = orm.load_node(structure_uuid)
+            structures[structure_uuid] = (structure.get_formula(), structure.get_ase())
+        formula, structure_ase = structures[structure_uuid]
 
-        filename = f"{calc.inputs.structure.get_formula()}_{calc.pk}_wf_centers.xyz"
+        filename = f"{formula}_{calc_pk}_wf_centers.xyz"
         filename = Path(save_dir) / filename
+        if skip_existing and filename.exists():
+            continue
+
+        # Translate Wannier function to the cell at origin
+        wf_centers = wrap_positions(wf_centers, structure_ase.get_cell(), pbc=True)
+        exports.append((structure_ase, wf_centers, filename))
+
+    if max_workers == 1 or len(exports) <= 1:
+        for export in exports:
+            _write_wf_centers_xyz(*export)
+        return
 
-        export_wf_centers_to_xyz(calc, filename)
+    with ProcessPoolExecutor(max_workers=max_workers) as executor:
+        # Consume the iterator to raise the exceptions of the workers
+        list(executor.map(_write_wf_centers_xyz, *zip(*exports)))
 
 
 def plot_histogram(distances: np.array, title: str = None):
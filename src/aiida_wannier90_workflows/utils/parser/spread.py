@@ -8,29 +8,27 @@ from aiida import orm
 
 from aiida_wannier90.calculations import Wannier90Calculation
 
+from aiida_wannier90_workflows.utils.parser.center import (
+    get_wf_arrays,
+    harvest_wf_arrays,
+)
 
-def get_wf_spreads(calculation: Wannier90Calculation, initial: bool = False) -> tuple:
+
+def get_wf_spreads(
+    calculation: ty.Union[Wannier90Calculation, orm.WorkChainNode],
+    initial: bool = False,
+) -> np.array:
     """Get Wannier function spreads.
 
-    :param calculation: A finished ``Wannier90Calculation``.
+    :param calculation: A finished ``Wannier90Calculation``, or a ``Wannier90BaseWorkChain``
+    whose ``wannier_functions`` output is read directly.
     :type calculation: Wannier90Calculation
     :param initial: Get initial or final WF center.
     :type initial: bool
-    :return:
-    :rtype: tuple
+    :return: spreads sorted by WF index.
+    :rtype: np.array
     """
-    if initial:
-        wf_outputs_key = "wannier_functions_initial"
-    else:
-        wf_outputs_key = "wannier_functions_output"
-
-    wf_outputs = calculation.outputs.output_parameters[wf_outputs_key]
-    wf_spreads = np.zeros(len(wf_outputs))
-    for wf in wf_outputs:  # pylint: disable=invalid-name
-        wf_id = wf["wf_ids"] - 1
-        wf_spreads[wf_id] = wf["wf_spreads"]
-
-    return wf_spreads
+    return get_wf_arrays(calculation, "spreads", initial=initial)
 
 
 def wf_spreads_for_group(group: ty.Union[orm.Group, str, int]) -> np.array:
@@ -41,25 +39,11 @@ def wf_spreads_for_group(group: ty.Union[orm.Group, str, int]) -> np.array:
     :return: [description]
     :rtype: np.array
     """
-    from aiida_wannier90_workflows.utils.parser.center import get_last_wan_calc
-
-    spreads = []
-
-    if not isinstance(group, orm.Group):
-        group = orm.load_group(group)
-
-    for node in group.nodes:
-        if not node.is_finished_ok:
-            print(f"Skip unfinished node: {node}")
-            continue
-
-        calc = get_last_wan_calc(node)
-        sprd = get_wf_spreads(calc)
-        spreads.extend(sprd)
-
-    spreads = np.array(spreads)
+    spreads = [_[3] for _ in harvest_wf_arrays(group, "spreads")]
+    if not spreads:
+        return np.array([])
 
-    return spreads
+    return np.concatenate(spreads)
 
 
 def plot_histogram(spreads: np.array, title: str = None):
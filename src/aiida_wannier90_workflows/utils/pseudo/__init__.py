@@ -61,47 +61,21 @@ def get_pseudo_orbitals(pseudos: ty.Mapping[str, PseudoPotentialData]) -> dict:
         * PseudoDojo/0.4/PBE/SR/stringent/upf
         * PseudoDojo/0.5/PBE/SR/standard/upf
         * PseudoDojo/0.5/PBE/SR/stringent/upf
+
+    Extra libraries can be added with ``aiida_wannier90_workflows.utils.pseudo.data.register_pseudo_metadata``.
     """
-    from .data import load_pseudo_metadata
-
-    pseudo_data = []
-    pseudo_data.append(load_pseudo_metadata("semicore/SSSP_1.1_PBEsol_efficiency.json"))
-    pseudo_data.append(load_pseudo_metadata("semicore/SSSP_1.1_PBE_efficiency.json"))
-    pseudo_data.append(
-        load_pseudo_metadata("semicore/PseudoDojo_0.4_PBE_SR_standard_upf.json")
-    )
-    pseudo_data.append(
-        load_pseudo_metadata("semicore/PseudoDojo_0.4_PBE_SR_stringent_upf.json")
-    )
-    pseudo_data.append(
-        load_pseudo_metadata("semicore/PseudoDojo_0.5_PBE_SR_standard_upf.json")
-    )
-    pseudo_data.append(
-        load_pseudo_metadata("semicore/PseudoDojo_0.5_PBE_SR_stringent_upf.json")
-    )
-    pseudo_data.append(
-        load_pseudo_metadata("semicore/PseudoDojo_0.4_LDA_SR_standard_upf.json")
-    )
-    pseudo_data.append(
-        load_pseudo_metadata("semicore/PseudoDojo_0.4_LDA_SR_stringent_upf.json")
-    )
-    pseudo_data.append(
-        load_pseudo_metadata("semicore/PseudoDojo_0.4_PBE_FR_standard_upf.json")
-    )
-    pseudo_data.append(
-        load_pseudo_metadata("semicore/PseudoDojo_0.4_PBEsol_FR_standard_upf.json")
-    )
-    pseudo_data.append(load_pseudo_metadata("semicore/pslibrary_paw_relpbe_1.0.0.json"))
+    from copy import deepcopy
+
+    from .data import get_pseudo_metadata
 
     pseudo_orbitals = {}
     for element in pseudos:
-        for data in pseudo_data:
-            if data.get(element, {}).get("md5", "") == pseudos[element].md5:
-                pseudo_orbitals[element] = data[element]
-                break
-        else:
+        metadata = get_pseudo_metadata(element, pseudos[element].md5)
+        if metadata is None:
             raise ValueError(
                 f"Cannot find pseudopotential {element} with md5 {pseudos[element].md5} (Currently only support SSSP/1.1/PBE(_sol)/efficiency. Turn off exclude_semicore)")
+        # Copy, so the cached metadata cannot be modified by the caller
+        pseudo_orbitals[element] = deepcopy(metadata)
 
     return pseudo_orbitals
 
@@ -230,7 +204,7 @@ def get_number_of_projections(
     """
     import aiida_pseudo.data.pseudo.upf
 
-    from .upf import get_number_of_projections_from_upf, get_upf_content, is_soc_pseudo
+    from .upf import get_upf_facts
 
     if not isinstance(structure, orm.StructureData):
         raise ValueError(
@@ -252,16 +226,18 @@ def get_number_of_projections(
     # e.g. composition = {'Ga': 1, 'As': 1}
     composition = structure.get_composition()
 
+    # Each pseudo is parsed only once, and cached by md5 for later calls
+    upf_facts = {kind: get_upf_facts(pseudos[kind]) for kind in composition}
+
     if spin_orbit_coupling is None:
         # I use the first pseudo to detect SOCs
         kind = list(composition.keys())[0]
-        spin_orbit_coupling = is_soc_pseudo(get_upf_content(pseudos[kind]))
+        spin_orbit_coupling = upf_facts[kind]["has_so"]
 
     tot_nprojs = 0
     for kind in composition:
-        upf = pseudos[kind]
-        nprojs = get_number_of_projections_from_upf(upf)
-        soc = is_soc_pseudo(get_upf_content(pseudos[kind]))
+        nprojs = upf_facts[kind]["number_of_pswfc"]
+        soc = upf_facts[kind]["has_so"]
         if spin_orbit_coupling and not soc:
             # For SOC calculation with non-SOC pseudo, QE will generate
             # 2 PSWFCs from each one PSWFC in the pseudo
@@ -338,7 +314,7 @@ def get_number_of_electrons(
     """
     import aiida_pseudo.data.pseudo.upf
 
-    from .upf import get_number_of_electrons_from_upf
+    from .upf import get_upf_facts
 
     if not isinstance(structure, orm.StructureData):
         raise ValueError(
@@ -361,8 +337,7 @@ def get_number_of_electrons(
     # e.g. composition = {'Ga': 1, 'As': 1}
     composition = structure.get_composition()
     for kind in composition:
-        upf = pseudos[kind]
-        nelecs = get_number_of_electrons_from_upf(upf)
+        nelecs = get_upf_facts(pseudos[kind])["z_valence"]
         tot_nelecs += nelecs * composition[kind]
 
     return tot_nelecs
@@ -0,0 +1,163 @@
+"""Persistent on-disk cache of the facts parsed from UPF files.
+
+The in-memory cache of ``get_upf_facts`` is lost whenever a daemon worker restarts.
+Set the environment variable ``AIIDA_WANNIER90_WORKFLOWS_UPF_CACHE`` to ``1`` to store
+the facts in a SQLite database in the AiiDA config folder, or to the path of a
+database file, then all the processes share the facts of the pseudos, keyed by md5.
+SQLite takes care of the concurrent access from several processes.
+Each entry records the ``UPF_FACTS_VERSION`` of ``parse_upf`` which produced it.
+"""
+
+import contextlib
+import json
+import os
+import pathlib
+import sqlite3
+import typing as ty
+
+from .upf import UPF_FACTS_VERSION
+
+__all__ = (
+    "UPF_CACHE_ENVVAR",
+    "get_upf_cache_path",
+    "load_upf_cache",
+    "save_upf_cache",
+    "clear_upf_cache",
+)
+
+UPF_CACHE_ENVVAR = "AIIDA_WANNIER90_WORKFLOWS_UPF_CACHE"
+
+# The oldest entries are removed once the cache exceeds this number of pseudos
+UPF_CACHE_MAX_ENTRIES = 20000
+
+# Seconds to wait for the lock of another process
+_TIMEOUT = 30
+
+
+def get_upf_cache_path() -> ty.Optional[pathlib.Path]:
+    """Return the path of the cache database, or None if the cache is not enabled.
+
+    :return: path from the environment variable ``AIIDA_WANNIER90_WORKFLOWS_UPF_CACHE``,
+        ``1`` means the default file in the AiiDA config folder
+    """
+    value = os.environ.get(UPF_CACHE_ENVVAR, "").strip()
+    if value.lower() in ("", "0", "false", "no"):
+        return None
+
+    if value.lower() in ("1", "true", "yes"):
+        from aiida.manage.configuration import get_config
+
+        return (
+            pathlib.Path(get_config().dirpath)
+            / "aiida_wannier90_workflows"
+            / "upf_cache.sqlite"
+        )
+
+    return pathlib.Path(value).expanduser()
+
+
+# The errors of a broken cache, e.g. a read-only folder, a locked or corrupt database
+_CACHE_ERRORS = (sqlite3.Error, OSError, ValueError)
+
+# Databases already set up by this process
+_initialized_paths = set()
+
+
+def _initialize(path: pathlib.Path) -> None:
+    """Create the folder and the table of the cache database, once per process."""
+    if path in _initialized_paths:
+        return
+
+    path.parent.mkdir(parents=True, exist_ok=True)
+    connection = sqlite3.connect(path, timeout=_TIMEOUT)
+    try:
+        # Readers do not block the writer, and vice versa, the mode is stored in the file
+        connection.execute("PRAGMA journal_mode=WAL")
+        connection.execute(
+            "CREATE TABLE IF NOT EXISTS upf "
+            "(md5 TEXT PRIMARY KEY, version INTEGER NOT NULL, facts TEXT NOT NULL)"
+        )
+    finally:
+        connection.close()
+    _initialized_paths.add(path)
+
+
+@contextlib.contextmanager
+def _connect(path: pathlib.Path) -> ty.Iterator[sqlite3.Connection]:
+    """Open the cache database, set it up if not done yet by this process."""
+    try:
+        _initialize(path)
+        connection = sqlite3.connect(path, timeout=_TIMEOUT)
+        try:
+            yield connection
+        finally:
+            connection.close()
+    except _CACHE_ERRORS:
+        # Set up again next time, e.g. the file was removed by another process
+        _initialized_paths.discard(path)
+        raise
+
+
+def load_upf_cache(md5: str) -> ty.Optional[dict]:
+    """Load the facts of a UPF file from the cache.
+
+    Entries saved by another version of ``parse_upf`` are ignored.
+
+    :param md5: md5 of the UPF file
+    :return: the facts, or None if not found or the cache is not enabled
+    """
+    path = get_upf_cache_path()
+    if path is None:
+        return None
+
+    try:
+        with _connect(path) as connection:
+            row = connection.execute(
+                "SELECT facts FROM upf WHERE md5 = ? AND version = ?",
+                (md5, UPF_FACTS_VERSION),
+            ).fetchone()
+        if row is None:
+            return None
+        return json.loads(row[0])
+    except _CACHE_ERRORS:
+        # The cache is only an optimization, never fail because of it
+        return None
+
+
+def save_upf_cache(md5: str, facts: dict) -> None:
+    """Save the facts of a UPF file into the cache, and evict the oldest entries beyond the cap.
+
+    :param md5: md5 of the UPF file
+    :param facts: JSON serializable facts, e.g. the output of ``parse_upf``
+    """
+    path = get_upf_cache_path()
+    if path is None:
+        return
+
+    try:
+        with _connect(path) as connection, connection:
+            connection.execute(
+                "INSERT OR REPLACE INTO upf (md5, version, facts) VALUES (?, ?, ?)",
+                (md5, UPF_FACTS_VERSION, json.dumps(facts)),
+            )
+            # A replaced row gets a new rowid, so the rowid orders the entries by age
+            connection.execute(
+                "DELETE FROM upf WHERE md5 IN "
+                "(SELECT md5 FROM upf ORDER BY rowid DESC LIMIT -1 OFFSET ?)",
+                (UPF_CACHE_MAX_ENTRIES,),
+            )
+    except _CACHE_ERRORS:
+        pass
+
+
+def clear_upf_cache() -> None:
+    """Remove all the entries of the cache."""
+    path = get_upf_cache_path()
+    if path is None or not path.exists():
+        return
+
+    try:
+        with _connect(path) as connection, connection:
+            connection.execute("DELETE FROM upf")
+    except _CACHE_ERRORS:
+        pass
@@ -2,10 +2,34 @@
 
 import json
 import os
+import pathlib
 import typing as ty
 import xml.sax
 
-__all__ = ("load_pseudo_metadata",)
+__all__ = (
+    "load_pseudo_metadata",
+    "register_pseudo_metadata",
+    "get_pseudo_metadata",
+)
+
+# Libraries of pseudopotential metadata searched by ``get_pseudo_metadata``, in order
+PSEUDO_METADATA_LIBRARIES = (
+    "semicore/SSSP_1.1_PBEsol_efficiency.json",
+    "semicore/SSSP_1.1_PBE_efficiency.json",
+    "semicore/PseudoDojo_0.4_PBE_SR_standard_upf.json",
+    "semicore/PseudoDojo_0.4_PBE_SR_stringent_upf.json",
+    "semicore/PseudoDojo_0.5_PBE_SR_standard_upf.json",
+    "semicore/PseudoDojo_0.5_PBE_SR_stringent_upf.json",
+    "semicore/PseudoDojo_0.4_LDA_SR_standard_upf.json",
+    "semicore/PseudoDojo_0.4_LDA_SR_stringent_upf.json",
+    "semicore/PseudoDojo_0.4_PBE_FR_standard_upf.json",
+    "semicore/PseudoDojo_0.4_PBEsol_FR_standard_upf.json",
+    "semicore/pslibrary_paw_relpbe_1.0.0.json",
+)
+
+# Libraries registered but not yet loaded, and the index of the loaded ones
+_pending_libraries = list(PSEUDO_METADATA_LIBRARIES)
+_pseudo_metadata_index = {}
 
 
 def load_pseudo_metadata(filename):
@@ -20,6 +44,47 @@ def load_pseudo_metadata(filename):
         return json.load(handle)
 
 
+def register_pseudo_metadata(library: ty.Union[str, os.PathLike, ty.Mapping]) -> None:
+    """Register an extra library of pseudopotential metadata for ``get_pseudo_metadata``.
+
+    The library is only loaded at the next lookup, and it has lower priority than the
+    libraries registered before it.
+
+    :param library: path of a json file, relative to the current working directory or absolute,
+        or a dict with the same content, e.g. ``{"Si": {"md5": ..., "pswfcs": [...], "semicores": [...]}}``
+    """
+    if not isinstance(library, ty.Mapping):
+        # Resolve now, the working directory may change before the library is loaded
+        library = pathlib.Path(library).resolve()
+    _pending_libraries.append(library)
+
+
+def get_pseudo_metadata(element: str, md5sum: str) -> ty.Optional[dict]:
+    """Return the metadata of a pseudopotential in the registered libraries.
+
+    The json files are loaded once, and indexed by element and md5. The built-in libraries
+    ``PSEUDO_METADATA_LIBRARIES`` are relative to this package.
+
+    :param element: the element of the pseudopotential
+    :param md5sum: the md5 of the pseudopotential file
+    :return: the metadata, or None if not found
+    """
+    while _pending_libraries:
+        library = _pending_libraries[0]
+        if isinstance(library, pathlib.Path):
+            with open(library, encoding="utf-8") as handle:
+                library = json.load(handle)
+        elif not isinstance(library, ty.Mapping):
+            library = load_pseudo_metadata(library)
+        # Only drop the library once loaded, so that a failed load is retried at the next lookup
+        _pending_libraries.pop(0)
+        for key, metadata in library.items():
+            if "md5" in metadata:
+                _pseudo_metadata_index.setdefault((key, metadata["md5"]), metadata)
+
+    return _pseudo_metadata_index.get((element, md5sum), None)
+
+
 def md5(filename):
     """Get md5 of a file."""
     import hashlib
@@ -1,5 +1,10 @@
 """Utility functions for parsing pseudo potential file."""
 
+from collections import OrderedDict
+from copy import deepcopy
+import io
+import re
+import typing as ty
 import xml.etree.ElementTree as ET
 
 from aiida import orm
@@ -9,10 +14,12 @@ __all__ = (  # for the content of UPF, i.e. these functions accept str as parame
     "parse_pswfc_nosoc",
     "parse_pswfc_soc",
     "parse_number_of_pswfc",
+    "parse_upf",
     # for orm.UpfData, i.e. these functions accept orm.UpfData as parameter
     "get_number_of_electrons_from_upf",
     "get_projections_from_upf",
     "get_number_of_projections_from_upf",
+    "get_upf_facts",
     # for orm.StructreData, i.e. these functions accept orm.StructreData as parameter
     # 'get_number_of_electrons',
     # 'get_projections',
@@ -24,31 +31,51 @@ __all__ = (  # for the content of UPF, i.e. these functions accept str as parame
 )
 
 
-def get_ppheader(upf_content: str) -> str:
-    """Get PP_HEADER."""
-    upf_content = upf_content.split("\n")
-    # get PP_HEADER block
-    ppheader_block = ""
-    found_begin = False
-    found_end = False
-    for line in upf_content:
-        if "<PP_HEADER" in line:
-            ppheader_block += line + "\n"
-            if not found_begin:
-                found_begin = True
+def _iter_lines(upf_content: str) -> ty.Iterator[str]:
+    """Iterate the lines of the UPF content, without splitting the whole content at once."""
+    return iter(io.StringIO(upf_content))
+
+
+def _read_ppheader(lines: ty.Iterator[str]) -> str:
+    """Consume the lines until the end of PP_HEADER, and return the PP_HEADER block."""
+    ppheader_block = []
+    for line in lines:
+        if not ppheader_block:
+            if "<PP_HEADER" in line:
+                ppheader_block.append(line)
                 if "/>" in line or "</PP_HEADER>" in line:
                     # in the same line
                     break
+            continue
+        ppheader_block.append(line)
+        if "/>" in line or "</PP_HEADER>" in line:
+            break
+    return "".join(ppheader_block)
+
+
+def _read_block(lines: ty.Iterator[str], tag: str) -> str:
+    """Consume the lines until the end of the block ``tag``, and return the block.
+
+    Only the exact tag is matched, e.g. for ``PP_PSWFC`` the ``PP_PSWFC.1`` elements
+    inside the ``PP_FULL_WFC`` block of PAW pseudos are skipped.
+    """
+    begin = re.compile(rf"<{tag}[\s/>]")
+    end = re.compile(rf"</{tag}\s*>")
+    block = []
+    for line in lines:
+        if not block:
+            # The substring test is much faster than the regex, and fails for most lines
+            if tag not in line or not begin.search(line):
                 continue
-        if found_begin and ("/>" in line or "</PP_HEADER>" in line):
-            ppheader_block += line + "\n"
-            if not found_end:
-                found_end = True
-                break
-        if found_begin:
-            ppheader_block += line + "\n"
-    # print(ppheader_block)
-    return ppheader_block
+        block.append(line)
+        if end.search(line):
+            break
+    return "".join(block)
+
+
+def get_ppheader(upf_content: str) -> str:
+    """Get PP_HEADER."""
+    return _read_ppheader(_iter_lines(upf_content))
 
 
 def is_soc_pseudo(upf_content: str) -> bool:
@@ -59,7 +86,11 @@ def is_soc_pseudo(upf_content: str) -> bool:
     :return: [description]
     :rtype: bool
     """
-    ppheader_block = get_ppheader(upf_content)
+    return _parse_has_so(get_ppheader(upf_content))
+
+
+def _parse_has_so(ppheader_block: str) -> bool:
+    """Check if the PP_HEADER block is of a SOC pseudo."""
     # parse XML
     PP_HEADER = ET.XML(ppheader_block)  # pylint: disable=invalid-name
     if len(PP_HEADER.attrib) == 0:
@@ -83,7 +114,11 @@ def parse_zvalence(upf_content: str) -> float:
     :return: z_valence of the UPF file
     :rtype: float
     """
-    ppheader_block = get_ppheader(upf_content)
+    return _parse_zvalence(get_ppheader(upf_content))
+
+
+def _parse_zvalence(ppheader_block: str) -> float:
+    """Get z_valence from the PP_HEADER block."""
     num_electrons = 0
     # parse XML
     PP_HEADER = ET.XML(ppheader_block)  # pylint: disable=invalid-name
@@ -168,8 +203,7 @@ def get_number_of_electrons_from_upf(upf: orm.UpfData) -> float:
     :return: number of electrons
     :rtype: float
     """
-    upf_content = get_upf_content(upf)
-    return parse_zvalence(upf_content)
+    return get_upf_facts(upf)["z_valence"]
 
 
 def parse_pswfc_soc(upf_content: str) -> list:
@@ -185,25 +219,14 @@ def parse_pswfc_soc(upf_content: str) -> list:
     :return: list of dict, each dict contains 3 keys for quantum number n, l, j
     :rtype: list
     """
-    if not is_soc_pseudo(upf_content):
+    upf_facts = parse_upf(upf_content)
+    if not upf_facts["has_so"]:
         raise ValueError("Only accept SOC pseudo")
-    upf_content = upf_content.split("\n")
-    # get PP_SPIN_ORB block
-    pswfc_block = ""
-    found_begin = False
-    found_end = False
-    for line in upf_content:
-        if "PP_SPIN_ORB" in line:
-            pswfc_block += line + "\n"
-            if not found_begin:
-                found_begin = True
-                continue
-            if not found_end:
-                found_end = True
-                break
-        if found_begin:
-            pswfc_block += line + "\n"
+    return upf_facts["pswfc"]
 
+
+def _parse_pswfc_soc(pswfc_block: str) -> list:
+    """Parse the PP_SPIN_ORB block."""
     # contains element: {'n', 'l', 'j'} for 3 quantum numbers
     projections = []
     # parse XML
@@ -243,32 +266,19 @@ def parse_pswfc_nosoc(upf_content: str) -> list:
     :return: list of dict, each dict contains 1 key for quantum number l
     :rtype: list
     """
-    if is_soc_pseudo(upf_content):
+    upf_facts = parse_upf(upf_content)
+    if upf_facts["has_so"]:
         raise ValueError("Only accept non-SOC pseudo")
-    upf_content = upf_content.split("\n")
-    # get PP_PSWFC block
-    pswfc_block = ""
-    found_begin = False
-    found_end = False
-    for line in upf_content:
-        if "PP_PSWFC" in line:
-            pswfc_block += line + "\n"
-            if not found_begin:
-                found_begin = True
-                continue
-            if not found_end:
-                found_end = True
-                break
-        if found_begin:
-            pswfc_block += line + "\n"
+    return upf_facts["pswfc"]
 
+
+def _parse_pswfc_nosoc(pswfc_block: str) -> list:
+    """Parse the PP_PSWFC block."""
     projections = []
     # parse XML
     PP_PSWFC = ET.XML(pswfc_block)  # pylint: disable=invalid-name
     if len(list(PP_PSWFC)) == 0:
         # old upf format
-        import re
-
         r = re.compile(r"[\d]([SPDF])")  # pylint: disable=invalid-name
         spdf = r.findall(PP_PSWFC.text)
         for orbit in spdf:
@@ -298,24 +308,11 @@ def parse_pswfc_energy_nosoc(upf_content: str) -> list:
     :return: list of dict, each dict contains 1 key for quantum number l
     :rtype: list
     """
-    if is_soc_pseudo(upf_content):
+    lines = _iter_lines(upf_content)
+    if _parse_has_so(_read_ppheader(lines)):
         raise ValueError("Only accept non-SOC pseudo")
-    upf_content = upf_content.split("\n")
     # get PP_PSWFC block
-    pswfc_block = ""
-    found_begin = False
-    found_end = False
-    for line in upf_content:
-        if "PP_PSWFC" in line:
-            pswfc_block += line + "\n"
-            if not found_begin:
-                found_begin = True
-                continue
-            if not found_end:
-                found_end = True
-                break
-        if found_begin:
-            pswfc_block += line + "\n"
+    pswfc_block = _read_block(lines, "PP_PSWFC")
 
     projections = []
     # parse XML
@@ -324,8 +321,6 @@ def parse_pswfc_energy_nosoc(upf_content: str) -> list:
         raise NotImplementedError
         #  pylint: disable=unreachable
         # old upf format
-        import re
-
         r = re.compile(r"[\d]([SPDF])")  # pylint: disable=invalid-name
         spdf = r.findall(PP_PSWFC.text)
         for orbit in spdf:
@@ -383,16 +378,16 @@ def get_projections_from_upf(upf: orm.UpfData):
             return False
 
     orbit_map = {0: "s", 1: "p", 2: "d", 3: "f"}
-    upf_content = get_upf_content(upf)
+    upf_facts = get_upf_facts(upf)
     wannier_projections = []
-    has_so = is_soc_pseudo(upf_content)
+    has_so = upf_facts["has_so"]
     if not has_so:
-        pswfc = parse_pswfc_nosoc(upf_content)
+        pswfc = upf_facts["pswfc"]
         for wfc in pswfc:
             wannier_projections.append(f'{upf.element}: {orbit_map[wfc["l"]]}')
     else:
         pswfc = []
-        for wfc in parse_pswfc_soc(upf_content):
+        for wfc in upf_facts["pswfc"]:
             pswfc.append(Orbit(wfc))
         # First sort by n, then l, then j, in ascending order
         sorted_pswfc = sorted(pswfc)  # will use __lt__
@@ -441,15 +436,17 @@ def parse_number_of_pswfc(upf_content: str) -> int:
     :return: number of PSWFC
     :rtype: int
     """
+    return parse_upf(upf_content)["number_of_pswfc"]
+
+
+def _count_pswfc(pswfc: list, has_so: bool) -> int:
+    """Count the orbitals of the parsed PSWFC."""
     num_projections = 0
-    has_so = is_soc_pseudo(upf_content)
     if not has_so:
-        pswfc = parse_pswfc_nosoc(upf_content)
         for wfc in pswfc:
             l = wfc["l"]
             num_projections += 2 * l + 1
     else:
-        pswfc = parse_pswfc_soc(upf_content)
         # For a given quantum number l, there are 2 cases:
         # 1. j = l - 1/2 then there are 2*j + 1 = 2l states
         # 2. j = l + 1/2 then there are 2*j + 1 = 2l + 2 states so we have to add another 2
@@ -471,5 +468,78 @@ def get_number_of_projections_from_upf(upf: orm.UpfData) -> int:
     :return: number of projections in the UPF file
     :rtype: int
     """
-    upf_content = get_upf_content(upf)
-    return parse_number_of_pswfc(upf_content)
+    return get_upf_facts(upf)["number_of_pswfc"]
+
+
+# Bump whenever the output of `parse_upf` changes, so older on-disk cache entries are not reused
+UPF_FACTS_VERSION = 2
+
+
+def parse_upf(upf_content: str) -> dict:
+    """Parse z_valence, SOC flag and PSWFC of a UPF file in a single pass.
+
+    The lines are scanned only once, and the scan stops right after the needed blocks,
+    i.e. PP_PSWFC for non-SOC pseudos, or PP_SPIN_ORB for SOC pseudos.
+    No AiiDA dependencies.
+
+    :param upf_content: the content of the UPF file
+    :type upf_content: str
+    :return: dict with keys `z_valence`, `has_so`, `pswfc` and `number_of_pswfc`, where `pswfc`
+    is the same as the output of `parse_pswfc_soc` or `parse_pswfc_nosoc`
+    :rtype: dict
+    """
+    lines = _iter_lines(upf_content)
+    ppheader_block = _read_ppheader(lines)
+    has_so = _parse_has_so(ppheader_block)
+    # PP_SPIN_ORB is after PP_PSWFC, continue scanning from the end of PP_HEADER
+    if has_so:
+        pswfc = _parse_pswfc_soc(_read_block(lines, "PP_SPIN_ORB"))
+    else:
+        pswfc = _parse_pswfc_nosoc(_read_block(lines, "PP_PSWFC"))
+
+    return {
+        "z_valence": _parse_zvalence(ppheader_block),
+        "has_so": has_so,
+        "pswfc": pswfc,
+        "number_of_pswfc": _count_pswfc(pswfc, has_so),
+    }
+
+
+# Number of pseudos kept in memory, a few whole pseudo families
+UPF_FACTS_CACHE_SIZE = 512
+
+# md5 of UPF file -> output of `parse_upf`, least recently used first
+_upf_facts_cache = OrderedDict()
+
+
+def get_upf_facts(upf: orm.UpfData) -> dict:
+    """Aiida wrapper for `parse_upf`, the results are cached by the md5 of the UPF file.
+
+    The in-memory cache keeps the `UPF_FACTS_CACHE_SIZE` most recently used pseudos.
+
+    If the on-disk cache is enabled, see `aiida_wannier90_workflows.utils.pseudo.cache`,
+    it is consulted before reading the UPF file, so the facts survive process restarts.
+
+    :param upf: the UPF file
+    :type upf: aiida.orm.UpfData
+    :return: see `parse_upf`
+    :rtype: dict
+    """
+    from .cache import load_upf_cache, save_upf_cache
+
+    md5 = upf.base.attributes.get("md5", None)
+    if md5 is None:
+        return parse_upf(get_upf_content(upf))
+
+    if md5 in _upf_facts_cache:
+        _upf_facts_cache.move_to_end(md5)
+    else:
+        upf_facts = load_upf_cache(md5)
+        if upf_facts is None:
+            upf_facts = parse_upf(get_upf_content(upf))
+            save_upf_cache(md5, upf_facts)
+        _upf_facts_cache[md5] = upf_facts
+        if len(_upf_facts_cache) > UPF_FACTS_CACHE_SIZE:
+            _upf_facts_cache.popitem(last=False)
+    # Copy, so the cached facts cannot be modified by the caller
+    return deepcopy(_upf_facts_cache[md5])
@@ -10,6 +10,7 @@ __all__ = (
     "erfc_scdm",
     "fit_scdm_mu_sigma_raw",
     "fit_scdm_mu_sigma",
+    "get_energy_of_projectability_raw",
     "get_energy_of_projectability",
 )
 
@@ -21,11 +22,98 @@ def erfc_scdm(x, mu, sigma):
     return 0.5 * erfc((x - mu) / sigma)
 
 
-def fit_erfc(f, xdata, ydata):  # pylint: disable=invalid-name
+def fit_erfc(f, xdata, ydata, p0=None, sigma=None):  # pylint: disable=invalid-name
     """Fit error function."""
     from scipy.optimize import curve_fit
 
-    return curve_fit(f, xdata, ydata, bounds=([-50, 0], [50, 50]))
+    return curve_fit(f, xdata, ydata, p0=p0, sigma=sigma, bounds=([-50, 0], [50, 50]))
+
+
+def guess_scdm_mu_sigma(
+    bands: np.array, projections: np.array
+) -> ty.Tuple[float, float]:
+    """Estimate the erfc parameters from the projectability data, without fitting.
+
+    ``mu`` is the energy where the projectability crosses 0.5, ``sigma`` is derived
+    from the slope, i.e. from the energies where the projectability crosses
+    ``erfc_scdm(mu -/+ sigma) = 0.5 * erfc(-/+1)``.
+    The crossing of a level is the n-th lowest energy, where n is the number of
+    points with projectability larger than the level; this is exact for a
+    monotonic projectability and robust against noise, and only needs O(N)
+    partitions instead of a full sort.
+
+    :param bands: energies, any shape
+    :param projections: projectabilities, same shape as ``bands``
+    :return: mu, sigma, within the bounds of ``fit_erfc``
+    """
+    from scipy.special import erfc  # pylint: disable=no-name-in-module
+
+    bands_flat = np.ravel(bands)
+    projwfc_flat = np.ravel(projections)
+
+    def get_crossing(level: float) -> float:
+        idx = min(np.count_nonzero(projwfc_flat >= level), bands_flat.size - 1)
+        return np.partition(bands_flat, idx)[idx]
+
+    mu = get_crossing(0.5)
+    sigma = (get_crossing(0.5 * erfc(1)) - get_crossing(0.5 * erfc(-1))) / 2
+    if sigma <= 0:
+        sigma = (bands_flat.max() - bands_flat.min()) / 10
+
+    return float(np.clip(mu, -50, 50)), float(np.clip(sigma, 1e-3, 50))
+
+
+def fit_erfc_binned(
+    bands: np.array, projections: np.array, num_bins: int = 1000
+) -> np.array:
+    """Fit error function on projectability data binned by energy, then on all the points.
+
+    The points are averaged in ``num_bins`` energy bins, and the bins are fitted
+    with weights equal to the number of points, starting from the initial guess
+    of ``guess_scdm_mu_sigma``. The bins are uniform over the whole energy range,
+    so a bin can be as wide as ``sigma``; the binned result is therefore only used
+    as the starting point of a fit of all the points, which then converges in a few
+    iterations. The binned fit is skipped if there are fewer points than bins,
+    and its result is discarded if it fails, if ``sigma`` hits the bounds, or if
+    ``mu`` is outside the energy range.
+
+    :param bands: energies, any shape
+    :param projections: projectabilities, same shape as ``bands``
+    :param num_bins: number of energy bins
+    :return: the fitted mu, sigma
+    """
+    bands_flat = np.ravel(bands)
+    projwfc_flat = np.ravel(projections)
+    p0 = guess_scdm_mu_sigma(bands_flat, projwfc_flat)
+
+    if bands_flat.size > num_bins:
+        counts, edges = np.histogram(bands_flat, bins=num_bins)
+        sum_bands, _ = np.histogram(bands_flat, bins=edges, weights=bands_flat)
+        sum_projwfc, _ = np.histogram(bands_flat, bins=edges, weights=projwfc_flat)
+        occupied = counts > 0
+        counts = counts[occupied]
+        try:
+            popt, _ = fit_erfc(  # pylint: disable=unbalanced-tuple-unpacking
+                erfc_scdm,
+                sum_bands[occupied] / counts,
+                sum_projwfc[occupied] / counts,
+                p0=p0,
+                sigma=1 / np.sqrt(counts),
+            )
+        except RuntimeError:
+            popt = None
+        if (
+            popt is not None
+            and 0 < popt[1] < 50
+            and bands_flat.min() <= popt[0] <= bands_flat.max()
+        ):
+            p0 = popt
+
+    # Refine on all the points
+    popt, _ = fit_erfc(  # pylint: disable=unbalanced-tuple-unpacking
+        erfc_scdm, bands_flat, projwfc_flat, p0=p0
+    )
+    return popt
 
 
 def fit_scdm_mu_sigma_raw(
@@ -33,6 +121,7 @@ def fit_scdm_mu_sigma_raw(
     projections: np.array,
     sigma_factor: float = 3.0,
     return_data: bool = False,
+    fast: bool = False,
 ) -> ty.Union[ty.Tuple[float, float], ty.Tuple[float, float, np.array]]:
     """Fit mu parameter for the SCDM-k method.
 
@@ -49,14 +138,21 @@ def fit_scdm_mu_sigma_raw(
     :param sigma_factor: scdm_mu will be set to::
         scdm_mu = E(projectability==max_projectability) - sigma_factor * scdm_sigma
         Pass sigma_factor = 0 if you do not want to shift
+    :param fast: start the fit from an analytic guess refined on the data binned
+        by energy, see ``fit_erfc_binned``. Faster for dense kpoint meshes, since
+        the fit of all the points then only needs a few iterations.
     :return: scdm_mu, scdm_sigma,
         optional data (shape 2 * N, 0th row energy, 1st row projectability)
     """
-    sorted_bands, sorted_projwfc = sort_projectability_arrays(bands, projections)
-
-    popt, pcov = fit_erfc(  # pylint: disable=unbalanced-tuple-unpacking,unused-variable
-        erfc_scdm, sorted_bands, sorted_projwfc
-    )
+    if fast:
+        popt = fit_erfc_binned(bands, projections)
+    else:
+        sorted_bands, sorted_projwfc = sort_projectability_arrays(bands, projections)
+        popt, pcov = (
+            fit_erfc(  # pylint: disable=unbalanced-tuple-unpacking,unused-variable
+                erfc_scdm, sorted_bands, sorted_projwfc
+            )
+        )
     mu = popt[0]
     sigma = popt[1]
 
@@ -64,6 +160,10 @@ def fit_scdm_mu_sigma_raw(
     scdm_mu = mu - sigma * sigma_factor
 
     if return_data:
+        if fast:
+            sorted_bands, sorted_projwfc = sort_projectability_arrays(
+                bands, projections
+            )
         data = np.zeros((2, len(sorted_bands)))
         data[0, :] = sorted_bands
         data[1, :] = sorted_projwfc
@@ -72,11 +172,18 @@ def fit_scdm_mu_sigma_raw(
     return scdm_mu, scdm_sigma
 
 
+# Extra of the ``Pw2wannier90BaseWorkChain`` recording the ``fast`` argument used
+# to fit scdm_mu & scdm_sigma, so the fitting can be reproduced afterwards
+SCDM_FIT_FAST_EXTRA = "scdm_fit_fast"
+
+
 def fit_scdm_mu_sigma(
     bands: orm.BandsData,
     projections: orm.ProjectionData,
     sigma_factor: orm.Float,
     return_data: bool = False,
+    fast: bool = False,
+    use_cache: bool = False,
 ) -> ty.Union[ty.Tuple[float, float], ty.Tuple[float, float, np.array]]:
     """Fit scdm_mu & scdm_sigma based on projectability.
 
@@ -86,41 +193,189 @@ def fit_scdm_mu_sigma(
     :param bands: band structure of the projwfc output
     :param projections: projectability of the projwfc output
     :param sigma_factor: sigma_factor of SCDM
+    :param fast: use the fast fitting mode of `fit_scdm_mu_sigma_raw`
+    :param use_cache: reuse the results cached in the extras of the projections
+        node, and cache new results there, see `get_cached_result`. Off by default,
+        since it modifies the extras of nodes possibly shared by other workflows.
     """
-    bands_array, projections_array = get_projectability_arrays(bands, projections)
-    return fit_scdm_mu_sigma_raw(
-        bands_array, projections_array, sigma_factor.value, return_data
-    )
+    query = {
+        "function": "fit_scdm_mu_sigma",
+        "sigma_factor": float(sigma_factor.value),
+        "fast": fast,
+    }
+    cached = get_cached_result(bands, projections, query) if use_cache else None
+    if cached is not None and not return_data:
+        return tuple(cached)
 
+    bands_array, projections_array = get_projectability_arrays(bands, projections)
+    if cached is not None:
+        data = np.vstack(sort_projectability_arrays(bands_array, projections_array))
+        return (*cached, data)
 
-def get_projectability_arrays(bands: orm.BandsData, projections: orm.ProjectionData):
+    result = fit_scdm_mu_sigma_raw(
+        bands_array, projections_array, sigma_factor.value, return_data, fast=fast
+    )
+    if use_cache:
+        set_cached_result(bands, projections, query, [float(_) for _ in result[:2]])
+    return result
+
+
+SCDM_CACHE_EXTRA = "scdm_cache"
+
+# Records with a different version are ignored, bump it when the results of the
+# cached functions change, e.g. when `fit_erfc_binned` is modified
+SCDM_CACHE_VERSION = 2
+
+# The oldest records are removed once the cache exceeds this number of records
+SCDM_CACHE_MAX_RECORDS = 32
+
+
+def _as_node_list(
+    nodes: ty.Union[orm.Node, ty.Sequence[orm.Node]]
+) -> ty.List[orm.Node]:
+    """Return a list of nodes, for a single node or a sequence of spin channels."""
+    if isinstance(nodes, orm.Node):
+        return [nodes]
+    return list(nodes)
+
+
+def _get_cache_key(
+    bands_nodes: ty.List[orm.BandsData],
+    projections_nodes: ty.List[orm.ProjectionData],
+    query: dict,
+) -> dict:
+    """Return the fields identifying a cache record."""
+    return {
+        "version": SCDM_CACHE_VERSION,
+        "bands": [_.uuid for _ in bands_nodes],
+        "projections": [_.uuid for _ in projections_nodes],
+        "query": query,
+    }
+
+
+def get_cached_result(
+    bands: ty.Union[orm.BandsData, ty.Sequence[orm.BandsData]],
+    projections: ty.Union[orm.ProjectionData, ty.Sequence[orm.ProjectionData]],
+    query: dict,
+) -> ty.Optional[list]:
+    """Return a result cached in the extras of the projections node.
+
+    The results are stored in the ``SCDM_CACHE_EXTRA`` extra of the (first)
+    projections node, as a list of records containing the ``SCDM_CACHE_VERSION``,
+    the UUIDs of the bands and projections nodes, the ``query`` and the ``result``.
+    Being extras, they survive daemon restarts and are shared by all the workflows
+    and scripts using the same nodes.
+
+    :param query: function name and arguments identifying the result
+    :return: the cached result, None if not found or if the nodes are not stored
+    """
+    bands_nodes = _as_node_list(bands)
+    projections_nodes = _as_node_list(projections)
+    if not all(_.is_stored for _ in bands_nodes + projections_nodes):
+        return None
+
+    record = _get_cache_key(bands_nodes, projections_nodes, query)
+    for cached in projections_nodes[0].base.extras.get(SCDM_CACHE_EXTRA, []):
+        if all(cached.get(key) == val for key, val in record.items()):
+            return cached["result"]
+    return None
+
+
+def set_cached_result(
+    bands: ty.Union[orm.BandsData, ty.Sequence[orm.BandsData]],
+    projections: ty.Union[orm.ProjectionData, ty.Sequence[orm.ProjectionData]],
+    query: dict,
+    result: list,
+) -> None:
+    """Cache a result in the extras of the projections node.
+
+    See ``get_cached_result``, nothing is cached if the nodes are not stored.
+    A record with the same nodes and ``query`` is replaced, and only the latest
+    ``SCDM_CACHE_MAX_RECORDS`` records are kept, so the extra stays small even if
+    several processes fill it concurrently.
+
+    .. warning:: the extra is read, modified and written back without any lock,
+        so when several processes cache results on the same projections node at
+        the same time, the records written by all but the last one can be lost.
+        This only costs a recomputation, the cache never returns a wrong result.
+
+    :param query: function name and arguments identifying the result
+    :param result: JSON-serializable result, NaN should be replaced by None
+    """
+    bands_nodes = _as_node_list(bands)
+    projections_nodes = _as_node_list(projections)
+    if not all(_.is_stored for _ in bands_nodes + projections_nodes):
+        return
+
+    key = _get_cache_key(bands_nodes, projections_nodes, query)
+    extras = projections_nodes[0].base.extras
+    cache = [
+        cached
+        for cached in extras.get(SCDM_CACHE_EXTRA, [])
+        if not all(cached.get(name) == val for name, val in key.items())
+    ]
+    cache.append({**key, "result": result})
+    extras.set(SCDM_CACHE_EXTRA, cache[-SCDM_CACHE_MAX_RECORDS:])
+
+
+def get_projectability_arrays(
+    bands: ty.Union[orm.BandsData, ty.Sequence[orm.BandsData]],
+    projections: ty.Union[orm.ProjectionData, ty.Sequence[orm.ProjectionData]],
+):
     """Calculate projectability array.
 
     Accept aiida orm class, return numpy arrays:
         (bands_array, projections_array), where each array has shape (num_kpt, num_bands)
 
+    For spin-polarized calculations, pass the spin up and down nodes as lists, e.g.
+    ``[bands_up, bands_down]`` and ``[projections_up, projections_down]``, then the
+    spin channels are concatenated along the bands axis.
+
     :param bands: [description]
     :type bands: orm.BandsData
     :param projections: [description]
     :type projections: orm.ProjectionData
     """
-    # List of specifications of atomic orbitals in dictionary form
-    orbitals_list = [i.get_orbital_dict() for i in projections.get_orbitals()]
-    # Remove the '_orbital_type' key from the dictionaries, otherwise the get_projections fail
-    remove_key = "_orbital_type"
-    for o in orbitals_list:
-        if remove_key in o:
-            o.pop(remove_key)
-    # Sum of the projections on all atomic orbitals, shape num_kpoints * num_bands
-    projections_array = sum(
-        sum(x[1] for x in projections.get_projections(**orb_dict))
-        for orb_dict in orbitals_list
-    )
-    # shape num_kpoints * num_bands, TODO support spin
-    bands_array = bands.get_bands()
+    if isinstance(bands, orm.BandsData) and isinstance(projections, orm.ProjectionData):
+        # shape num_kpoints * num_bands, or num_spin * num_kpoints * num_bands
+        # if the BandsData is spin-resolved
+        return bands.get_bands(), get_total_projections(projections)
+
+    if len(bands) != len(projections):
+        raise ValueError(
+            f"Different number of spin channels: {len(bands)} bands, {len(projections)} projections"
+        )
+    arrays = [get_projectability_arrays(*_) for _ in zip(bands, projections)]
+    bands_array = np.concatenate([_[0] for _ in arrays], axis=-1)
+    projections_array = np.concatenate([_[1] for _ in arrays], axis=-1)
     return bands_array, projections_array
 
 
+def get_total_projections(projections: orm.ProjectionData) -> np.array:
+    """Sum the projections on all atomic orbitals.
+
+    The stored projection arrays are read once and summed in-place, instead of
+    calling ``ProjectionData.get_projections`` for each orbital, which filters
+    the whole list of orbitals every time.
+
+    :param projections: projectability of the projwfc output
+    :return: shape num_kpoints * num_bands
+    """
+    num_orbitals = len(projections.base.attributes.get("orbital_dicts"))
+
+    projections_array = None
+    for idx in range(num_orbitals):
+        array = projections.get_array(
+            f"proj_{projections._from_index_to_arrayname(idx)}"
+        )
+        if projections_array is None:
+            projections_array = np.array(array, dtype=float)
+        else:
+            projections_array += array
+
+    return projections_array
+
+
 def sort_projectability_arrays(bands: np.array, projections: np.array):
     """Sort projectability arrays by energy in ascending order.
 
@@ -134,26 +389,92 @@ def sort_projectability_arrays(bands: np.array, projections: np.array):
     # sort by energy
     # sorted_bands, sorted_projwfc = zip(*sorted(zip(bands_flat, projwfc_flat)))
     # use numpy, faster
-    data = np.vstack((bands_flat, projwfc_flat))  # shape 2 * N
-    ind = np.argsort(data, axis=1)[0, :]  # sort by energy
-    data = data[:, ind]
-    sorted_bands = data[0, :]
-    sorted_projwfc = data[1, :]
+    ind = np.argsort(bands_flat)  # sort by energy
+    sorted_bands = bands_flat[ind]
+    sorted_projwfc = projwfc_flat[ind]
     return sorted_bands, sorted_projwfc
 
 
+def get_energy_of_projectability_raw(
+    bands: np.array,
+    projections: np.array,
+    thresholds: ty.Union[float, ty.Sequence[float]] = 0.9,
+) -> ty.Union[float, np.array]:
+    """Return the highest energy whose projectability is >= each threshold.
+
+    All the thresholds are answered in one pass without sorting the energies:
+    each point is assigned to the largest threshold it satisfies, the maximum
+    energy of each threshold is then accumulated from the largest threshold
+    to the smallest one.
+
+    :param bands: energies, any shape
+    :param projections: projectabilities, same shape as ``bands``
+    :param thresholds: a threshold or a list of thresholds
+    :return: the energy for a single threshold, or an array of energies for a
+        list of thresholds, NaN if no projectability reaches a threshold
+    """
+    bands_flat = np.ravel(bands)
+    projwfc_flat = np.ravel(projections)
+    thresholds_arr = np.atleast_1d(np.asarray(thresholds, dtype=float))
+
+    order = np.argsort(thresholds_arr)
+    # Number of thresholds satisfied by each point, 0 means none
+    bucket = np.searchsorted(thresholds_arr[order], projwfc_flat, side="right")
+    max_energy = np.full(len(thresholds_arr) + 1, -np.inf)
+    np.maximum.at(max_energy, bucket, bands_flat)
+    # A point satisfying a threshold also satisfies all the smaller ones
+    max_energy = np.maximum.accumulate(max_energy[::-1])[::-1][1:]
+    max_energy[np.isneginf(max_energy)] = np.nan
+
+    energies = np.empty_like(max_energy)
+    energies[order] = max_energy
+    if np.ndim(thresholds) == 0:
+        return energies[0]
+    return energies
+
+
 def get_energy_of_projectability(
-    bands: orm.BandsData, projections: orm.ProjectionData, thresholds: float = 0.9
-):
+    bands: orm.BandsData,
+    projections: orm.ProjectionData,
+    thresholds: ty.Union[float, ty.Sequence[float]] = 0.9,
+    use_cache: bool = False,
+) -> ty.Union[float, np.array]:
     """Return energy corresponds to projectability = thresholds.
 
     :param bands: [description]
     :param projections: [description]
-    :param thresholds: [description]
+    :param thresholds: a threshold or a list of thresholds, all of them are
+        computed in one pass, see `get_energy_of_projectability_raw`
+    :param use_cache: reuse the results cached in the extras of the projections
+        node, and cache new results there, see `get_cached_result`. Off by default,
+        since it modifies the extras of nodes possibly shared by other workflows.
+    :raises ValueError: if no projectability reaches a single threshold
     """
-    bands_array, projections_array = get_projectability_arrays(bands, projections)
-    sorted_bands, sorted_projwfc = sort_projectability_arrays(
-        bands_array, projections_array
-    )
-    max_ind = np.max(np.argwhere(sorted_projwfc >= thresholds).flatten())
-    return sorted_bands[max_ind]
+    query = {
+        "function": "get_energy_of_projectability",
+        "thresholds": np.atleast_1d(thresholds).astype(float).tolist(),
+    }
+    cached = get_cached_result(bands, projections, query) if use_cache else None
+    if cached is not None:
+        energies = np.array([np.nan if _ is None else _ for _ in cached])
+    else:
+        bands_array, projections_array = get_projectability_arrays(bands, projections)
+        energies = np.atleast_1d(
+            get_energy_of_projectability_raw(
+                bands_array, projections_array, query["thresholds"]
+            )
+        )
+        if use_cache:
+            # NaN is not JSON-serializable
+            set_cached_result(
+                bands,
+                projections,
+                query,
+                [None if np.isnan(_) else float(_) for _ in energies],
+            )
+
+    if np.ndim(thresholds) == 0:
+        if np.isnan(energies[0]):
+            raise ValueError(f"No projectability >= {thresholds}")
+        return energies[0]
+    return energies
@@ -73,10 +73,17 @@ def plot_scdm_fit_raw(  # pylint: disable=too-many-arguments
 
 
 def plot_scdm_fit(  # pylint: disable=too-many-locals
-    workchain: int, save: bool = False
+    workchain: int, save: bool = False, use_cache: bool = False
 ):
-    """Plot the projectabilities distribution of SCDM fitting."""
-    from aiida_wannier90_workflows.utils.scdm import fit_scdm_mu_sigma
+    """Plot the projectabilities distribution of SCDM fitting.
+
+    :param use_cache: reuse the fitting cached in the extras of the projections,
+        see ``fit_scdm_mu_sigma``.
+    """
+    from aiida_wannier90_workflows.utils.scdm import (
+        SCDM_FIT_FAST_EXTRA,
+        fit_scdm_mu_sigma,
+    )
     from aiida_wannier90_workflows.utils.workflows import get_last_calcjob
 
     valid_classes = [Wannier90BandsWorkChain, Wannier90WorkChain]
@@ -99,18 +106,24 @@ def plot_scdm_fit(  # pylint: disable=too-many-locals
     projections = projcalc.outputs.projections
     bands = projcalc.outputs.bands
 
-    mu_fit, sigma_fit, data = fit_scdm_mu_sigma(
-        bands, projections, sigma_factor=orm.Float(0), return_data=True
-    )
-
     print(f"{formula:6s}:")
     print(f"        fermi_energy = {fermi_energy}, mu = {mu}, sigma = {sigma}")
 
     # check the fitting are consistent
     eps = 1e-6
-    assert abs(sigma - sigma_fit) < eps
     # sigma_factor = workchain.inputs.scdm_sigma_factor.value
     sigma_factor = 3
+    # Workchains without the extra were fitted before the fast mode existed
+    fast = p2w_workchain.base.extras.get(SCDM_FIT_FAST_EXTRA, False)
+    mu_fit, sigma_fit, data = fit_scdm_mu_sigma(
+        bands,
+        projections,
+        sigma_factor=orm.Float(0),
+        return_data=True,
+        fast=fast,
+        use_cache=use_cache,
+    )
+    assert abs(sigma - sigma_fit) < eps
     assert abs(mu - (mu_fit - sigma_fit * sigma_factor)) < eps
     sorted_bands = data[0, :]
     sorted_projwfc = data[1, :]
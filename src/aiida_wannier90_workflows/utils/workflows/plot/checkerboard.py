@@ -22,7 +22,7 @@ def compute_checkerboard(
     """
     from aiida.common import LinkType
 
-    from aiida_wannier90_workflows.utils.bands.distance import bands_distance
+    from aiida_wannier90_workflows.utils.bands.distance import bands_distance_batch
     from aiida_wannier90_workflows.utils.workflows import get_last_calcjob
 
     if "optimize_reference_bands" not in optimize_workchain.inputs:
@@ -59,6 +59,8 @@ def compute_checkerboard(
         minmax = (params["dis_proj_min"], params["dis_proj_max"])
         all_minmax.append(minmax)
 
+    indexes = []
+    all_wan_bands = []
     for i, dis_proj_max in enumerate(max_range):
         for j, dis_proj_min in enumerate(min_range):
             minmax = (dis_proj_min, dis_proj_max)
@@ -66,12 +68,17 @@ def compute_checkerboard(
                 continue
             idx = all_minmax.index(minmax)
             workchain = all_optimize_workchains[idx]
-            wan_bands = workchain.outputs.interpolated_bands
-            bands_dist = bands_distance(
-                pw_bands, wan_bands, fermi_energy, exclude_list_dft
-            )
-            # 0th column is the energy, discard it
-            checkerboard[i, j, :] = bands_dist[:, 1]
+            indexes.append((i, j))
+            all_wan_bands.append(workchain.outputs.interpolated_bands)
+
+    if indexes:
+        # All the candidates share the same reference bands, compute them in one pass
+        bands_dist = bands_distance_batch(
+            pw_bands, all_wan_bands, fermi_energy, exclude_list_dft
+        )
+        rows, cols = np.array(indexes).T
+        # 0th column is the energy, discard it
+        checkerboard[rows, cols, :] = bands_dist[:, :, 1]
 
     return checkerboard, max_range, min_range
 
@@ -87,6 +87,18 @@ class Wannier90BandsWorkChain(Wannier90OpenGridWorkChain):
             help="Minimum kpoints distance for seekpath to generate a list of kpoints along the path. "
             "Specify either this or `bands_kpoints` or `kpoint_path`.",
         )
+        spec.input(
+            "reuse_seekpath",
+            valid_type=orm.Bool,
+            serializer=to_aiida_type,
+            default=lambda: orm.Bool(False),
+            help=(
+                "If True, enable AiiDA caching for seekpath, so a previous run on a structure with the same "
+                "content and the same `bands_kpoints_distance` is reused instead of running seekpath again. "
+                "The cached calcfunction is cloned and linked to the input structure of this workchain, so the "
+                "provenance is kept, but the outputs are copies of the ones of another structure node."
+            ),
+        )
 
         # We expose the in/output of `Wannier90OpenGridWorkChain` since `Wannier90WorkChain` in/output
         # is a subset of `Wannier90OpenGridWorkChain`, this allow us to launch either `Wannier90WorkChain`
@@ -343,7 +355,12 @@ class Wannier90BandsWorkChain(Wannier90OpenGridWorkChain):
         return not any(_ in self.inputs for _ in ("kpoint_path", "bands_kpoints"))
 
     def run_seekpath(self):
-        """Run the structure through SeeKpath to get the primitive and normalized structure."""
+        """Run the structure through SeeKpath to get the primitive and normalized structure.
+
+        If `reuse_seekpath` is True, the calcfunction is run with AiiDA caching enabled.
+        """
+        from aiida.manage.caching import enable_caching
+
         from aiida_quantumespresso.calculations.functions.seekpath_structure_analysis import (
             seekpath_structure_analysis,
         )
@@ -355,7 +372,13 @@ class Wannier90BandsWorkChain(Wannier90OpenGridWorkChain):
         if "bands_kpoints_distance" in self.inputs:
             args["reference_distance"] = self.inputs["bands_kpoints_distance"]
 
-        result = seekpath_structure_analysis(**args)
+        if self.inputs.reuse_seekpath:
+            with enable_caching(
+                identifier=seekpath_structure_analysis.process_class.build_process_type()
+            ):
+                result = seekpath_structure_analysis(**args)
+        else:
+            result = seekpath_structure_analysis(**args)
 
         self.ctx.current_structure = result["primitive_structure"]
 
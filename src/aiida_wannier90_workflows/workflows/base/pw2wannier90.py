@@ -96,6 +96,26 @@ class Pw2wannier90BaseWorkChain(ProtocolMixin, QeBaseRestartWorkChain):
             serializer=to_aiida_type,
             help="The `sigma` factor of occupation function for SCDM projection.",
         )
+        spec.input(
+            "scdm_fit_fast",
+            valid_type=orm.Bool,
+            default=lambda: orm.Bool(False),
+            serializer=to_aiida_type,
+            help=(
+                "If True, start the SCDM `mu`, `sigma` fitting from the projectability "
+                "binned by energy, which is faster for dense kpoint meshes."
+            ),
+        )
+        spec.input(
+            "scdm_use_cache",
+            valid_type=orm.Bool,
+            default=lambda: orm.Bool(False),
+            serializer=to_aiida_type,
+            help=(
+                "If True, reuse the SCDM `mu`, `sigma` cached in the extras of `bands_projections`, "
+                "e.g. by a previous run on the same projwfc outputs, and cache new results there."
+            ),
+        )
         spec.input(
             "bands",
             valid_type=orm.BandsData,
@@ -232,7 +252,10 @@ class Pw2wannier90BaseWorkChain(ProtocolMixin, QeBaseRestartWorkChain):
 
         Different from `get_builder_from_protocol', this function is executed at runtime.
         """
-        from aiida_wannier90_workflows.utils.scdm import fit_scdm_mu_sigma
+        from aiida_wannier90_workflows.utils.scdm import (
+            SCDM_FIT_FAST_EXTRA,
+            fit_scdm_mu_sigma,
+        )
 
         inputs = AttributeDict(
             self.exposed_inputs(Pw2wannier90Calculation, self._inputs_namespace)
@@ -257,16 +280,21 @@ class Pw2wannier90BaseWorkChain(ProtocolMixin, QeBaseRestartWorkChain):
                 )
 
         if fit_scdm:
+            fast = self.inputs.scdm_fit_fast.value
             # pylint: disable=unbalanced-tuple-unpacking
             try:
                 mu_new, sigma_new = fit_scdm_mu_sigma(
                     self.inputs.bands,
                     self.inputs.bands_projections,
                     self.inputs.scdm_sigma_factor,
+                    fast=fast,
+                    use_cache=self.inputs.scdm_use_cache.value,
                 )
             except ValueError:
                 # raise ValueError(f'SCDM mu/sigma fitting failed! {exc.args}') from exc
                 return self.exit_codes.ERROR_SCDM_FITTING
+            # Record the fitting mode, e.g. for `plot_scdm_fit`
+            self.node.base.extras.set(SCDM_FIT_FAST_EXTRA, fast)
 
             # If `scdm_mu` and/or `scdm_sigma` is present in the input parameters,
             # the workchain will directly use them, only the missing one will be populated.
@@ -156,6 +156,16 @@ class Wannier90BaseWorkChain(ProtocolMixin, BaseRestartWorkChain):
             serializer=to_aiida_type,
             help="Threshold for auto_energy_windows.",
         )
+        spec.input(
+            "auto_energy_windows_use_cache",
+            valid_type=orm.Bool,
+            default=lambda: orm.Bool(False),
+            serializer=to_aiida_type,
+            help=(
+                "If True, reuse the auto_energy_windows energy cached in the extras of `bands_projections`, "
+                "e.g. by a previous run on the same projwfc outputs, and cache new results there."
+            ),
+        )
         spec.input(
             "bands",
             valid_type=orm.BandsData,
@@ -188,6 +198,17 @@ class Wannier90BaseWorkChain(ProtocolMixin, BaseRestartWorkChain):
             serializer=to_aiida_type,
             help="Additional settings.",
         )
+        spec.input(
+            "output_wannier_functions",
+            valid_type=orm.Bool,
+            default=lambda: orm.Bool(False),
+            serializer=to_aiida_type,
+            help=(
+                "If True attach the `wannier_functions` output, at the cost of an additional calcfunction "
+                "and `ArrayData` in the provenance. Otherwise the analysis utilities parse the "
+                "`output_parameters`."
+            ),
+        )
         spec.inputs.validator = validate_inputs
 
         spec.outline(
@@ -200,6 +221,16 @@ class Wannier90BaseWorkChain(ProtocolMixin, BaseRestartWorkChain):
         )
 
         spec.expose_outputs(Wannier90Calculation)
+        spec.output(
+            "wannier_functions",
+            valid_type=orm.ArrayData,
+            required=False,
+            help=(
+                "The `ids`, `centres` and `spreads` arrays of the final Wannier functions, "
+                "sorted by WF index, see `get_wannier_functions_arrays`. "
+                "Only attached if `output_wannier_functions` is True."
+            ),
+        )
 
         spec.exit_code(401, "ERROR_BVECTORS", message="Unrecoverable bvectors error.")
         spec.exit_code(
@@ -535,6 +566,7 @@ class Wannier90BaseWorkChain(ProtocolMixin, BaseRestartWorkChain):
                 bands=self.inputs.bands,
                 projections=self.inputs.bands_projections,
                 thresholds=self.inputs.auto_energy_windows_threshold.value,
+                use_cache=self.inputs.auto_energy_windows_use_cache.value,
             )
             parameters["dis_froz_max"] = dis_froz_max
 
@@ -617,6 +649,25 @@ class Wannier90BaseWorkChain(ProtocolMixin, BaseRestartWorkChain):
 
         return inputs
 
+    def results(self):  # pylint: disable=inconsistent-return-statements
+        """Attach the outputs of the last calculation, and optionally the arrays of Wannier functions."""
+        from aiida_wannier90_workflows.utils.parser.center import (
+            get_wannier_functions_arrays,
+        )
+
+        result = super().results()
+        if result is not None or not self.inputs.output_wannier_functions:
+            return result
+
+        # The postproc_setup runs do not output Wannier functions
+        output_parameters = self.outputs.get("output_parameters", None)
+        if output_parameters is not None and output_parameters.get(
+            "wannier_functions_output", None
+        ):
+            self.out(
+                "wannier_functions", get_wannier_functions_arrays(output_parameters)
+            )
+
     def report_error_handled(self, calculation, action) -> None:
         """Report an action taken for a calculation that has failed.
 
@@ -4,9 +4,12 @@
 import pathlib
 import typing as ty
 
+import numpy as np
+
 from aiida import orm
 from aiida.common import AttributeDict
 from aiida.engine.processes import ProcessBuilder, ToContext, if_
+from aiida.orm.nodes.data.base import to_aiida_type
 
 from aiida_quantumespresso.utils.mapping import prepare_process_inputs
 
@@ -39,6 +42,12 @@ class Wannier90OpenGridWorkChain(Wannier90WorkChain):
       1. scf w/ symmetry, more nbnd -> open_grid -> pw2wannier90 -> wannier90
       2. scf w/ symmetry, default nbnd -> nscf w/ symm, more nbnd -> open_grid
          -> pw2wannier90 -> wannier90
+
+    With `open_grid_local`, the full kmesh and `mp_grid` for wannier90 are unfolded
+    in the workchain, and open_grid.x is skipped if the scf or nscf already ran on
+    the full kmesh. This is the only case where something is saved: if pw.x ran on
+    the irreducible kmesh, open_grid.x still has to run to rotate the wavefunctions,
+    and the locally unfolded kpoints are only checked against the ones it outputs.
     """
 
     @classmethod
@@ -56,6 +65,17 @@ class Wannier90OpenGridWorkChain(Wannier90WorkChain):
                 "help": "Inputs for the `OpenGridBaseWorkChain`, if not specified the open_grid step is skipped.",
             },
         )
+        spec.input(
+            "open_grid_local",
+            valid_type=orm.Bool,
+            serializer=to_aiida_type,
+            default=lambda: orm.Bool(False),
+            help=(
+                "If True, unfold the kmesh of the scf or nscf in the workchain instead of parsing the kpoints "
+                "from open_grid.x, and skip the open_grid step if the kmesh is already the full one. "
+                "Only useful if pw.x already ran on the full kmesh, otherwise open_grid.x still runs."
+            ),
+        )
         spec.inputs.validator = validate_inputs
 
         spec.outline(
@@ -193,8 +213,68 @@ class Wannier90OpenGridWorkChain(Wannier90WorkChain):
         """If the 'open_grid' input namespace was specified, we run open_grid after scf or nscf calculation."""
         return "open_grid" in self.inputs
 
+    def unfold_kpoints_locally(self):
+        """Unfold the kmesh of the last pw.x calculation as open_grid.x does.
+
+        :return: True if pw.x already ran on the full kmesh, then open_grid.x is not needed.
+            False if open_grid.x is needed, or if the kpoints of pw.x are not a mesh in the
+            order of `get_mesh_from_kpoints`, then the kpoints are parsed from open_grid.x.
+        """
+        from aiida_wannier90_workflows.utils.kpoints import (
+            get_mesh_from_kpoints,
+            get_open_grid_klist,
+            is_full_kmesh,
+        )
+        from aiida_wannier90_workflows.utils.workflows import get_last_calcjob
+
+        if "workchain_nscf" in self.ctx:
+            workchain = self.ctx.workchain_nscf
+        else:
+            workchain = self.ctx.workchain_scf
+        calc = get_last_calcjob(workchain)
+
+        try:
+            mesh, offset = get_mesh_from_kpoints(
+                calc.inputs.kpoints, return_offset=True
+            )
+        except ValueError as exc:
+            self.report(f"cannot unfold the kmesh locally, using open_grid.x: {exc}")
+            return False
+
+        # The kpoints actually computed by pw.x, which also accounts for the
+        # symmetry, spin and time-reversal settings of the calculation
+        klist = None
+        if "output_band" in calc.outputs:
+            klist = calc.outputs.output_band.get_kpoints(cartesian=False)
+        full_kmesh = klist is not None and is_full_kmesh(klist, mesh, offset)
+
+        if not full_kmesh:
+            klist = get_open_grid_klist(mesh, offset)
+
+        num_kpts = len(klist)
+        kpoints = orm.KpointsData()
+        kpoints.set_kpoints(
+            kpoints=klist, cartesian=False, weights=np.ones(num_kpts) / num_kpts
+        )
+        self.ctx.open_grid_kpoints = kpoints
+        self.ctx.open_grid_mp_grid = mesh
+
+        if full_kmesh:
+            self.report(
+                f"{calc.process_label}<{calc.pk}> already ran on the full {mesh} kmesh, skipping open_grid"
+            )
+
+        return full_kmesh
+
     def run_open_grid(self):
-        """Use QE open_grid.x to unfold irreducible kmesh to a full kmesh."""
+        """Use QE open_grid.x to unfold irreducible kmesh to a full kmesh.
+
+        With `open_grid_local`, the kmesh is unfolded in the workchain first, and
+        open_grid.x is skipped if pw.x already ran on the full kmesh.
+        """
+        if self.inputs.open_grid_local.value and self.unfold_kpoints_locally():
+            return None
+
         inputs = AttributeDict(
             self.exposed_inputs(OpenGridBaseWorkChain, namespace="open_grid")
         )
@@ -209,6 +289,10 @@ class Wannier90OpenGridWorkChain(Wannier90WorkChain):
 
     def inspect_open_grid(self):  # pylint: disable=inconsistent-return-statements
         """Verify that the `OpenGridBaseWorkChain` run successfully finished."""
+        if "workchain_open_grid" not in self.ctx:
+            # Skipped by `run_open_grid`
+            return
+
         workchain = self.ctx.workchain_open_grid
 
         if not workchain.is_finished_ok:
@@ -219,15 +303,34 @@ class Wannier90OpenGridWorkChain(Wannier90WorkChain):
 
         self.ctx.current_folder = workchain.outputs.remote_folder
 
+        if "open_grid_kpoints" in self.ctx:
+            # The kpoints must be in the same order as the unfolded wavefunctions
+            parsed = workchain.outputs.kpoints.get_kpoints(cartesian=False)
+            unfolded = self.ctx.open_grid_kpoints.get_kpoints(cartesian=False)
+            if parsed.shape != unfolded.shape or not np.allclose(
+                parsed, unfolded, atol=1e-6
+            ):
+                self.report(
+                    "the kpoints unfolded in the workchain differ from the open_grid.x ones, using the latter"
+                )
+                del self.ctx.open_grid_kpoints
+                del self.ctx.open_grid_mp_grid
+
     def prepare_wannier90_pp_inputs(self):
         """Override the parent method in `Wannier90WorkChain`.
 
-        The wannier input kpoints are set as the parsed output from `OpenGridBaseWorkChain`.
+        The wannier input kpoints are set as the ones unfolded in the workchain, or as the
+        parsed output from `OpenGridBaseWorkChain`.
         """
         base_inputs = super().prepare_wannier90_pp_inputs()
         inputs = base_inputs["wannier90"]
 
-        if self.should_run_open_grid():
+        if "open_grid_kpoints" in self.ctx:
+            inputs.kpoints = self.ctx.open_grid_kpoints
+            parameters = inputs.parameters.get_dict()
+            parameters["mp_grid"] = self.ctx.open_grid_mp_grid
+            inputs.parameters = orm.Dict(parameters)
+        elif "workchain_open_grid" in self.ctx:
             open_grid_outputs = self.ctx.workchain_open_grid.outputs
             inputs.kpoints = open_grid_outputs.kpoints
             parameters = inputs.parameters.get_dict()
@@ -240,7 +343,7 @@ class Wannier90OpenGridWorkChain(Wannier90WorkChain):
 
     def results(self):
         """Override parent workchain."""
-        if self.should_run_open_grid():
+        if "workchain_open_grid" in self.ctx:
             self.out_many(
                 self.exposed_outputs(
                     self.ctx.workchain_open_grid,
@@ -476,7 +476,7 @@ class Wannier90OptimizeWorkChain(Wannier90BandsWorkChain):
             )
 
         self.ctx.workchain_wannier90_spreads_imbalence = get_spreads_imbalence(
-            workchain.outputs.output_parameters["wannier_functions_output"]
+            workchain
         )
 
     def prepare_wannier90_optimize_inputs(self):
@@ -549,9 +549,7 @@ class Wannier90OptimizeWorkChain(Wannier90BandsWorkChain):
         workchain = self.ctx.workchain_wannier90_optimize[-1]
 
         if workchain.is_finished_ok:
-            spreads = get_spreads_imbalence(
-                workchain.outputs.output_parameters["wannier_functions_output"]
-            )
+            spreads = get_spreads_imbalence(workchain)
             if (
                 "optimize_reference_bands" in self.inputs
                 and "interpolated_bands" in workchain.outputs
@@ -783,16 +781,26 @@ def get_bands_distance_ef2(
     return bandsdist
 
 
-def get_spreads_imbalence(wannier_functions_output: dict) -> float:
+def get_spreads_imbalence(
+    wannier_functions_output: ty.Union[list, np.array, orm.WorkChainNode]
+) -> float:
     """Calculate the variance of spreads.
 
     There could be other ways to calculate the spreads imbalence, for now I just use variance.
-    :param wannier_functions_output: [description]
-    :type wannier_functions_output: dict
+    :param wannier_functions_output: the ``wannier_functions_output`` list of dict, or
+        the spreads array, or a ``Wannier90BaseWorkChain``
+    :type wannier_functions_output: list, np.array, orm.WorkChainNode
     :return: [description]
     :rtype: float
     """
-    spreads = [_["wf_spreads"] for _ in wannier_functions_output]
+    from aiida_wannier90_workflows.utils.parser.center import get_wf_arrays
+
+    if isinstance(wannier_functions_output, orm.WorkChainNode):
+        spreads = get_wf_arrays(wannier_functions_output, "spreads")
+    elif isinstance(wannier_functions_output, np.ndarray):
+        spreads = wannier_functions_output
+    else:
+        spreads = [_["wf_spreads"] for _ in wannier_functions_output]
     var = np.var(spreads)
 
     # TODO try K-Means clustering?  pylint: disable=fixme
@@ -797,8 +797,8 @@ def _get_bands_distance_raw(
         num_semicore = 0
         isolated = True
 
-    ref_bands_arr = ref_bands.get_bands()
-    num_bands_ref = ref_bands_arr.shape[1]
+    # Read the shape from the attributes, the reference array is only loaded if needed
+    num_bands_ref = ref_bands.base.attributes.get("array|bands")[1]
 
     cmp_bands_arr = cmp_bands.get_bands()
     num_bands_cmp = cmp_bands_arr.shape[1]
@@ -826,13 +826,16 @@ def _get_bands_distance_raw(
 
     if isolated:
         bandsdist = bands_distance_isolated(
-            ref_bands.get_bands(), cmp_bands.get_bands(), exclude_list_dft
+            ref_bands.get_bands(), cmp_bands_arr, exclude_list_dft
         )
         # Only return average distance, not max distance
         bandsdist = bandsdist[0]
     else:
         # Bands distance from Ef to Ef+5
-        bandsdist = bands_distance(ref_bands, cmp_bands, fermi_energy, exclude_list_dft)
+        # `ref_bands` is memoized by `bands_distance`, only the Wannier bands are new
+        bandsdist = bands_distance(
+            ref_bands, cmp_bands_arr, fermi_energy, exclude_list_dft
+        )
         # Only return average distance, not max distance
         bandsdist = bandsdist[:, 1]
         # Return Ef+2
@@ -37,3 +37,60 @@ def load_bands(filepath_fixtures):
         return bands_data
 
     return _load_bands
+
+
+@pytest.fixture
+def generate_projections():
+    """Generate a pair of `BandsData` and `ProjectionData` nodes with erfc projectability."""
+
+    def _generate_projections(
+        num_kpoints: int = 10,
+        num_bands: int = 30,
+        num_atoms: int = 2,
+        mu: float = 5.0,
+        sigma: float = 1.5,
+    ):
+        """Generate a pair of `BandsData` and `ProjectionData` nodes."""
+        import numpy as np
+        from scipy.special import erfc  # pylint: disable=no-name-in-module
+
+        from aiida import orm
+        from aiida.tools.data.orbital.realhydrogen import RealhydrogenOrbital
+
+        rng = np.random.default_rng(0)
+        energies = np.sort(rng.uniform(-10, 20, (num_kpoints, num_bands)), axis=1)
+        projectability = 0.5 * erfc((energies - mu) / sigma)
+
+        bands = orm.BandsData()
+        bands.set_kpoints(rng.uniform(size=(num_kpoints, 3)))
+        bands.set_bands(energies)
+
+        orbitals = []
+        for iatom in range(num_atoms):
+            for angular_momentum in range(3):
+                for magnetic_number in range(2 * angular_momentum + 1):
+                    orbitals.append(
+                        RealhydrogenOrbital(
+                            position=(float(iatom), 0.0, 0.0),
+                            angular_momentum=angular_momentum,
+                            magnetic_number=magnetic_number,
+                            radial_nodes=0,
+                            kind_name=f"X{iatom}",
+                        )
+                    )
+        # Split the projectability randomly among the orbitals
+        fractions = rng.dirichlet(np.ones(len(orbitals)), size=energies.shape)
+
+        projections = orm.ProjectionData()
+        projections.set_reference_bandsdata(bands)
+        projections.set_projectiondata(
+            orbitals,
+            list_of_projections=[
+                projectability * fractions[:, :, i] for i in range(len(orbitals))
+            ],
+            bands_check=False,
+        )
+
+        return bands, projections
+
+    return _generate_projections
@@ -1,6 +1,7 @@
 """Unit tests for the :py:mod:`~aiida_quantumespresso.utils.bands` module."""
 
 import numpy as np
+import pytest
 
 
 def test_get_homo_lumo():
@@ -83,3 +84,308 @@ def test_bands_distance(load_bands):
 
     atol = 1e-8
     assert np.allclose(dist, ref_dist, atol=atol)
+
+
+def test_bands_distance_isolated(load_bands):
+    """Test the function for ``bands_distance_isolated``."""
+    from aiida_wannier90_workflows.utils.bands.distance import bands_distance_isolated
+
+    pw_bands = load_bands("W", "pw.json")
+    wan_bands = load_bands("W", "w90.json")
+
+    exclude_list_dft = [1, 2, 3, 4]
+
+    dist = bands_distance_isolated(pw_bands, wan_bands, exclude_list_dft)
+    ref_dist = [2.9457365302842735, 15.117902021715267, 15.117902021715267]
+    assert np.allclose(dist[:3], ref_dist, atol=1e-8)
+    assert tuple(dist[3]) == (190, 8)
+    assert tuple(dist[4]) == (190, 8)
+
+    dist = bands_distance_isolated(
+        pw_bands, wan_bands, exclude_list_dft, lower_cutoff=20.0
+    )
+    ref_dist = [3.2934296981397, 15.117902021715267, 15.117902021715267]
+    assert np.allclose(dist[:3], ref_dist, atol=1e-8)
+
+
+def test_bands_distance_multi_mu(load_bands):
+    """Test ``bands_distance_multi_mu`` against ``bands_distance_raw``."""
+    from aiida_wannier90_workflows.utils.bands.distance import (
+        bands_distance_multi_mu,
+        bands_distance_raw,
+    )
+
+    pw_bands = load_bands("W", "pw.json").get_bands()
+    wan_bands = load_bands("W", "w90.json").get_bands()
+
+    exclude_list_dft = [1, 2, 3, 4]
+    mu_range = np.arange(20.0, 30.0, 0.5)
+
+    dist = bands_distance_multi_mu(
+        pw_bands,
+        wan_bands,
+        mu_range=mu_range,
+        sigma=0.1,
+        exclude_list_dft=exclude_list_dft,
+        lower_cutoff=-30,
+    )
+
+    assert dist.shape == (len(mu_range), 4)
+    for i, mu in enumerate(mu_range):
+        res = bands_distance_raw(
+            pw_bands,
+            wan_bands,
+            mu=mu,
+            sigma=0.1,
+            exclude_list_dft=exclude_list_dft,
+            lower_cutoff=-30,
+        )
+        assert np.allclose(dist[i], [mu, res[0], res[1], res[2]], atol=1e-10)
+
+
+def test_fermi_dirac_multi_mu():
+    """Test ``fermi_dirac_multi_mu`` against ``fermi_dirac``."""
+    from aiida_wannier90_workflows.utils.bands.distance import (
+        fermi_dirac,
+        fermi_dirac_multi_mu,
+    )
+
+    energy = np.linspace(-100.0, 100.0, 2002).reshape(-1, 7)
+    # The exponential is evaluated again after 300 sigma
+    mu_range = np.arange(-60.0, 60.0, 0.7)
+    sigma = 0.1
+
+    with np.errstate(over="ignore"):
+        for mu, weight in zip(mu_range, fermi_dirac_multi_mu(energy, mu_range, sigma)):
+            assert np.allclose(weight, fermi_dirac(energy, mu, sigma), rtol=1e-12)
+
+
+@pytest.mark.parametrize("block_size", (1, 2**14))
+def test_bands_distance_batch(load_bands, monkeypatch, block_size):
+    """Test ``bands_distance_batch`` against ``bands_distance``."""
+    from aiida_wannier90_workflows.utils.bands import distance
+    from aiida_wannier90_workflows.utils.bands.distance import (
+        bands_distance,
+        bands_distance_batch,
+    )
+
+    # One candidate per block, or all the candidates in one block
+    monkeypatch.setattr(distance, "BATCH_BLOCK_SIZE", block_size)
+
+    pw_bands = load_bands("W", "pw.json")
+    wan_bands = load_bands("W", "w90.json").get_bands()
+
+    fermi_energy = 22.753
+    exclude_list_dft = [1, 2, 3, 4]
+    candidates = np.stack([wan_bands + shift for shift in (0.0, 0.01, -0.02)])
+
+    dist = bands_distance_batch(pw_bands, candidates, fermi_energy, exclude_list_dft)
+
+    assert dist.shape == (3, 6, 4)
+    for candidate, candidate_dist in zip(candidates, dist):
+        ref_dist = bands_distance(
+            pw_bands, candidate, fermi_energy, exclude_list_dft=exclude_list_dft
+        )
+        assert np.allclose(candidate_dist, ref_dist, atol=1e-10)
+
+
+def test_reference_bands(load_bands):
+    """Test comparing with a precomputed ``ReferenceBands``."""
+    from aiida_wannier90_workflows.utils.bands.distance import (
+        _get_reference_bands_cached,
+        bands_distance,
+        get_reference_bands,
+    )
+
+    pw_bands = load_bands("W", "pw.json")
+    wan_bands = load_bands("W", "w90.json")
+
+    fermi_energy = 22.753
+    exclude_list_dft = [1, 2, 3, 4]
+
+    reference = get_reference_bands(pw_bands, fermi_energy, exclude_list_dft)
+    assert reference.bands.shape == (370, 17)
+    assert reference.weight is None
+    assert reference.get_weight(9).shape == (6, 370, 9)
+
+    dist = bands_distance(reference, wan_bands, fermi_energy)
+    ref_dist = bands_distance(
+        pw_bands, wan_bands, fermi_energy, exclude_list_dft=exclude_list_dft
+    )
+    assert np.allclose(dist, ref_dist, atol=1e-10)
+
+    # The reference is computed at its own Fermi energy
+    with pytest.raises(ValueError, match="fermi_energy"):
+        bands_distance(reference, wan_bands, fermi_energy + 1)
+
+    # A stored BandsData is memoized by UUID
+    _get_reference_bands_cached.cache_clear()
+    pw_bands.store()
+    reference = get_reference_bands(pw_bands, fermi_energy, exclude_list_dft)
+    assert get_reference_bands(pw_bands, fermi_energy, exclude_list_dft) is reference
+    assert _get_reference_bands_cached.cache_info().hits == 1
+    assert get_reference_bands(pw_bands, fermi_energy) is not reference
+    assert np.allclose(
+        bands_distance(reference, wan_bands, fermi_energy), ref_dist, atol=1e-10
+    )
+
+
+def test_bands_distance_raw_chunked(load_bands):
+    """Test the streaming mode of ``bands_distance_raw``."""
+    from aiida_wannier90_workflows.utils.bands.distance import (
+        _get_weighted_differences,
+        bands_distance_raw,
+    )
+
+    pw_bands = load_bands("W", "pw.json").get_bands()
+    wan_bands = load_bands("W", "w90.json").get_bands()
+
+    kwargs = {
+        "mu": 24.753,
+        "sigma": 0.1,
+        "exclude_list_dft": [1, 2, 3, 4],
+        "lower_cutoff": -30,
+    }
+    ref_dist = bands_distance_raw(pw_bands, wan_bands, **kwargs)
+
+    for chunk_size in (1, 7, 1000):
+        dist = bands_distance_raw(pw_bands, wan_bands, chunk_size=chunk_size, **kwargs)
+        assert np.allclose(dist[:3], ref_dist[:3], atol=1e-10)
+        # max distance locations
+        assert tuple(dist[3]) == tuple(ref_dist[3])
+        assert tuple(dist[4]) == tuple(ref_dist[4])
+
+    dist = bands_distance_raw(
+        pw_bands, wan_bands, chunk_size=64, dtype=np.float32, **kwargs
+    )
+    assert np.allclose(dist[:3], ref_dist[:3], atol=1e-5)
+
+    # The float32 path is not promoted to float64, e.g. by the lower cutoff mask or
+    # a float64 `mu`
+    for gaussian_weight in (False, True):
+        arrays = _get_weighted_differences(
+            pw_bands[:64, 4:13].astype(np.float32),
+            wan_bands[:64].astype(np.float32),
+            mu=np.float64(kwargs["mu"]),
+            sigma=kwargs["sigma"],
+            lower_cutoff=kwargs["lower_cutoff"],
+            gaussian_weight=gaussian_weight,
+        )
+        assert [_.dtype for _ in arrays] == [np.float32] * 3
+
+
+def test_bands_distance_curve(load_bands):
+    """Test ``bands_distance_curve`` for step and Fermi-Dirac weights."""
+    from aiida_wannier90_workflows.utils.bands.distance import (
+        bands_distance_curve,
+        bands_distance_multi_mu,
+        compute_lower_cutoff,
+        get_bands_to_compare,
+    )
+
+    pw_bands = load_bands("W", "pw.json").get_bands()
+    wan_bands = load_bands("W", "w90.json").get_bands()
+
+    fermi_energy = 22.753
+    exclude_list_dft = [1, 2, 3, 4]
+    mu_range = np.arange(fermi_energy - 2, fermi_energy + 6, 0.05)
+
+    # Step weight, compare with a brute-force evaluation
+    dist = bands_distance_curve(
+        pw_bands, wan_bands, mu_range, exclude_list_dft=exclude_list_dft
+    )
+    dft, wan = get_bands_to_compare(pw_bands, wan_bands, exclude_list_dft)
+    cutoff = compute_lower_cutoff(dft, -30)
+    for i, mu in enumerate(mu_range):
+        weight = (np.maximum(dft, wan) < mu) * cutoff
+        arr = (dft - wan) ** 2 * weight
+        assert np.isclose(dist[i, 1], np.sqrt(arr.sum() / weight.sum()), atol=1e-10)
+        assert np.isclose(dist[i, 2], np.sqrt(arr.max()), atol=1e-10)
+        assert np.isclose(dist[i, 3], (np.abs(dft - wan) * weight).max(), atol=1e-10)
+
+    # Fermi-Dirac weight
+    dist = bands_distance_curve(
+        pw_bands,
+        wan_bands,
+        mu_range,
+        sigma=0.1,
+        exclude_list_dft=exclude_list_dft,
+        tolerance=1e-8,
+    )
+    ref_dist = bands_distance_multi_mu(
+        pw_bands,
+        wan_bands,
+        mu_range,
+        sigma=0.1,
+        exclude_list_dft=exclude_list_dft,
+        lower_cutoff=-30,
+    )
+    assert np.allclose(dist, ref_dist, atol=1e-6)
+
+
+def test_get_pruned_bands(monkeypatch):
+    """Test pruning the bands with negligible weights in ``bands_distance_raw``."""
+    from aiida_wannier90_workflows.utils.bands import distance
+    from aiida_wannier90_workflows.utils.bands.distance import (
+        bands_distance_raw,
+        get_pruned_bands,
+    )
+
+    rng = np.random.default_rng(42)
+    num_kpoints, num_wann = 50, 100
+    dft_bands = np.sort(rng.uniform(-10, 30, (num_kpoints, num_wann + 10)), axis=1)
+    wan_bands = dft_bands[:, :num_wann] + rng.normal(0, 0.01, (num_kpoints, num_wann))
+
+    # Too few eigenvalues to be worth pruning
+    assert dft_bands.size < distance.PRUNE_MIN_SIZE
+    pruned_bands = get_pruned_bands(dft_bands[:, :num_wann], wan_bands, 2.0, 0.1)
+    assert len(pruned_bands) == num_wann
+
+    monkeypatch.setattr(distance, "PRUNE_MIN_SIZE", 0)
+    pruned_bands = get_pruned_bands(dft_bands[:, :num_wann], wan_bands, 2.0, 0.1)
+    assert 0 < len(pruned_bands) < num_wann
+    # Too few bands can be dropped
+    pruned_bands = get_pruned_bands(dft_bands[:, :num_wann], wan_bands, 25.0, 0.1)
+    assert len(pruned_bands) == num_wann
+
+    kwargs = {"mu": 2.0, "sigma": 0.1, "lower_cutoff": -30}
+    dist = bands_distance_raw(dft_bands, wan_bands, **kwargs)
+    # The streaming mode does not prune the bands
+    ref_dist = bands_distance_raw(dft_bands, wan_bands, chunk_size=1000, **kwargs)
+    assert np.allclose(dist[:3], ref_dist[:3], rtol=1e-12, atol=0)
+    assert tuple(dist[3]) == tuple(ref_dist[3])
+    assert tuple(dist[4]) == tuple(ref_dist[4])
+
+
+@pytest.mark.parametrize("gaussian_weight", (True, False))
+def test_get_pruned_bands_equivalence(monkeypatch, gaussian_weight):
+    """Test the pruned ``bands_distance_raw`` is identical to the unpruned one."""
+    from aiida_wannier90_workflows.utils.bands import distance
+    from aiida_wannier90_workflows.utils.bands.distance import bands_distance_raw
+
+    monkeypatch.setattr(distance, "PRUNE_MIN_SIZE", 0)
+
+    rng = np.random.default_rng(0)
+    num_kpoints, num_wann = 30, 40
+    for noise in (0.01, 1.0, 5.0):
+        dft_bands = np.sort(rng.uniform(-10, 30, (num_kpoints, num_wann + 5)), axis=1)
+        wan_bands = dft_bands[:, :num_wann] + rng.normal(
+            0, noise, (num_kpoints, num_wann)
+        )
+        # Include mu far away from all the bands, where all the weights are zero
+        for mu in (-500.0, -11.8, 2.0, 14.08, 30.05, 500.0):
+            kwargs = {
+                "mu": mu,
+                "sigma": 0.1,
+                "gaussian_weight": gaussian_weight,
+                "lower_cutoff": -30,
+            }
+            dist = bands_distance_raw(dft_bands, wan_bands, **kwargs)
+            ref_dist = bands_distance_raw(
+                dft_bands, wan_bands, chunk_size=10**6, **kwargs
+            )
+            assert np.allclose(
+                dist[:3], ref_dist[:3], rtol=1e-10, atol=0, equal_nan=True
+            )
+            assert tuple(dist[3]) == tuple(ref_dist[3])
+            assert tuple(dist[4]) == tuple(ref_dist[4])
@@ -0,0 +1,461 @@
+"""Unit tests for the :py:mod:`~aiida_wannier90_workflows.utils.parser.center` module."""
+
+import itertools
+
+import numpy as np
+import pytest
+
+
+def test_generate_supercell():
+    """Test ``generate_supercell``."""
+    from aiida_wannier90_workflows.utils.parser.center import generate_supercell
+
+    cell = np.array([[1.0, 0.0, 0.0], [0.5, 1.0, 0.0], [0.0, 0.0, 2.0]])
+    supercell, translations = generate_supercell(cell, size=[1, 2, 1])
+
+    ref_translations = list(itertools.product(range(-1, 2), range(-2, 3), range(-1, 2)))
+    assert np.array_equal(translations, ref_translations)
+    assert np.allclose(supercell, np.array(ref_translations) @ cell)
+
+
+def test_find_wf_nearest_atom():
+    """Test ``find_wf_nearest_atom`` against a brute-force search."""
+    from aiida_wannier90_workflows.utils.parser.center import find_wf_nearest_atom
+
+    rng = np.random.default_rng(42)
+    cell = np.array([[4.0, 0.0, 0.0], [2.0, 3.5, 0.0], [0.0, 0.5, 5.0]])
+    atoms = rng.uniform(0, 1, size=(6, 3)) @ cell
+    wf_centers = rng.uniform(0, 1, size=(20, 3)) @ cell
+
+    distance, nearest_atom = find_wf_nearest_atom(cell, atoms, wf_centers)
+
+    translations = np.array(list(itertools.product(range(-2, 3), repeat=3)))
+    for wf_center, dist, (iatom, *translation) in zip(
+        wf_centers, distance, nearest_atom
+    ):
+        all_dist = np.linalg.norm(
+            atoms[:, np.newaxis, :] + translations @ cell - wf_center, axis=-1
+        )
+        assert np.isclose(dist, all_dist.min())
+        assert np.isclose(
+            dist,
+            np.linalg.norm(atoms[iatom] + np.array(translation) @ cell - wf_center),
+        )
+
+
+def test_get_structure_kdtree():
+    """Test ``get_structure_kdtree`` and ``query_nearest_atom``."""
+    from aiida import orm
+
+    from aiida_wannier90_workflows.utils.parser.center import (
+        find_wf_nearest_atom,
+        get_structure_kdtree,
+        query_nearest_atom,
+    )
+
+    rng = np.random.default_rng(42)
+    cell = np.array([[4.0, 0.0, 0.0], [2.0, 3.5, 0.0], [0.0, 0.5, 5.0]])
+    structure = orm.StructureData(cell=cell.tolist())
+    for position in rng.uniform(0, 1, size=(6, 3)) @ cell:
+        structure.append_atom(position=position.tolist(), symbols="Si")
+    wf_centers = rng.uniform(0, 1, size=(20, 3)) @ cell
+
+    ref_distance, ref_nearest_atom = find_wf_nearest_atom(
+        cell,
+        structure.get_ase().get_positions(wrap=True),
+        wf_centers,
+        nth_neighbour=2,
+    )
+
+    structure.store()
+    kdtree = get_structure_kdtree(structure)
+    assert get_structure_kdtree(structure) is kdtree
+
+    distance, nearest_atom = query_nearest_atom(kdtree, wf_centers, nth_neighbour=2)
+    assert np.allclose(distance, ref_distance)
+    assert np.array_equal(nearest_atom, ref_nearest_atom)
+
+    # numpy integers are accepted, other types are not
+    distance, nearest_atom = query_nearest_atom(
+        kdtree, wf_centers, nth_neighbour=np.int64(2)
+    )
+    assert np.allclose(distance, ref_distance)
+    assert np.array_equal(nearest_atom, ref_nearest_atom)
+    for nth_neighbour in (0, 2.0):
+        with pytest.raises(ValueError):
+            query_nearest_atom(kdtree, wf_centers, nth_neighbour=nth_neighbour)
+
+
+def test_get_structure_cell_atoms():
+    """Test ``get_structure_cell_atoms`` against the ASE wrapping."""
+    from aiida import orm
+
+    from aiida_wannier90_workflows.utils.parser.center import get_structure_cell_atoms
+
+    cell = [[4.0, 0.0, 0.0], [2.0, 3.5, 0.0], [0.0, 0.5, 5.0]]
+    structure = orm.StructureData(cell=cell)
+    structure.append_atom(position=(-1.0, 4.0, 6.0), symbols="Si")
+    structure.append_atom(position=(0.0, 0.0, 0.0), symbols="O")
+
+    cell_array, atoms = get_structure_cell_atoms(structure)
+    assert np.allclose(cell_array, cell)
+    assert np.allclose(atoms, structure.get_ase().get_positions(wrap=True))
+
+
+def test_get_wf_outputs_array():
+    """Test ``get_wf_outputs_array`` orders the outputs by WF index."""
+    from aiida_wannier90_workflows.utils.parser.center import get_wf_outputs_array
+
+    wf_outputs = [
+        {"wf_ids": 2, "wf_centres": [1.0, 2.0, 3.0], "wf_spreads": 2.0},
+        {"wf_ids": 1, "wf_centres": [0.0, 0.5, 1.0], "wf_spreads": 1.0},
+    ]
+
+    assert np.allclose(
+        get_wf_outputs_array(wf_outputs, "wf_centres"),
+        [[0.0, 0.5, 1.0], [1.0, 2.0, 3.0]],
+    )
+    assert np.allclose(get_wf_outputs_array(wf_outputs, "wf_spreads"), [1.0, 2.0])
+
+
+def test_get_wigner_seitz():
+    """Test ``get_wigner_seitz`` returns the region of the origin."""
+    from aiida_wannier90_workflows.utils.parser.center import get_wigner_seitz
+
+    # A very oblique basis of the simple cubic lattice
+    cell = np.array([[1.0, 0.0, 0.0], [5.0, 1.0, 0.0], [3.0, -4.0, 1.0]]) * 2
+    ws_cell = get_wigner_seitz(cell)
+
+    ref_ws_cell = np.array(list(itertools.product([-1.0, 1.0], repeat=3)))
+    assert ws_cell.shape == ref_ws_cell.shape
+    assert np.allclose(np.sort(ws_cell, axis=0), np.sort(ref_ws_cell, axis=0))
+    assert get_wigner_seitz(cell + 1e-12) is ws_cell
+
+    # fcc, rhombic dodecahedron
+    cell = np.array([[0.0, 1.0, 1.0], [1.0, 0.0, 1.0], [1.0, 1.0, 0.0]])
+    ws_cell = get_wigner_seitz(cell)
+    assert len(ws_cell) == 14
+    assert np.allclose(np.max(np.abs(ws_cell), axis=0), 1)
+
+
+def test_get_wannier_functions_arrays():
+    """Test ``get_wannier_functions_arrays``."""
+    from aiida import orm
+
+    from aiida_wannier90_workflows.utils.parser.center import (
+        get_wannier_functions_arrays,
+    )
+
+    output_parameters = orm.Dict(
+        {
+            "wannier_functions_output": [
+                {"wf_ids": 2, "wf_centres": [1.0, 2.0, 3.0], "wf_spreads": 2.0},
+                {"wf_ids": 1, "wf_centres": [0.0, 0.5, 1.0], "wf_spreads": 1.0},
+            ]
+        }
+    )
+    arrays = get_wannier_functions_arrays(output_parameters)
+
+    assert np.array_equal(arrays.get_array("ids"), [1, 2])
+    assert np.allclose(arrays.get_array("centres"), [[0.0, 0.5, 1.0], [1.0, 2.0, 3.0]])
+    assert np.allclose(arrays.get_array("spreads"), [1.0, 2.0])
+
+
+@pytest.fixture
+def generate_wan_process(generate_structure):
+    """Return a factory of finished processes, whose ``Wannier90Calculation`` have a WF output."""
+    from aiida import orm
+    from aiida.common.links import LinkType
+    from plumpy import ProcessState
+
+    structure = generate_structure().store()
+
+    def _generate_wan_process(
+        node_class,
+        process_class,
+        caller=None,
+        label="call",
+        wannier_functions_output=None,
+        wannier_functions_initial=None,
+    ):
+        node = node_class()
+        node.process_type = process_class.build_process_type()
+        node.set_process_state(ProcessState.FINISHED)
+        node.set_exit_status(0)
+        if caller is not None:
+            link_type = (
+                LinkType.CALL_CALC
+                if node_class == orm.CalcJobNode
+                else LinkType.CALL_WORK
+            )
+            node.base.links.add_incoming(caller, link_type, label)
+        if node_class == orm.CalcJobNode:
+            node.base.links.add_incoming(structure, LinkType.INPUT_CALC, "structure")
+        node.store()
+        if node_class == orm.CalcJobNode:
+            # By default one WF, centred at the PK to identify the calculation
+            if wannier_functions_output is None:
+                wannier_functions_output = [
+                    {"wf_ids": 1, "wf_centres": [0.0, 0.0, node.pk]}
+                ]
+            parameters = {"wannier_functions_output": wannier_functions_output}
+            if wannier_functions_initial is not None:
+                parameters["wannier_functions_initial"] = wannier_functions_initial
+            parameters = orm.Dict(parameters)
+            parameters.base.links.add_incoming(
+                node, LinkType.CREATE, "output_parameters"
+            )
+            parameters.store()
+        return node
+
+    _generate_wan_process.structure = structure
+
+    return _generate_wan_process
+
+
+def test_harvest_wf_outputs(generate_wan_process, capsys):
+    """Test ``harvest_wf_outputs`` finds the same calculations as ``get_last_wan_calc``."""
+    from aiida import orm
+    from plumpy import ProcessState
+
+    from aiida_wannier90_workflows.utils.parser.center import (
+        Wannier90Calculation,
+        harvest_wf_outputs,
+    )
+    from aiida_wannier90_workflows.workflows.base.wannier90 import (
+        Wannier90BaseWorkChain,
+    )
+    from aiida_wannier90_workflows.workflows.wannier90 import Wannier90WorkChain
+
+    structure = generate_wan_process.structure
+
+    # The profile is shared with the other tests, use a unique label
+    group = orm.Group(label=f"wannier_{structure.uuid}").store()
+
+    calc = generate_wan_process(orm.CalcJobNode, Wannier90Calculation)
+    base = generate_wan_process(orm.WorkChainNode, Wannier90BaseWorkChain)
+    generate_wan_process(orm.CalcJobNode, Wannier90Calculation, base, "iteration_01")
+    base_calc = generate_wan_process(
+        orm.CalcJobNode, Wannier90Calculation, base, "iteration_02"
+    )
+    workchain = generate_wan_process(orm.WorkChainNode, Wannier90WorkChain)
+    nested = generate_wan_process(
+        orm.WorkChainNode, Wannier90BaseWorkChain, workchain, "wannier90"
+    )
+    nested_calc = generate_wan_process(
+        orm.CalcJobNode, Wannier90Calculation, nested, "iteration_01"
+    )
+    # A later Wannier90BaseWorkChain with another link label is not the last one
+    other = generate_wan_process(
+        orm.WorkChainNode, Wannier90BaseWorkChain, workchain, "wannier90_pp"
+    )
+    generate_wan_process(orm.CalcJobNode, Wannier90Calculation, other, "iteration_01")
+    unfinished = orm.WorkChainNode()
+    unfinished.process_type = Wannier90BaseWorkChain.build_process_type()
+    unfinished.store()
+    group.add_nodes([calc, base, workchain, unfinished])
+
+    results = {_[0]: _[1:] for _ in harvest_wf_outputs(group)}
+    assert {_: results[_][0] for _ in results} == {
+        calc.pk: calc.pk,
+        base.pk: base_calc.pk,
+        workchain.pk: nested_calc.pk,
+    }
+    for calc_pk, structure_uuid, wf_outputs in results.values():
+        assert structure_uuid == structure.uuid
+        assert wf_outputs[0]["wf_centres"][2] == calc_pk
+    # The unfinished nodes are reported
+    assert f"Skip unfinished node: {unfinished}" in capsys.readouterr().out
+
+    unsupported = orm.WorkChainNode()
+    unsupported.process_type = "aiida.workflows:quantumespresso.pw.base"
+    unsupported.set_process_state(ProcessState.FINISHED)
+    unsupported.set_exit_status(0)
+    unsupported.store()
+    group.add_nodes([unsupported])
+    with pytest.raises(ValueError, match="Unsupported type"):
+        list(harvest_wf_outputs(group))
+
+
+def test_harvest_wf_outputs_optimize(generate_wan_process):
+    """Test ``harvest_wf_outputs`` takes the optimal calculation of a ``Wannier90OptimizeWorkChain``."""
+    from aiida import orm
+    from aiida.common.links import LinkType
+
+    from aiida_wannier90_workflows.utils.parser.center import (
+        Wannier90Calculation,
+        harvest_wf_outputs,
+    )
+    from aiida_wannier90_workflows.workflows.base.wannier90 import (
+        Wannier90BaseWorkChain,
+    )
+    from aiida_wannier90_workflows.workflows.optimize import Wannier90OptimizeWorkChain
+
+    structure = generate_wan_process.structure
+
+    def generate_optimize():
+        optimize = generate_wan_process(orm.WorkChainNode, Wannier90OptimizeWorkChain)
+        base = generate_wan_process(
+            orm.WorkChainNode, Wannier90BaseWorkChain, optimize, "wannier90"
+        )
+        generate_wan_process(
+            orm.CalcJobNode, Wannier90Calculation, base, "iteration_01"
+        )
+        base = generate_wan_process(
+            orm.WorkChainNode,
+            Wannier90BaseWorkChain,
+            optimize,
+            "wannier90_optimize_iteration1",
+        )
+        optimal_calc = generate_wan_process(
+            orm.CalcJobNode, Wannier90Calculation, base, "iteration_01"
+        )
+        return optimize, optimal_calc
+
+    # The profile is shared with the other tests, use a unique label
+    group = orm.Group(label=f"wannier_optimize_{structure.uuid}").store()
+
+    optimize, optimal_calc = generate_optimize()
+    parameters = (
+        optimal_calc.base.links.get_outgoing(link_label_filter="output_parameters")
+        .one()
+        .node
+    )
+    parameters.base.links.add_incoming(
+        optimize, LinkType.RETURN, "wannier90_optimal__output_parameters"
+    )
+    group.add_nodes([optimize])
+    assert [_[:2] for _ in harvest_wf_outputs(group)] == [
+        (optimize.pk, optimal_calc.pk)
+    ]
+
+    # Same as `get_last_wan_calc`, fail without the optimal outputs
+    no_optimal, _ = generate_optimize()
+    group.add_nodes([no_optimal])
+    with pytest.raises(ValueError, match="No `wannier90_optimal` outputs"):
+        list(harvest_wf_outputs(group))
+
+
+def test_harvest_wf_arrays(generate_wan_process):
+    """Test ``harvest_wf_arrays`` prefers the ``wannier_functions`` arrays."""
+    from aiida import orm
+    from aiida.common.links import LinkType
+    from plumpy import ProcessState
+
+    from aiida_wannier90_workflows.utils.parser.center import (
+        Wannier90Calculation,
+        get_wannier_functions_arrays,
+        harvest_wf_arrays,
+    )
+    from aiida_wannier90_workflows.utils.parser.spread import wf_spreads_for_group
+
+    structure = generate_wan_process.structure
+
+    def generate_calc(spread):
+        return generate_wan_process(
+            orm.CalcJobNode,
+            Wannier90Calculation,
+            wannier_functions_output=[
+                {"wf_ids": 1, "wf_centres": [0.0, 0.0, 1.0], "wf_spreads": spread}
+            ],
+            wannier_functions_initial=[
+                {"wf_ids": 1, "wf_centres": [0.0, 0.0, 2.0], "wf_spreads": 0.0}
+            ],
+        )
+
+    calc = generate_calc(1.0)
+    calc_arrays = generate_calc(2.0)
+    parameters = (
+        calc_arrays.base.links.get_outgoing(link_label_filter="output_parameters")
+        .one()
+        .node
+    )
+
+    # The provenance of `get_wannier_functions_arrays`, with different arrays
+    # to check where they are loaded from
+    function = orm.CalcFunctionNode()
+    function.process_type = (
+        get_wannier_functions_arrays.process_class.build_process_type()
+    )
+    function.set_process_state(ProcessState.FINISHED)
+    function.set_exit_status(0)
+    function.base.links.add_incoming(
+        parameters, LinkType.INPUT_CALC, "output_parameters"
+    )
+    function.store()
+    arrays = orm.ArrayData()
+    arrays.set_array("ids", np.array([1]))
+    arrays.set_array("centres", np.array([[0.0, 0.0, 3.0]]))
+    arrays.set_array("spreads", np.array([3.0]))
+    arrays.base.links.add_incoming(function, LinkType.CREATE, "result")
+    arrays.store()
+
+    # The profile is shared with the other tests, use a unique label
+    group = orm.Group(label=f"wannier_arrays_{structure.uuid}").store()
+    group.add_nodes([calc, calc_arrays])
+
+    spreads = {_[1]: _[3] for _ in harvest_wf_arrays(group, "spreads")}
+    assert {_: list(spreads[_]) for _ in spreads} == {
+        calc.pk: [1.0],
+        calc_arrays.pk: [3.0],
+    }
+    centres = {_[1]: _[2:] for _ in harvest_wf_arrays(group, "centres")}
+    assert centres[calc.pk][0] == structure.uuid
+    assert np.allclose(centres[calc.pk][1], [[0.0, 0.0, 1.0]])
+    assert np.allclose(centres[calc_arrays.pk][1], [[0.0, 0.0, 3.0]])
+    # The initial WFs are always parsed
+    centres = {_[1]: _[3] for _ in harvest_wf_arrays(group, "centres", initial=True)}
+    assert np.allclose(centres[calc_arrays.pk], [[0.0, 0.0, 2.0]])
+
+    assert np.allclose(np.sort(wf_spreads_for_group(group)), [1.0, 3.0])
+
+
+@pytest.mark.parametrize("max_workers", (1, 2))
+def test_export_wf_centers_for_group(generate_wan_process, tmp_path, max_workers):
+    """Test ``export_wf_centers_for_group`` with and without ``skip_existing``."""
+    import ase.io
+
+    from aiida import orm
+
+    from aiida_wannier90_workflows.utils.parser.center import (
+        Wannier90Calculation,
+        export_wf_centers_for_group,
+    )
+
+    structure = generate_wan_process.structure
+    # The profile is shared with the other tests, use a unique label
+    group = orm.Group(label=f"wannier_xyz_{structure.uuid}_{max_workers}").store()
+
+    calcs = [
+        generate_wan_process(
+            orm.CalcJobNode,
+            Wannier90Calculation,
+            wannier_functions_output=[
+                {"wf_ids": i + 1, "wf_centres": [0.1 * i, 0.0, 0.0]}
+                for i in range(num_wf)
+            ],
+        )
+        for num_wf in (1, 2, 3)
+    ]
+    group.add_nodes(calcs)
+
+    filenames = [
+        tmp_path / f"{structure.get_formula()}_{calc.pk}_wf_centers.xyz"
+        for calc in calcs
+    ]
+
+    export_wf_centers_for_group(group, tmp_path, max_workers=max_workers)
+    for num_wf, filename in enumerate(filenames, start=1):
+        atoms = ase.io.read(filename)
+        assert atoms.get_chemical_symbols().count("X") == num_wf
+        assert len(atoms) == len(structure.sites) + num_wf
+
+    # The existing files are kept with `skip_existing`, overwritten by default
+    filenames[0].write_text("stale", encoding="utf-8")
+    export_wf_centers_for_group(
+        group, tmp_path, max_workers=max_workers, skip_existing=True
+    )
+    assert filenames[0].read_text(encoding="utf-8") == "stale"
+
+    export_wf_centers_for_group(group, tmp_path, max_workers=max_workers)
+    assert ase.io.read(filenames[0]).get_chemical_symbols().count("X") == 1
@@ -1,6 +1,7 @@
 """Unit tests for the :py:mod:`~aiida_quantumespresso.utils.kpoints` module."""
 
 import numpy as np
+import pytest
 
 from aiida import orm
 
@@ -41,3 +42,121 @@ def test_get_mesh_from_kpoints():
     mesh = get_mesh_from_kpoints(kpoints)
 
     assert np.allclose(mesh, [3, 4, 5])
+
+
+def test_get_explicit_kpoints():
+    """Test the function ``aiida_wannier90_workflows.utils.kpoints.get_explicit_kpoints``."""
+    from aiida_wannier90_workflows.utils.kpoints import get_explicit_kpoints
+
+    mesh = [2, 3, 4]
+    kmesh = orm.KpointsData()
+    kmesh.set_kpoints_mesh(mesh)
+
+    kpoints = get_explicit_kpoints(kmesh)
+
+    # Same ordering as `kmesh.pl` of Wannier90
+    ref_kpoints = [
+        [x / mesh[0], y / mesh[1], z / mesh[2]]
+        for x in range(mesh[0])
+        for y in range(mesh[1])
+        for z in range(mesh[2])
+    ]
+    assert np.array_equal(kpoints.get_kpoints(), ref_kpoints)
+    assert np.allclose(kpoints.get_array("weights"), 1 / 24)
+
+
+def test_get_mesh_from_kpoints_shifted():
+    """Test ``get_mesh_from_kpoints`` for explicit lists of shifted meshes."""
+    from aiida_wannier90_workflows.utils.kpoints import (
+        cartesian_product,
+        get_mesh_from_kpoints,
+    )
+
+    rng = np.random.default_rng(42)
+    mesh = [3, 5, 2]
+    for shift in ([0.0, 0.0, 0.0], [0.5, 0.5, 0.5], [0.25, 0.0, 0.5]):
+        klist = cartesian_product(
+            *[(np.arange(n) + s) / n for n, s in zip(mesh, shift)]
+        )
+        kpoints = orm.KpointsData()
+        kpoints.set_kpoints(klist)
+
+        recovered_mesh, offset = get_mesh_from_kpoints(kpoints, return_offset=True)
+        assert recovered_mesh == mesh
+        assert np.allclose(offset, shift)
+
+        # Meshes not starting from the origin
+        kpoints.set_kpoints(klist - 0.5)
+        recovered_mesh, offset = get_mesh_from_kpoints(kpoints, return_offset=True)
+        assert recovered_mesh == mesh
+        # The offset is in units of the step
+        assert np.allclose(offset, np.mod(np.array(shift) - 0.5 * np.array(mesh), 1))
+
+        # Coordinates with floating point noise, e.g. converted from Cartesian
+        # coordinates or parsed from a text file
+        cell = np.array([[0.0, 2.7, 2.7], [2.7, 0.0, 2.7], [2.7, 2.7, 0.0]])
+        reciprocal_cell = 2 * np.pi * np.linalg.inv(cell).T
+        klist_noisy = (klist @ reciprocal_cell) @ np.linalg.inv(reciprocal_cell)
+        klist_noisy += rng.uniform(-1e-9, 1e-9, size=klist.shape)
+        assert not np.array_equal(klist_noisy, klist)
+        kpoints.set_kpoints(klist_noisy)
+        recovered_mesh, offset = get_mesh_from_kpoints(kpoints, return_offset=True)
+        assert recovered_mesh == mesh
+        assert np.allclose(offset, shift)
+
+    # Not evenly spaced
+    klist = cartesian_product(
+        np.arange(3) / 3, np.arange(2) / 2, np.array([0.0, 0.3, 0.5])
+    )
+    kpoints.set_kpoints(klist)
+    with pytest.raises(ValueError):
+        get_mesh_from_kpoints(kpoints)
+
+
+def test_get_open_grid_klist():
+    """Test ``get_open_grid_klist`` reproduces the folding of ``kpoint_grid`` of QE."""
+    from aiida_wannier90_workflows.utils.kpoints import get_open_grid_klist
+
+    klist = get_open_grid_klist([2, 1, 4])
+    ref_klist = [
+        [0.0, 0.0, 0.0],
+        [0.0, 0.0, 0.25],
+        [0.0, 0.0, -0.5],
+        [0.0, 0.0, -0.25],
+        [-0.5, 0.0, 0.0],
+        [-0.5, 0.0, 0.25],
+        [-0.5, 0.0, -0.5],
+        [-0.5, 0.0, -0.25],
+    ]
+    assert np.allclose(klist, ref_klist)
+
+    # Shifted by half a step, i.e. ``1 1 1`` in pw.x
+    klist = get_open_grid_klist([2, 2, 2], [0.5, 0.5, 0.5])
+    assert klist.shape == (8, 3)
+    assert np.allclose(np.abs(klist), 0.25)
+    assert np.allclose(klist[1], [0.25, 0.25, -0.25])
+
+
+def test_is_full_kmesh():
+    """Test ``is_full_kmesh`` for the kpoints computed by pw.x."""
+    from aiida_wannier90_workflows.utils.kpoints import (
+        get_open_grid_klist,
+        is_full_kmesh,
+    )
+
+    klist = get_open_grid_klist([2, 3, 4])
+    assert is_full_kmesh(klist, [2, 3, 4])
+    # Any order, folded into any cell
+    rng = np.random.default_rng(0)
+    shuffled = rng.permutation(klist) + rng.integers(-2, 3, klist.shape)
+    assert is_full_kmesh(shuffled, [2, 3, 4])
+    # Reduced by symmetry, or with a duplicated kpoint
+    assert not is_full_kmesh(klist[:-1], [2, 3, 4])
+    assert not is_full_kmesh(np.vstack([klist[:-1], klist[:1]]), [2, 3, 4])
+    # Another mesh, or another offset
+    assert not is_full_kmesh(klist, [4, 3, 2])
+    assert not is_full_kmesh(klist + 0.1, [2, 3, 4])
+    assert is_full_kmesh(
+        get_open_grid_klist([2, 2, 2], [0.5, 0.5, 0.5]), [2, 2, 2], [0.5, 0.5, 0.5]
+    )
+    assert not is_full_kmesh(get_open_grid_klist([2, 2, 2]), [2, 2, 2], [0.5] * 3)
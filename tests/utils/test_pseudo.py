@@ -0,0 +1,299 @@
+"""Unit tests for the :py:mod:`~aiida_wannier90_workflows.utils.pseudo` module."""
+
+import pytest
+
+
+def test_get_pseudo_metadata(monkeypatch, tmp_path):
+    """Test ``get_pseudo_metadata`` finds the metadata in the registered libraries."""
+    import json
+
+    from aiida_wannier90_workflows.utils.pseudo import data
+    from aiida_wannier90_workflows.utils.pseudo.data import (
+        PSEUDO_METADATA_LIBRARIES,
+        get_pseudo_metadata,
+        load_pseudo_metadata,
+        register_pseudo_metadata,
+    )
+
+    # Do not leak the registered libraries into the other tests
+    monkeypatch.setattr(data, "_pending_libraries", list(PSEUDO_METADATA_LIBRARIES))
+    monkeypatch.setattr(data, "_pseudo_metadata_index", {})
+
+    library = load_pseudo_metadata("semicore/SSSP_1.1_PBE_efficiency.json")
+    assert get_pseudo_metadata("Si", library["Si"]["md5"]) == library["Si"]
+    assert get_pseudo_metadata("Si", "0" * 32) is None
+
+    extra = {
+        "Si": {
+            "filename": "Si.custom.upf",
+            "md5": "0" * 32,
+            "pswfcs": ["3S", "3P"],
+            "semicores": [],
+        }
+    }
+    register_pseudo_metadata(extra)
+    assert get_pseudo_metadata("Si", "0" * 32) == extra["Si"]
+    # The built-in libraries have higher priority
+    assert get_pseudo_metadata("Si", library["Si"]["md5"]) == library["Si"]
+
+    # A json file relative to the current working directory
+    extra["Si"]["md5"] = "1" * 32
+    (tmp_path / "extra.json").write_text(json.dumps(extra), encoding="utf-8")
+    monkeypatch.chdir(tmp_path)
+    register_pseudo_metadata("extra.json")
+    assert get_pseudo_metadata("Si", "1" * 32) == extra["Si"]
+
+    # A library failing to load is kept, and loaded once fixed
+    extra["Si"]["md5"] = "2" * 32
+    register_pseudo_metadata("missing.json")
+    with pytest.raises(FileNotFoundError):
+        get_pseudo_metadata("Si", "2" * 32)
+    (tmp_path / "missing.json").write_text(json.dumps(extra), encoding="utf-8")
+    assert get_pseudo_metadata("Si", "2" * 32) == extra["Si"]
+
+
+def test_get_upf_facts(generate_upf_data, generate_upf_data_soc):
+    """Test ``get_upf_facts`` on the Ag pseudos of SSSP and PseudoDojo FR."""
+    from aiida_wannier90_workflows.utils.pseudo.upf import get_upf_facts
+
+    upf = generate_upf_data("Ag")
+    assert get_upf_facts(upf) == {
+        "z_valence": 19.0,
+        "has_so": False,
+        "pswfc": [{"l": 0}, {"l": 1}, {"l": 0}, {"l": 2}],
+        "number_of_pswfc": 10,
+    }
+
+    # The cached facts cannot be modified
+    get_upf_facts(upf)["pswfc"].clear()
+    assert len(get_upf_facts(upf)["pswfc"]) == 4
+
+    assert get_upf_facts(generate_upf_data_soc("Ag")) == {
+        "z_valence": 19.0,
+        "has_so": True,
+        "pswfc": [
+            {"n": 1, "l": 0, "j": 0.5},
+            {"n": 2, "l": 1, "j": 1.5},
+            {"n": 2, "l": 1, "j": 0.5},
+            {"n": 3, "l": 2, "j": 2.5},
+            {"n": 3, "l": 2, "j": 1.5},
+            {"n": 4, "l": 0, "j": 0.5},
+        ],
+        "number_of_pswfc": 20,
+    }
+
+
+def test_get_upf_facts_cache_size(
+    monkeypatch, generate_upf_data, generate_upf_data_soc
+):
+    """Test the in-memory cache of ``get_upf_facts`` keeps the most recently used pseudos."""
+    from collections import OrderedDict
+
+    from aiida_wannier90_workflows.utils.pseudo import upf
+
+    monkeypatch.setattr(upf, "_upf_facts_cache", OrderedDict())
+    monkeypatch.setattr(upf, "UPF_FACTS_CACHE_SIZE", 2)
+
+    upf_ag = generate_upf_data("Ag")
+    upf_ag_soc = generate_upf_data_soc("Ag")
+    upf_si = generate_upf_data("Si")
+
+    upf.get_upf_facts(upf_ag)
+    upf.get_upf_facts(upf_ag_soc)
+    # A hit makes Ag the most recently used, the SOC one is evicted instead
+    upf.get_upf_facts(upf_ag)
+    upf.get_upf_facts(upf_si)
+    assert list(upf._upf_facts_cache) == [  # pylint: disable=protected-access
+        upf_ag.md5,
+        upf_si.md5,
+    ]
+
+
+UPF_PAW_HEADER = """<UPF version="2.0.1">
+<PP_HEADER
+   element="Fe"
+   pseudo_type="PAW"
+   is_paw="T"
+   has_so="F"
+   has_wfc="T"
+   z_valence="1.600000000000000E+001"
+   number_of_wfc="2"/>
+"""
+
+UPF_PAW_PSWFC = """<PP_PSWFC>
+  <PP_CHI.1 type="real" size="2" columns="4" index="1" label="4S" l="0" occupation="2.0">
+    0.0 0.1
+  </PP_CHI.1>
+  <PP_CHI.2 type="real" size="2" columns="4" index="2" label="3D" l="2" occupation="6.0">
+    0.0 0.1
+  </PP_CHI.2>
+</PP_PSWFC>
+"""
+
+# The pseudo wavefunctions of PAW are also in PP_FULL_WFC, with the tags PP_PSWFC.i
+UPF_PAW_FULL_WFC = """<PP_FULL_WFC number_of_wfc="2">
+  <PP_AEWFC.1 type="real" size="2" columns="4" index="1" label="4S" l="0">
+    0.0 0.1
+  </PP_AEWFC.1>
+  <PP_PSWFC.1 type="real" size="2" columns="4" index="1" label="4S" l="0">
+    0.0 0.1
+  </PP_PSWFC.1>
+  <PP_AEWFC.2 type="real" size="2" columns="4" index="2" label="3D" l="2">
+    0.0 0.1
+  </PP_AEWFC.2>
+  <PP_PSWFC.2 type="real" size="2" columns="4" index="2" label="3D" l="2">
+    0.0 0.1
+  </PP_PSWFC.2>
+</PP_FULL_WFC>
+"""
+
+UPF_V1 = """<PP_INFO>
+  Generated by new atomic code, or converted to UPF format
+</PP_INFO>
+<PP_HEADER>
+   0                   Version Number
+  Be                   Element
+   US                  Ultrasoft pseudopotential
+    F                  Nonlinear Core Correction
+ SLA  PW   PBX  PBC    PBE  Exchange-Correlation functional
+    4.00000000000      Z valence
+  -27.97245939710      Total energy
+    0.00000    0.00000 Suggested cutoff for wfc and rho
+    2                  Max angular momentum component
+  769                  Number of points in mesh
+    3    6             Number of Wavefunctions, Number of Projectors
+ Wavefunctions         nl  l   occ
+                       1S  0  2.00
+                       2S  0  2.00
+                       2P  1  0.00
+</PP_HEADER>
+<PP_MESH>
+  <PP_R>
+    0.0 0.1
+  </PP_R>
+</PP_MESH>
+<PP_PSWFC>
+    1S    0  2.00000000000      Wavefunction
+    0.0 0.1
+    2S    0  2.00000000000      Wavefunction
+    0.0 0.1
+    2P    1  0.00000000000      Wavefunction
+    0.0 0.1
+</PP_PSWFC>
+"""
+
+
+@pytest.mark.parametrize(
+    "upf_content, expected",
+    (
+        (
+            UPF_PAW_HEADER + UPF_PAW_PSWFC + UPF_PAW_FULL_WFC + "</UPF>\n",
+            {
+                "z_valence": 16.0,
+                "has_so": False,
+                "pswfc": [{"l": 0}, {"l": 2}],
+                "number_of_pswfc": 6,
+            },
+        ),
+        (
+            UPF_PAW_HEADER + UPF_PAW_FULL_WFC + UPF_PAW_PSWFC + "</UPF>\n",
+            {
+                "z_valence": 16.0,
+                "has_so": False,
+                "pswfc": [{"l": 0}, {"l": 2}],
+                "number_of_pswfc": 6,
+            },
+        ),
+        (
+            UPF_V1,
+            {
+                "z_valence": 4.0,
+                "has_so": False,
+                "pswfc": [{"l": 0}, {"l": 0}, {"l": 1}],
+                "number_of_pswfc": 5,
+            },
+        ),
+    ),
+    ids=("paw", "paw_full_wfc_first", "upf_v1"),
+)
+def test_parse_upf(upf_content, expected):
+    """Test ``parse_upf`` on a PAW-like UPF v2 and on a UPF v1 content."""
+    from aiida_wannier90_workflows.utils.pseudo.upf import parse_upf
+
+    assert parse_upf(upf_content) == expected
+
+
+def test_get_number_of_projections_electrons(
+    generate_structure, generate_upf_data, generate_upf_data_soc
+):
+    """Test ``get_number_of_projections`` and ``get_number_of_electrons``."""
+    from aiida_wannier90_workflows.utils.pseudo import (
+        get_number_of_electrons,
+        get_number_of_projections,
+    )
+
+    structure = generate_structure("Si")
+
+    # Si of SSSP: 3S 3P
+    pseudos = {"Si": generate_upf_data("Si")}
+    assert get_number_of_projections(structure, pseudos) == 8
+    assert get_number_of_projections(structure, pseudos, True) == 16
+    assert get_number_of_electrons(structure, pseudos) == 8
+
+    # Si of PseudoDojo FR: 3S 3P with j = 1/2 and 3/2
+    pseudos = {"Si": generate_upf_data_soc("Si")}
+    assert get_number_of_projections(structure, pseudos) == 16
+    assert get_number_of_projections(structure, pseudos, False) == 8
+
+
+def test_upf_cache(monkeypatch, tmp_path, generate_upf_data):
+    """Test the on-disk cache of the facts of UPF files."""
+    from collections import OrderedDict
+
+    from aiida_wannier90_workflows.utils.pseudo import cache, upf
+
+    assert cache.load_upf_cache("0" * 32) is None
+
+    monkeypatch.setenv(cache.UPF_CACHE_ENVVAR, str(tmp_path / "upf_cache.sqlite"))
+    monkeypatch.setattr(cache, "UPF_CACHE_MAX_ENTRIES", 2)
+    monkeypatch.setattr(upf, "_upf_facts_cache", OrderedDict())
+    monkeypatch.setattr(cache, "_initialized_paths", set())
+
+    upf_data = generate_upf_data("Ag")
+    md5 = upf_data.md5
+    upf_facts = upf.get_upf_facts(upf_data)
+    assert cache.load_upf_cache(md5) == upf_facts
+
+    # A new process only has the on-disk cache
+    monkeypatch.setattr(upf, "_upf_facts_cache", OrderedDict())
+    monkeypatch.setattr(upf, "get_upf_content", None)
+    assert upf.get_upf_facts(upf_data) == upf_facts
+
+    # The oldest entries are evicted
+    cache.save_upf_cache("1" * 32, {})
+    cache.save_upf_cache("2" * 32, {})
+    assert cache.load_upf_cache(md5) is None
+    assert cache.load_upf_cache("2" * 32) == {}
+
+    # The database is set up once per process
+    assert cache._initialized_paths == {tmp_path / "upf_cache.sqlite"}
+
+    # Entries of another version of `parse_upf`, or corrupt entries, are not reused
+    with cache._connect(tmp_path / "upf_cache.sqlite") as connection, connection:
+        connection.execute(
+            "UPDATE upf SET version = ? WHERE md5 = ?",
+            (upf.UPF_FACTS_VERSION - 1, "1" * 32),
+        )
+        connection.execute("UPDATE upf SET facts = '{' WHERE md5 = ?", ("2" * 32,))
+    assert cache.load_upf_cache("1" * 32) is None
+    assert cache.load_upf_cache("2" * 32) is None
+
+    cache.clear_upf_cache()
+    assert cache.load_upf_cache("2" * 32) is None
+
+    # A broken cache path never fails
+    (tmp_path / "file").write_text("")
+    monkeypatch.setenv(cache.UPF_CACHE_ENVVAR, str(tmp_path / "file" / "upf.sqlite"))
+    cache.save_upf_cache(md5, upf_facts)
+    assert cache.load_upf_cache(md5) is None
+    cache.clear_upf_cache()
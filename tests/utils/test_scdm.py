@@ -0,0 +1,179 @@
+"""Unit tests for the :py:mod:`~aiida_wannier90_workflows.utils.scdm` module."""
+
+import numpy as np
+import pytest
+
+
+def test_get_projectability_arrays(generate_projections):
+    """Test ``get_projectability_arrays``."""
+    from aiida_wannier90_workflows.utils.scdm import get_projectability_arrays
+
+    bands, projections = generate_projections()
+
+    bands_array, projections_array = get_projectability_arrays(bands, projections)
+
+    # Reference: sum the projections orbital by orbital
+    ref_projections = sum(_[1] for _ in projections.get_projections())
+    assert np.allclose(bands_array, bands.get_bands())
+    assert np.allclose(projections_array, ref_projections)
+
+    # Spin up and down
+    bands_array, projections_array = get_projectability_arrays(
+        [bands, bands], [projections, projections]
+    )
+    assert bands_array.shape == (10, 60)
+    assert np.allclose(projections_array[:, 30:], ref_projections)
+
+
+def test_fit_scdm_mu_sigma_fast():
+    """Test the fast mode of ``fit_scdm_mu_sigma_raw``."""
+    from aiida_wannier90_workflows.utils.scdm import (
+        erfc_scdm,
+        fit_scdm_mu_sigma_raw,
+        guess_scdm_mu_sigma,
+    )
+
+    rng = np.random.default_rng(42)
+    bands = np.sort(rng.uniform(-10, 30, size=(400, 50)), axis=1)
+    projections = erfc_scdm(bands, 5.0, 1.5) + rng.normal(0, 0.02, size=bands.shape)
+    projections = np.clip(projections, 0, 1)
+
+    mu_guess, sigma_guess = guess_scdm_mu_sigma(bands, projections)
+    assert abs(mu_guess - 5.0) < 0.1
+    assert abs(sigma_guess - 1.5) < 0.1
+
+    mu_full, sigma_full = fit_scdm_mu_sigma_raw(bands, projections, sigma_factor=0)
+    mu_fast, sigma_fast, data = fit_scdm_mu_sigma_raw(
+        bands, projections, sigma_factor=0, return_data=True, fast=True
+    )
+    assert abs(mu_fast - mu_full) < 1e-5
+    assert abs(sigma_fast - sigma_full) < 1e-5
+    assert data.shape == (2, bands.size)
+    assert np.all(np.diff(data[0]) >= 0)
+
+    # Fewer points than bins, fit all the points
+    mu_fast, sigma_fast = fit_scdm_mu_sigma_raw(
+        bands[:2], projections[:2], sigma_factor=0, fast=True
+    )
+    mu_full, sigma_full = fit_scdm_mu_sigma_raw(bands[:2], projections[:2], 0)
+    assert abs(mu_fast - mu_full) < 1e-4
+    assert abs(sigma_fast - sigma_full) < 1e-4
+
+
+def test_get_energy_of_projectability_raw():
+    """Test ``get_energy_of_projectability_raw``."""
+    from aiida_wannier90_workflows.utils.scdm import (
+        get_energy_of_projectability_raw,
+        sort_projectability_arrays,
+    )
+
+    rng = np.random.default_rng(42)
+    bands = rng.uniform(-10, 30, size=(20, 30))
+    projections = rng.uniform(0, 1, size=bands.shape)
+
+    thresholds = [0.95, 0.5, 0.9, 0.99999]
+    energies = get_energy_of_projectability_raw(bands, projections, thresholds)
+
+    # Reference: sort the energies, one threshold at a time
+    sorted_bands, sorted_projwfc = sort_projectability_arrays(bands, projections)
+    for threshold, energy in zip(thresholds[:-1], energies):
+        max_ind = np.max(np.argwhere(sorted_projwfc >= threshold).flatten())
+        assert energy == sorted_bands[max_ind]
+        assert energy == get_energy_of_projectability_raw(bands, projections, threshold)
+    assert np.isnan(energies[-1])
+
+
+def test_scdm_cache(generate_projections, monkeypatch):
+    """Test caching the SCDM results in the extras of the projections node."""
+    from aiida import orm
+
+    from aiida_wannier90_workflows.utils import scdm
+    from aiida_wannier90_workflows.utils.scdm import (
+        SCDM_CACHE_EXTRA,
+        fit_scdm_mu_sigma,
+        get_energy_of_projectability,
+        set_cached_result,
+    )
+
+    bands, projections = generate_projections()
+    sigma_factor = orm.Float(3)
+
+    # Unstored nodes are not cached
+    mu_sigma = fit_scdm_mu_sigma(
+        bands, projections, sigma_factor, fast=True, use_cache=True
+    )
+    assert SCDM_CACHE_EXTRA not in projections.base.extras.all
+
+    # The cache is opt-in
+    bands.store()
+    projections.store()
+    assert fit_scdm_mu_sigma(bands, projections, sigma_factor, fast=True) == mu_sigma
+    energies = get_energy_of_projectability(bands, projections, [0.9, 2.0])
+    assert SCDM_CACHE_EXTRA not in projections.base.extras.all
+
+    assert (
+        fit_scdm_mu_sigma(bands, projections, sigma_factor, fast=True, use_cache=True)
+        == mu_sigma
+    )
+    get_energy_of_projectability(bands, projections, [0.9, 2.0], use_cache=True)
+    assert len(projections.base.extras.get(SCDM_CACHE_EXTRA)) == 2
+
+    # Tamper the cache to make sure it is used
+    cache = projections.base.extras.get(SCDM_CACHE_EXTRA)
+    cache[0]["result"] = [1.0, 2.0]
+    projections.base.extras.set(SCDM_CACHE_EXTRA, cache)
+    assert fit_scdm_mu_sigma(
+        bands, projections, sigma_factor, fast=True, use_cache=True
+    ) == (1, 2)
+    mu, sigma, data = fit_scdm_mu_sigma(
+        bands, projections, sigma_factor, return_data=True, fast=True, use_cache=True
+    )
+    assert (mu, sigma) == (1, 2)
+    assert data.shape == (2, bands.get_bands().size)
+    assert fit_scdm_mu_sigma(
+        bands, projections, sigma_factor, fast=True
+    ) == pytest.approx(mu_sigma)
+
+    # Records of another version are ignored
+    monkeypatch.setattr(scdm, "SCDM_CACHE_VERSION", scdm.SCDM_CACHE_VERSION + 1)
+    assert fit_scdm_mu_sigma(
+        bands, projections, sigma_factor, fast=True, use_cache=True
+    ) == pytest.approx(mu_sigma)
+    monkeypatch.undo()
+
+    cached_energies = get_energy_of_projectability(
+        bands, projections, [0.9, 2.0], use_cache=True
+    )
+    assert cached_energies[0] == pytest.approx(energies[0])
+    assert np.isnan(cached_energies[1])
+    assert get_energy_of_projectability(
+        bands, projections, 0.9, use_cache=True
+    ) == pytest.approx(energies[0])
+
+    # A record with the same query is replaced, the oldest records are evicted
+    num_records = len(projections.base.extras.get(SCDM_CACHE_EXTRA))
+    query = {"function": "test"}
+    set_cached_result(bands, projections, query, [3.0])
+    set_cached_result(bands, projections, query, [4.0])
+    cache = projections.base.extras.get(SCDM_CACHE_EXTRA)
+    assert len(cache) == num_records + 1
+    assert cache[-1]["result"] == [4.0]
+    monkeypatch.setattr(scdm, "SCDM_CACHE_MAX_RECORDS", 2)
+    set_cached_result(bands, projections, {"function": "other"}, [5.0])
+    cache = projections.base.extras.get(SCDM_CACHE_EXTRA)
+    assert [_["result"] for _ in cache] == [[4.0], [5.0]]
+
+    # The arrays are not loaded for a cache hit
+    def fail(*args, **kwargs):
+        raise AssertionError("should not be called")
+
+    set_cached_result(
+        bands,
+        projections,
+        {"function": "fit_scdm_mu_sigma", "sigma_factor": 3.0, "fast": True},
+        [1.0, 2.0],
+    )
+    monkeypatch.setattr(scdm, "get_projectability_arrays", fail)
+    assert fit_scdm_mu_sigma(
+        bands, projections, sigma_factor, fast=True, use_cache=True
+    ) == (1, 2)
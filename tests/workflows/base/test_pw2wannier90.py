@@ -31,12 +31,15 @@ def test_prepare_inputs(
     """Test `Pw2wannier90BaseWorkChain.prepare_inputs`."""
     from aiida.orm import Dict
 
+    from aiida_wannier90_workflows.utils.scdm import SCDM_FIT_FAST_EXTRA
+
     inputs = generate_inputs_pw2wannier90_base()
     parameters = inputs["parameters"].get_dict()["inputpp"]
 
     # Test SCDM fitting is working
     parameters["scdm_proj"] = True
     parameters["scdm_entanglement"] = "erfc"
+    scdm_parameters = dict(parameters)
     inputs["parameters"] = Dict({"inputpp": parameters})
 
     inputs = {"pw2wannier90": inputs}
@@ -53,6 +56,65 @@ def test_prepare_inputs(
     assert "scdm_sigma" in parameters, parameters
     assert abs(parameters["scdm_mu"] - 6.023033662603666) < 1e-5, parameters
     assert abs(parameters["scdm_sigma"] - 0.21542103913166902) < 1e-5, parameters
+    assert process.node.base.extras.get(SCDM_FIT_FAST_EXTRA) is False
+
+    # The fast fitting mode is opt-in
+    inputs = generate_inputs_pw2wannier90_base()
+    inputs["parameters"] = Dict({"inputpp": scdm_parameters})
+    inputs = {"pw2wannier90": inputs, "scdm_fit_fast": True}
+    inputs["bands"] = generate_bands_data()
+    inputs["bands_projections"] = generate_projection_data()
+    process = generate_workchain_pw2wannier90_base(inputs=inputs)
+    parameters = process.prepare_inputs()["parameters"].get_dict()["inputpp"]
+    assert "scdm_mu" in parameters, parameters
+    assert "scdm_sigma" in parameters, parameters
+    assert process.node.base.extras.get(SCDM_FIT_FAST_EXTRA) is True
+
+
+def test_prepare_inputs_use_cache(
+    generate_inputs_pw2wannier90_base,
+    generate_workchain_pw2wannier90_base,
+    generate_bands_data,
+    generate_projection_data,
+):
+    """Test `Pw2wannier90BaseWorkChain.prepare_inputs` reuses the cached SCDM fitting."""
+    from aiida.orm import Dict
+
+    from aiida_wannier90_workflows.utils.scdm import SCDM_CACHE_EXTRA
+
+    bands = generate_bands_data()
+    projections = generate_projection_data()
+
+    def prepare_inputs(use_cache):
+        inputs = generate_inputs_pw2wannier90_base()
+        parameters = inputs["parameters"].get_dict()["inputpp"]
+        parameters["scdm_proj"] = True
+        parameters["scdm_entanglement"] = "erfc"
+        inputs["parameters"] = Dict({"inputpp": parameters})
+        inputs = {
+            "pw2wannier90": inputs,
+            "bands": bands,
+            "bands_projections": projections,
+            "scdm_use_cache": use_cache,
+        }
+        process = generate_workchain_pw2wannier90_base(inputs=inputs)
+        return process.prepare_inputs()["parameters"].get_dict()["inputpp"]
+
+    # The cache is opt-in
+    prepare_inputs(False)
+    assert SCDM_CACHE_EXTRA not in projections.base.extras.all
+
+    parameters = prepare_inputs(True)
+    cache = projections.base.extras.get(SCDM_CACHE_EXTRA)
+    assert len(cache) == 1
+    assert cache[0]["result"] == [parameters["scdm_mu"], parameters["scdm_sigma"]]
+
+    # The next run on the same nodes takes the cached result
+    cache[0]["result"] = [1.0, 2.0]
+    projections.base.extras.set(SCDM_CACHE_EXTRA, cache)
+    parameters = prepare_inputs(True)
+    assert parameters["scdm_mu"] == 1.0
+    assert parameters["scdm_sigma"] == 2.0
 
 
 @pytest.mark.parametrize(
@@ -125,6 +125,49 @@ def test_prepare_inputs_auto_energy_windows(
     assert abs(parameters["dis_froz_max"] - 3.98697455) < 1e-8, parameters
 
 
+def test_prepare_inputs_auto_energy_windows_use_cache(
+    generate_inputs_wannier90_base,
+    generate_workchain_wannier90_base,
+    generate_bands_data,
+    generate_projection_data,
+):
+    """Test `Wannier90BaseWorkChain.prepare_inputs` reuses the cached `dis_froz_max`."""
+    from aiida.orm import Bool, Dict
+
+    from aiida_wannier90_workflows.utils.scdm import SCDM_CACHE_EXTRA
+
+    bands = generate_bands_data()
+    projections = generate_projection_data()
+
+    def prepare_inputs():
+        inputs = generate_inputs_wannier90_base()
+        parameters = inputs["parameters"].get_dict()
+        parameters["fermi_energy"] = 1.2
+        parameters["num_wann"] = 4
+        inputs["parameters"] = Dict(parameters)
+        inputs = {
+            "wannier90": inputs,
+            "bands": bands,
+            "bands_projections": projections,
+            "auto_energy_windows": Bool(True),
+            "auto_energy_windows_use_cache": Bool(True),
+        }
+        process = generate_workchain_wannier90_base(inputs=inputs)
+        return process.prepare_inputs()["parameters"].get_dict()
+
+    parameters = prepare_inputs()
+    assert abs(parameters["dis_froz_max"] - 3.98697455) < 1e-8, parameters
+    cache = projections.base.extras.get(SCDM_CACHE_EXTRA)
+    assert len(cache) == 1
+    assert cache[0]["result"] == [3.98697455]
+
+    # The next run on the same nodes takes the cached result
+    cache[0]["result"] = [2.5]
+    projections.base.extras.set(SCDM_CACHE_EXTRA, cache)
+    parameters = prepare_inputs()
+    assert parameters["dis_froz_max"] == 2.5, parameters
+
+
 @pytest.mark.parametrize(
     "num_procs",
     (
@@ -326,3 +369,47 @@ def test_handle_plot_wf_cube(
     # `ERROR_PLOT_WF_CUBE` exit code is still there.
     result = process.inspect_process()
     assert result == Wannier90BaseWorkChain.exit_codes.ERROR_PLOT_WF_CUBE
+
+
+@pytest.mark.parametrize("output_wannier_functions", (False, True))
+def test_results_wannier_functions(
+    generate_workchain_wannier90_base,
+    generate_inputs_wannier90_base,
+    output_wannier_functions,
+):
+    """Test `Wannier90BaseWorkChain.results` only outputs `wannier_functions` on demand."""
+    from aiida import orm
+    from aiida.common.links import LinkType
+    from aiida.engine import ExitCode
+
+    inputs = {
+        "wannier90": generate_inputs_wannier90_base(),
+        "output_wannier_functions": output_wannier_functions,
+    }
+    process = generate_workchain_wannier90_base(exit_code=ExitCode(0), inputs=inputs)
+    calculation = process.ctx.children[-1]
+    outputs = {
+        "output_parameters": orm.Dict(
+            {
+                "wannier_functions_output": [
+                    {"wf_ids": 2, "wf_centres": [1.0, 2.0, 3.0], "wf_spreads": 2.0},
+                    {"wf_ids": 1, "wf_centres": [0.0, 0.5, 1.0], "wf_spreads": 1.0},
+                ]
+            }
+        ),
+        "remote_folder": orm.RemoteData(
+            computer=calculation.computer, remote_path="/tmp"
+        ),
+        "retrieved": orm.FolderData(),
+    }
+    for link_label, node in outputs.items():
+        node.base.links.add_incoming(calculation, LinkType.CREATE, link_label)
+        node.store()
+
+    assert process.results() is None
+    assert "output_parameters" in process.outputs
+    assert ("wannier_functions" in process.outputs) == output_wannier_functions
+    if output_wannier_functions:
+        arrays = process.outputs["wannier_functions"]
+        assert arrays.get_array("ids").tolist() == [1, 2]
+        assert arrays.get_array("spreads").tolist() == [1.0, 2.0]
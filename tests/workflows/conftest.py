@@ -345,3 +345,26 @@ def generate_workchain_wannier90(generate_workchain, generate_inputs_wannier90):
         return generate_workchain(entry_point, inputs)
 
     return _generate_workchain_wannier90
+
+
+@pytest.fixture
+def generate_workchain_open_grid(
+    generate_workchain, generate_inputs_wannier90, fixture_code
+):
+    """Generate an instance of a `Wannier90OpenGridWorkChain`."""
+    from aiida_quantumespresso.utils.resources import get_default_options
+
+    def _generate_workchain_open_grid(open_grid_local=False):
+        entry_point = "wannier90_workflows.open_grid"
+        inputs = generate_inputs_wannier90()
+        inputs.pop("nscf")
+        inputs["open_grid"] = {
+            "open_grid": {
+                "code": fixture_code("quantumespresso.open_grid"),
+                "metadata": {"options": get_default_options()},
+            }
+        }
+        inputs["open_grid_local"] = open_grid_local
+        return generate_workchain(entry_point, inputs)
+
+    return _generate_workchain_open_grid
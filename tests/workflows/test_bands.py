@@ -0,0 +1,39 @@
+"""Tests for the `Wannier90BandsWorkChain` class."""
+
+import pytest
+
+
+@pytest.fixture
+def generate_workchain_bands(generate_workchain, generate_inputs_wannier90):
+    """Generate an instance of a `Wannier90BandsWorkChain`."""
+
+    def _generate_workchain_bands(structure, reuse_seekpath=False):
+        entry_point = "wannier90_workflows.bands"
+        inputs = generate_inputs_wannier90()
+        inputs["structure"] = structure
+        inputs["reuse_seekpath"] = reuse_seekpath
+        return generate_workchain(entry_point, inputs)
+
+    return _generate_workchain_bands
+
+
+def test_reuse_seekpath(generate_workchain_bands, generate_structure):
+    """Test a second seekpath run on the same structure is taken from the cache."""
+    structure = generate_structure().store()
+
+    def get_seekpath_node(reuse_seekpath):
+        workchain = generate_workchain_bands(structure, reuse_seekpath)
+        assert workchain.should_run_seekpath()
+        workchain.run_seekpath()
+        return workchain.outputs["primitive_structure"].creator
+
+    first = get_seekpath_node(reuse_seekpath=True)
+    second = get_seekpath_node(reuse_seekpath=True)
+
+    assert second.uuid != first.uuid
+    assert second.base.caching.get_cache_source() is not None
+    assert second.base.links.get_incoming().get_node_by_label("structure") == structure
+
+    # Caching is only enabled on request
+    third = get_seekpath_node(reuse_seekpath=False)
+    assert third.base.caching.get_cache_source() is None
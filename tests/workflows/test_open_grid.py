@@ -0,0 +1,159 @@
+"""Tests for the `Wannier90OpenGridWorkChain` class."""
+
+import numpy as np
+from plumpy.process_states import ProcessState
+import pytest
+
+from aiida import orm
+from aiida.common import LinkType
+
+
+@pytest.fixture
+def generate_scf_workchain_node(
+    fixture_localhost, generate_calc_job_node, generate_remote_data
+):
+    """Return a finished scf `WorkChainNode`, whose `PwCalculation` computed the given kpoints."""
+
+    def _generate_scf_workchain_node(workchain, klist, kpoints=None):
+        if kpoints is None:
+            kpoints = workchain.inputs.scf.kpoints
+
+        scf_workchain = orm.WorkChainNode()
+        scf_workchain.set_process_state(ProcessState.FINISHED)
+        scf_workchain.set_exit_status(0)
+        scf_workchain.store()
+
+        calcjob = generate_calc_job_node(
+            "quantumespresso.pw",
+            fixture_localhost,
+            inputs={"kpoints": kpoints},
+            store=False,
+        )
+        calcjob.set_process_state(ProcessState.FINISHED)
+        calcjob.set_exit_status(0)
+        calcjob.base.links.add_incoming(
+            scf_workchain, link_type=LinkType.CALL_CALC, link_label="iteration_01"
+        )
+        calcjob.store()
+
+        output_band = orm.BandsData()
+        output_band.set_cell_from_structure(workchain.inputs.structure)
+        output_band.set_kpoints(klist, cartesian=False)
+        output_band.set_bands(np.zeros((len(klist), 4)))
+        output_band.base.links.add_incoming(
+            calcjob, link_type=LinkType.CREATE, link_label="output_band"
+        )
+        output_band.store()
+
+        remote = generate_remote_data(
+            computer=fixture_localhost, remote_path="/path/on/remote"
+        )
+        params = orm.Dict({"fermi_energy": 6.0, "number_of_electrons": 8})
+        for label, node in (("remote_folder", remote), ("output_parameters", params)):
+            node.store()
+            node.base.links.add_incoming(
+                scf_workchain, link_type=LinkType.RETURN, link_label=label
+            )
+
+        return scf_workchain
+
+    return _generate_scf_workchain_node
+
+
+def test_open_grid_local_skip(
+    generate_workchain_open_grid, generate_scf_workchain_node
+):
+    """Test open_grid.x is skipped if pw.x already ran on the full kmesh."""
+    from aiida_wannier90_workflows.utils.kpoints import get_open_grid_klist
+
+    workchain = generate_workchain_open_grid(open_grid_local=True)
+    assert workchain.setup() is None
+
+    # pw.x ran with nosym on the 2x2x2 mesh of the inputs, in its own order
+    klist = get_open_grid_klist([2, 2, 2])[::-1]
+    workchain.ctx.workchain_scf = generate_scf_workchain_node(workchain, klist)
+    assert workchain.inspect_scf() is None
+
+    assert workchain.should_run_open_grid()
+    assert workchain.run_open_grid() is None
+    assert "workchain_open_grid" not in workchain.ctx
+    assert workchain.inspect_open_grid() is None
+
+    inputs = workchain.prepare_wannier90_pp_inputs()["wannier90"]
+    # The kpoints are in the order of the wavefunctions of pw.x
+    assert np.allclose(inputs.kpoints.get_kpoints(), klist)
+    assert inputs.parameters["mp_grid"] == [2, 2, 2]
+
+
+def test_open_grid_local_unfold(
+    generate_workchain_open_grid,
+    generate_scf_workchain_node,
+    generate_remote_data,
+    fixture_localhost,
+):
+    """Test the kmesh is unfolded in the workchain if pw.x ran on the irreducible kmesh."""
+    from aiida_wannier90_workflows.utils.kpoints import get_open_grid_klist
+
+    workchain = generate_workchain_open_grid(open_grid_local=True)
+    assert workchain.setup() is None
+
+    # The irreducible kpoints of the 2x2x2 mesh
+    klist = get_open_grid_klist([2, 2, 2])[[0, 1, 3, 7]]
+    workchain.ctx.workchain_scf = generate_scf_workchain_node(workchain, klist)
+    assert workchain.inspect_scf() is None
+
+    open_grid_workchain = workchain.run_open_grid()["workchain_open_grid"]
+    assert np.allclose(
+        workchain.ctx.open_grid_kpoints.get_kpoints(), get_open_grid_klist([2, 2, 2])
+    )
+
+    # mock open_grid outputs, the parsed kpoints are ignored if they agree
+    remote = generate_remote_data(
+        computer=fixture_localhost, remote_path="/path/on/remote"
+    )
+    kpoints = orm.KpointsData()
+    kpoints.set_kpoints(get_open_grid_klist([2, 2, 2]) + 1e-8)
+    kpoints_mesh = orm.KpointsData()
+    kpoints_mesh.set_kpoints_mesh([2, 2, 2])
+    for label, node in (
+        ("remote_folder", remote),
+        ("kpoints", kpoints),
+        ("kpoints_mesh", kpoints_mesh),
+    ):
+        node.store()
+        node.base.links.add_incoming(
+            open_grid_workchain, link_type=LinkType.RETURN, link_label=label
+        )
+
+    open_grid_workchain.set_process_state(ProcessState.FINISHED)
+    open_grid_workchain.set_exit_status(0)
+    workchain.ctx.workchain_open_grid = open_grid_workchain
+
+    assert workchain.inspect_open_grid() is None
+    assert workchain.ctx.current_folder == remote
+
+    inputs = workchain.prepare_wannier90_pp_inputs()["wannier90"]
+    assert inputs.kpoints == workchain.ctx.open_grid_kpoints
+    assert inputs.parameters["mp_grid"] == [2, 2, 2]
+
+
+def test_open_grid_local_fallback(
+    generate_workchain_open_grid, generate_scf_workchain_node
+):
+    """Test open_grid.x is used if the kpoints of pw.x are not in the order of a mesh."""
+    from aiida_wannier90_workflows.utils.kpoints import get_open_grid_klist
+
+    workchain = generate_workchain_open_grid(open_grid_local=True)
+    assert workchain.setup() is None
+
+    # An explicit list of the full 2x2x2 mesh, not in the `cartesian_product` order
+    klist = get_open_grid_klist([2, 2, 2])[[1, 0, 2, 3, 4, 5, 6, 7]]
+    kpoints = orm.KpointsData()
+    kpoints.set_kpoints(klist)
+    workchain.ctx.workchain_scf = generate_scf_workchain_node(
+        workchain, klist, kpoints=kpoints
+    )
+    assert workchain.inspect_scf() is None
+
+    assert "workchain_open_grid" in workchain.run_open_grid()
+    assert "open_grid_kpoints" not in workchain.ctx